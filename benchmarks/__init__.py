@@ -0,0 +1,8 @@
+"""Benchmarks for the Awesome Theme.
+
+Run a benchmark as a module from the root of the repository, for example:
+
+.. code-block:: console
+
+   python -m benchmarks.postprocess
+"""
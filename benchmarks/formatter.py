@@ -0,0 +1,78 @@
+"""Benchmark formatting a very long code block.
+
+Compare writing each piece of HTML separately to writing the pieces in chunks,
+and formatting with and without line spans.
+
+.. code-block:: console
+
+   python -m benchmarks.formatter [--lines 20000] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from io import StringIO
+
+from pygments.lexers import PythonLexer
+
+from sphinxawesome_theme import highlighting
+from sphinxawesome_theme.highlighting import AwesomeHtmlFormatter
+
+
+def generated_module(lines: int) -> str:
+    """Return the code of a generated Python module."""
+    return "".join(f'CONSTANT_{i} = {{"name": "value_{i}", "index": {i}}}  # generated\n' for i in range(lines))
+
+
+def peak_memory(format_code: Callable[[], str]) -> float:
+    """Return the peak memory for formatting the code in MiB."""
+    tracemalloc.start()
+    format_code()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def main() -> None:
+    """Run the benchmark and print the time and memory for each variant."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=20000, help="number of lines in the code block")
+    parser.add_argument("--repeat", type=int, default=5, help="number of repetitions")
+    args = parser.parse_args()
+
+    code = generated_module(args.lines)
+    # Format the tokens directly, because lexing takes most of the time
+    tokens = list(PythonLexer().get_tokens(code))
+    chunk_size = highlighting.WRITE_CHUNK_SIZE
+    print(f"{args.lines} lines, {len(code) // 1024} KiB of code")
+
+    def variant(chunk: int, linespans: str) -> Callable[[], str]:
+        def format_code() -> str:
+            highlighting.WRITE_CHUNK_SIZE = chunk
+            out = StringIO()
+            AwesomeHtmlFormatter(linespans=linespans).format(iter(tokens), out)
+            return out.getvalue()
+
+        return format_code
+
+    variants = [
+        ("each piece", variant(1, "line")),
+        ("chunked", variant(chunk_size, "line")),
+        ("no spans", variant(chunk_size, "")),
+    ]
+    outputs = [format_code() for _, format_code in variants]
+    assert outputs[0] == outputs[1], "chunked writing changes the output"  # noqa: S101
+    for (name, format_code), output in zip(variants, outputs, strict=True):
+        seconds = min(timeit.repeat(format_code, number=1, repeat=args.repeat))
+        print(
+            f"{name:>15}: {seconds * 1000:8.1f} ms, {len(output) // 1024:6d} KiB of HTML, "
+            f"peak {peak_memory(format_code):6.1f} MiB"
+        )
+    highlighting.WRITE_CHUNK_SIZE = chunk_size
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Benchmark looking up the lexers for code blocks.
+
+Compare creating a new lexer and placeholder filter for every code block
+to reusing them for code blocks with the same language and options.
+
+.. code-block:: console
+
+   python -m benchmarks.highlighting [--blocks 1000] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import timeit
+from typing import Any
+
+from pygments.lexer import Lexer
+from sphinx.highlighting import PygmentsBridge
+
+from sphinxawesome_theme.highlighting import AwesomePlaceholders, AwesomePygmentsBridge
+
+# Typical code blocks in documentation: the language, the code, and the options
+CODE_BLOCKS: list[tuple[str, str, dict[str, Any]]] = [
+    ("python", 'def main() -> None:\n    print("Hello")\n', {}),
+    ("bash", "pip install sphinxawesome-theme\n", {}),
+    ("json", '{\n  "name": "NAME",\n  "version": 1\n}\n', {"hl_text": ["NAME"]}),
+    ("yaml", "name: NAME\nversion: 1\n", {"hl_text": ["NAME"]}),
+    ("guess", "import sphinx\n\nproject = 'Example'\n", {}),
+    ("guess", "$ sphinx-build -b html docs docs/_build\n", {}),
+]
+
+
+def old_get_lexer(bridge: PygmentsBridge, source: str, lang: str, opts: dict[str, Any]) -> Lexer:
+    """Look up the lexer like the theme did before reusing lexers."""
+    lexer = PygmentsBridge.get_lexer(bridge, source, lang, opts)
+    if opts.get("hl_text"):
+        lexer.add_filter(AwesomePlaceholders(hl_text=opts["hl_text"]))
+    return lexer
+
+
+def main() -> None:
+    """Run the benchmark and print the time per code block."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=1000, help="number of code blocks")
+    parser.add_argument("--repeat", type=int, default=5, help="number of repetitions")
+    args = parser.parse_args()
+
+    blocks = list(itertools.islice(itertools.cycle(CODE_BLOCKS), args.blocks))
+    print(f"{args.blocks} code blocks in {len(CODE_BLOCKS)} variations")
+
+    def per_block() -> None:
+        bridge = PygmentsBridge("html", "sphinx")
+        for lang, source, opts in blocks:
+            old_get_lexer(bridge, source, lang, opts)
+
+    def reused() -> None:
+        bridge = AwesomePygmentsBridge("html", "sphinx")
+        for lang, source, opts in blocks:
+            bridge.get_lexer(source, lang, opts)
+
+    for name, lookup in [("per block", per_block), ("reused", reused)]:
+        seconds = min(timeit.repeat(lookup, number=1, repeat=args.repeat))
+        print(f"{name:>15}: {seconds * 1_000_000 / args.blocks:8.1f} µs per code block")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Benchmark importing the theme.
+
+Measure the time of importing the theme with ``python -X importtime``.
+Sphinx and its HTML builder are imported first,
+so that the time only includes the modules that the theme adds.
+
+.. code-block:: console
+
+   python -m benchmarks.imports [--repeat 5] [--top 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+
+SPHINX = "import sphinx.application, sphinx.builders.html, sphinxcontrib.serializinghtml"
+
+
+def import_times() -> dict[str, int]:
+    """Import the theme in a new Python process and return the cumulative import time of each module in µs."""
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"{SPHINX}; import sphinxawesome_theme"],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    lines = [line for line in result.stderr.splitlines() if line.startswith("import time:") and "|" in line]
+    # Skip the modules that Sphinx imports
+    start = next(index for index, line in enumerate(lines) if line.endswith("| sphinxcontrib.serializinghtml")) + 1
+    times = {}
+    for line in lines[start:]:
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main() -> None:
+    """Run the benchmark and print the slowest imports."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="number of repetitions")
+    parser.add_argument("--top", type=int, default=10, help="number of modules to print")
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.repeat)]
+    fastest = min(runs, key=lambda times: times["sphinxawesome_theme"])
+    for name, micros in sorted(fastest.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"{name:>40}: {micros / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
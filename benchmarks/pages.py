@@ -0,0 +1,171 @@
+"""Generate synthetic HTML pages that look like pages built with the Awesome Theme, and synthetic projects."""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+
+
+def nav(entries: int, breadth: int = 10) -> str:
+    """Return the navigation for the left sidebar with about ``entries`` links.
+
+    Every ``breadth``-th link has a nested list of children.
+    """
+    items = []
+    for i in range(0, entries, breadth):
+        children = "".join(
+            f'<li class="toctree-l2"><a class="reference internal" href="api/module{i}/item{j}.html">Item {j}</a></li>\n'
+            for j in range(1, breadth)
+        )
+        items.append(
+            f'<li class="toctree-l1"><a class="reference internal" href="api/module{i}.html">Module {i}</a>'
+            f"<ul>\n{children}</ul>\n</li>\n"
+        )
+    return f'<nav class="table w-full min-w-full my-6 lg:my-8">\n<ul>\n{"".join(items)}</ul>\n</nav>'
+
+
+def autodoc_page(objects: int, nav_entries: int = 100) -> str:
+    """Return a page with ``objects`` API objects, similar to pages generated by ``autodoc``."""
+    body = []
+    toc = []
+    for i in range(objects):
+        if i % 10 == 0:
+            body.append(
+                f'<section id="group-{i}">\n<h2>Group {i}<a class="headerlink" href="#group-{i}" title="Link to this heading">¶</a></h2>\n'
+            )
+            toc.append(f'<li><a class="reference internal" href="#group-{i}">Group {i}</a></li>\n')
+        body.append(
+            f'<dl class="py function">\n<dt class="sig sig-object py" id="module.function_{i}">\n'
+            f'<span class="sig-name descname"><span class="pre">function_{i}</span></span>'
+            f'<span class="sig-paren">(</span><em class="sig-param"><span class="n"><span class="pre">arg</span></span></em>'
+            f'<span class="sig-paren">)</span><a class="headerlink" href="#module.function_{i}" title="Link to this definition">¶</a></dt>\n'
+            f"<dd><p>Documentation for function {i}. "
+            f'See <a class="reference external" href="https://example.org/{i}">the reference</a>.</p>\n</dd></dl>\n'
+        )
+        if i % 10 == 9:
+            body.append("</section>\n")
+    if objects % 10:
+        body.append("</section>\n")
+
+    return f"""<!DOCTYPE html>
+<html lang="en" data-content_root="./">
+<head>
+<meta charset="utf-8" />
+<title>API reference</title>
+</head>
+<body>
+<div id="page">
+<aside id="left-sidebar">
+<div class="toctree-wrapper compound">
+</div>
+{nav(nav_entries)}
+</aside>
+<main>
+<div id="content" role="main">
+<!-- generated by the benchmark -->
+<section id="api-reference">
+<h1>API reference<a class="headerlink" href="#api-reference" title="Link to this heading">¶</a></h1>
+{"".join(body)}</section>
+</div>
+<aside id="right-sidebar">
+<ul>
+{"".join(toc)}</ul>
+</aside>
+</main>
+</div>
+</body>
+</html>
+"""
+
+
+def sectioned_document(sections: int, subsections: int = 3) -> str:
+    """Return a reStructuredText document with ``sections`` sections, each with ``subsections`` subsections."""
+    parts = ["Sectioned document\n==================\n"]
+    for i in range(sections):
+        parts.append(f"\nSection {i}\n{'-' * (8 + len(str(i)))}\n\nText.\n")
+        for j in range(subsections):
+            title = f"Subsection {i}.{j}"
+            parts.append(f"\n{title}\n{'~' * len(title)}\n\nText.\n")
+    return "".join(parts)
+
+
+@dataclass(frozen=True)
+class ProjectShape:
+    """The size of a synthetic Sphinx project."""
+
+    pages: int = 100
+    """The number of documents, including the root document."""
+
+    depth: int = 3
+    """The number of toctree levels below the root document."""
+
+    breadth: int = 6
+    """The maximum number of documents in each toctree."""
+
+    code_blocks: int = 5
+    """The number of code blocks per document, with ``:emphasize-added:`` and ``:emphasize-text:``."""
+
+    external_links: int = 20
+    """The number of external links per document."""
+
+    signatures: int = 20
+    """The number of Python functions per document, similar to pages generated by ``autodoc``."""
+
+
+def synthetic_document(docname: str, children: list[str], shape: ProjectShape) -> str:
+    """Return a reStructuredText document with a toctree, code blocks, external links, and API objects."""
+    title = f"Document {docname}"
+    parts = [f"{title}\n{'=' * len(title)}\n\n"]
+    if children:
+        parts.append(".. toctree::\n\n" + "".join(f"   {child}\n" for child in children) + "\n")
+
+    parts.append("Examples\n--------\n\n")
+    for i in range(shape.code_blocks):
+        lines = "".join(f"       NAME = NAME + {j}\n" for j in range(15))
+        parts.append(
+            ".. code-block:: python\n   :emphasize-added: 2\n   :emphasize-text: NAME\n\n"
+            f"   def example_{i}(NAME: int) -> int:\n{lines}       return NAME\n\n"
+        )
+
+    parts.append("Links\n-----\n\n")
+    links = " ".join(f"`Link {i} <https://example.org/{docname}/{i}>`__" for i in range(shape.external_links))
+    parts.append(f"See {links}.\n\n" if links else "")
+
+    parts.append("API reference\n-------------\n\n")
+    for i in range(shape.signatures):
+        parts.append(
+            f'.. py:function:: {docname}.function_{i}(arg: int, *, option: str = "default") -> bool\n\n'
+            f"   Documentation for function {i}.\n\n"
+            f"   :param arg: The argument.\n   :param option: An option.\n   :returns: The result.\n\n"
+        )
+    return "".join(parts)
+
+
+def synthetic_project(srcdir: Path, shape: ProjectShape, conf: str = "") -> list[str]:
+    """Write a Sphinx project into ``srcdir`` and return its document names.
+
+    The documents form a tree: each document has a toctree with up to ``breadth`` children,
+    down to ``depth`` levels below the root document.
+    If the tree is full, the project has fewer than ``pages`` documents.
+    """
+    srcdir.mkdir(parents=True, exist_ok=True)
+    (srcdir / "conf.py").write_text(f'html_theme = "sphinxawesome_theme"\n{conf}', encoding="utf-8")
+
+    children: dict[str, list[str]] = {"index": []}
+    queue = deque([("index", 0)])
+    while queue and len(children) < shape.pages:
+        parent, level = queue.popleft()
+        if level == shape.depth:
+            continue
+        for _ in range(shape.breadth):
+            if len(children) == shape.pages:
+                break
+            docname = f"page{len(children)}"
+            children[parent].append(docname)
+            children[docname] = []
+            queue.append((docname, level + 1))
+
+    for docname, docs in children.items():
+        (srcdir / f"{docname}.rst").write_text(synthetic_document(docname, docs, shape), encoding="utf-8")
+    return list(children)
@@ -0,0 +1,66 @@
+"""Benchmark finding placeholders in code blocks.
+
+Compare the regular expression to the Aho-Corasick automaton
+for different numbers of placeholders.
+The ``AUTOMATON_THRESHOLD`` is the number of placeholders
+from which the automaton is faster.
+
+.. code-block:: console
+
+   python -m benchmarks.placeholders [--lines 200] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import random
+import string
+import timeit
+from collections.abc import Callable, Iterable
+
+from pygments.lexers import PythonLexer
+
+from sphinxawesome_theme.highlighting import (
+    AwesomePlaceholders,
+    PlaceholderAutomaton,
+    TokenType,
+    _regex_spans,
+    _replace_placeholders,
+)
+
+
+def replace_all(
+    tokens: list[tuple[TokenType, str]], spans: Callable[[str], Iterable[tuple[int, int]]]
+) -> list[tuple[TokenType, str]]:
+    """Replace the placeholders in all tokens."""
+    return [token for ttype, value in tokens for token in _replace_placeholders(ttype, value, spans(value))]
+
+
+def main() -> None:
+    """Run the benchmark and print the time per code block."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200, help="number of lines per code block")
+    parser.add_argument("--repeat", type=int, default=5, help="number of repetitions")
+    args = parser.parse_args()
+
+    rng = random.Random(0)  # noqa: S311
+    for count in [4, 16, 32, 48, 64, 128]:
+        placeholders = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(count)]
+        code = "".join(
+            f"result_{i} = client.call({rng.choice(placeholders)!r}, option={i})  # about {rng.choice(placeholders)}\n"
+            for i in range(args.lines)
+        )
+        tokens = list(PythonLexer().get_tokens(code))
+        regex = AwesomePlaceholders(hl_text=placeholders).placeholders_re
+        automaton = PlaceholderAutomaton(placeholders)
+        with_regex = functools.partial(replace_all, tokens, functools.partial(_regex_spans, regex))
+        with_automaton = functools.partial(replace_all, tokens, automaton.spans)
+        assert with_regex() == with_automaton(), "the matchers find different placeholders"  # noqa: S101
+
+        times = [min(timeit.repeat(f, number=1, repeat=args.repeat)) * 1000 for f in [with_regex, with_automaton]]
+        print(f"{count:>4} placeholders: regex {times[0]:7.3f} ms, automaton {times[1]:7.3f} ms per code block")
+
+
+if __name__ == "__main__":
+    main()
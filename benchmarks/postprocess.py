@@ -0,0 +1,73 @@
+"""Benchmark the post-processing of a large page built with ``autodoc``.
+
+Compare running each transformation with its own walk of the tree
+to the fused pipeline that walks the tree only once,
+and to the streaming rewriter that doesn't build a tree.
+Parsing the tree isn't included in the time of the tree engines.
+
+.. code-block:: console
+
+   python -m benchmarks.postprocess [--objects 2000] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+
+from bs4 import BeautifulSoup
+
+from sphinxawesome_theme import postprocess, streaming
+
+from .pages import autodoc_page
+
+
+def separate_walks(tree: BeautifulSoup) -> None:
+    """Run each transformation with a separate walk of the tree."""
+    postprocess.collapsible_nav(tree)
+    postprocess.external_links(tree)
+    postprocess.remove_empty_toctree(tree)
+    postprocess.scrollspy(tree)
+    postprocess.headerlinks(tree)
+    postprocess.strip_comments(tree)
+
+
+def fused_walk(tree: BeautifulSoup) -> None:
+    """Run all transformations in a single walk of the tree."""
+    options = postprocess.PostprocessOptions(external_links=True, headerlinks=True)
+    postprocess.walk(tree, postprocess.get_visitors(options))
+
+
+def main() -> None:
+    """Run the benchmark and print the time per page."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--objects", type=int, default=2000, help="number of API objects on the page")
+    parser.add_argument("--repeat", type=int, default=5, help="number of repetitions")
+    args = parser.parse_args()
+
+    html = autodoc_page(args.objects)
+    print(f"page size: {len(html) / 1024:.0f} KiB, {args.objects} objects")
+
+    results = {}
+    for name, pipeline in [("separate walks", separate_walks), ("fused walk", fused_walk)]:
+        trees = [BeautifulSoup(html, "html.parser") for _ in range(args.repeat)]
+        outputs = []
+
+        def run(pipeline=pipeline, trees=trees, outputs=outputs) -> None:  # noqa: ANN001
+            tree = trees[len(outputs)]
+            pipeline(tree)
+            outputs.append(tree)
+
+        seconds = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        results[name] = str(outputs[0])
+        print(f"{name:>15}: {seconds * 1000:8.1f} ms per page")
+
+    assert results["separate walks"] == results["fused walk"], "the pipelines produce different output"  # noqa: S101
+
+    options = postprocess.PostprocessOptions(external_links=True, headerlinks=True)
+    seconds = min(timeit.repeat(lambda: streaming.rewrite(html, options), number=1, repeat=args.repeat))
+    print(f"{'stream':>15}: {seconds * 1000:8.1f} ms per page (including parsing)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Benchmark building a large synthetic project.
+
+Generate a project with a tree of documents,
+each with code blocks, external links, and API objects,
+and build it with the HTML builder.
+Measure the phases of the build separately:
+
+- ``read``: reading the documents
+- ``write``: writing the pages, including the next three phases
+- ``change_toc``: rendering the on-page TOCs while reading and writing
+- ``highlighting``: collecting the tokens of the code blocks after reading, and highlighting them while writing
+- ``post_process_html``: parsing, transforming, and serializing the pages, or rewriting them
+
+Compare the results to the baseline in ``benchmarks/baseline.json``,
+and exit with an error if a phase is slower than the baseline by more than the tolerance.
+
+The baseline has the times in seconds from the machine that saved it,
+so it isn't committed.
+If there's no baseline, the first run saves its results as the baseline.
+To compare a change, save a baseline on your machine without the change,
+then run the benchmark with the change:
+
+.. code-block:: console
+
+   git stash
+   python -m benchmarks.site --save-baseline
+   git stash pop
+   python -m benchmarks.site
+
+The benchmark warns if the baseline is from a different operating system, processor architecture,
+or number of CPUs, or from other versions of Python or Sphinx.
+
+.. code-block:: console
+
+   python -m benchmarks.site [--pages 100] [--depth 3] [--breadth 6] [--code-blocks 5]
+                             [--external-links 20] [--signatures 20] [--repeat 3]
+                             [--save-baseline] [--tolerance 0.2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from io import StringIO
+from pathlib import Path
+from typing import Any
+
+import sphinx
+from sphinx.application import Sphinx
+
+from .pages import ProjectShape, synthetic_project
+
+BASELINE = Path(__file__).parent / "baseline.json"
+
+PHASES = ["read", "write", "change_toc", "highlighting", "post_process_html", "total"]
+
+HANDLERS = {
+    "change_toc": ["doctree-read:cache_toc", "html-page-context:change_toc"],
+    "highlighting": ["env-updated:select_pygments_classes"],
+}
+"""The theme's handlers that belong to a phase, from the read and the write phase."""
+
+
+def timed(func: Callable[..., Any], phases: dict[str, float], phase: str) -> Callable[..., Any]:
+    """Add the time of every call of a function to a phase."""
+
+    def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            phases[phase] += time.perf_counter() - start
+
+    return wrapper
+
+
+def build(tmp: Path, shape: ProjectShape) -> dict[str, float]:
+    """Build the project once and return the time of each phase in seconds."""
+    srcdir = tmp / "src"
+    report = tmp / "report.json"
+    synthetic_project(srcdir, shape, f"html_theme_options = {{'awesome_build_report': {str(report)!r}}}\n")
+
+    phases = dict.fromkeys(PHASES, 0.0)
+    app = Sphinx(srcdir, srcdir, tmp / "out", tmp / "doctrees", "html", status=None, warning=StringIO())
+    builder: Any = app.builder
+    builder.read = timed(builder.read, phases, "read")
+    builder.write = timed(builder.write, phases, "write")
+    builder.highlighter.highlight_block = timed(builder.highlighter.highlight_block, phases, "highlighting")
+
+    start = time.perf_counter()
+    app.build()
+    phases["total"] = time.perf_counter() - start
+
+    # The theme measures its own handlers and transformations
+    timings = json.loads(report.read_text(encoding="utf-8"))
+    for phase, names in HANDLERS.items():
+        phases[phase] += sum(timings["handlers"][name]["total"] for name in names if name in timings["handlers"])
+    phases["post_process_html"] = sum(
+        timings["transforms"][name]["total"]
+        for name in ["parse", "walk", "serialize", "stream"]
+        if name in timings["transforms"]
+    )
+    return phases
+
+
+def get_machine() -> dict[str, Any]:
+    """Describe the machine and the versions that the times depend on, without identifying the host."""
+    return {
+        "system": platform.system(),
+        "processor": platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "sphinx": sphinx.__version__,
+    }
+
+
+def compare(results: dict[str, float], baseline: dict[str, Any], tolerance: float) -> bool:
+    """Print the results next to the baseline and return false if a phase is too slow."""
+    ok = True
+    print(f"{'phase':>20} {'baseline':>10} {'current':>10} {'ratio':>8}")
+    for phase in PHASES:
+        before, after = baseline["phases"][phase], results[phase]
+        ratio = after / before if before else 1.0
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  slower"
+            ok = False
+        print(f"{phase:>20} {before:9.3f}s {after:9.3f}s {ratio:7.2f}x{flag}")
+    return ok
+
+
+def main() -> None:
+    """Run the benchmark, and compare the results to the baseline or save them as the new baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    defaults = ProjectShape()
+    parser.add_argument("--pages", type=int, default=defaults.pages, help="number of documents")
+    parser.add_argument("--depth", type=int, default=defaults.depth, help="number of toctree levels")
+    parser.add_argument("--breadth", type=int, default=defaults.breadth, help="number of documents per toctree")
+    parser.add_argument("--code-blocks", type=int, default=defaults.code_blocks, help="code blocks per document")
+    parser.add_argument("--external-links", type=int, default=defaults.external_links, help="links per document")
+    parser.add_argument("--signatures", type=int, default=defaults.signatures, help="API objects per document")
+    parser.add_argument("--repeat", type=int, default=3, help="number of repetitions")
+    parser.add_argument("--save-baseline", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown compared to the baseline")
+    args = parser.parse_args()
+
+    shape = ProjectShape(
+        pages=args.pages,
+        depth=args.depth,
+        breadth=args.breadth,
+        code_blocks=args.code_blocks,
+        external_links=args.external_links,
+        signatures=args.signatures,
+    )
+    runs = []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            runs.append(build(Path(tmp), shape))
+    # The fastest run of each phase has the least noise
+    results = {phase: min(run[phase] for run in runs) for phase in PHASES}
+
+    if args.save_baseline or not BASELINE.exists():
+        BASELINE.write_text(
+            json.dumps({"machine": get_machine(), "shape": dataclasses.asdict(shape), "phases": results}, indent=2)
+            + "\n",
+            encoding="utf-8",
+        )
+        print(f"Saved the baseline to {BASELINE}")
+        return
+
+    baseline = json.loads(BASELINE.read_text(encoding="utf-8"))
+    if baseline["shape"] != dataclasses.asdict(shape):
+        sys.exit(f"The baseline is for a different project: {baseline['shape']}")
+    if baseline.get("machine") != get_machine():
+        print(f"Warning: the baseline is from a different machine: {baseline.get('machine')}")
+        print("Save a new baseline on this machine with --save-baseline before comparing changes.")
+    if not compare(results, baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
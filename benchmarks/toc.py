@@ -0,0 +1,68 @@
+"""Benchmark rendering the on-page TOC.
+
+Compare publishing each TOC with the docutils HTML writer (``render_partial``)
+to rendering the TOC directly from its nodes,
+and to reading the TOC from the cache in the environment.
+
+.. code-block:: console
+
+   python -m benchmarks.toc [--pages 50] [--sections 50] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import timeit
+from pathlib import Path
+from typing import cast
+
+from sphinx.application import Sphinx
+from sphinx.builders.html import StandaloneHTMLBuilder
+
+from sphinxawesome_theme import toc
+
+from .pages import sectioned_document
+
+
+def main() -> None:
+    """Run the benchmark and print the time per page."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50, help="number of documents")
+    parser.add_argument("--sections", type=int, default=50, help="number of sections per document")
+    parser.add_argument("--repeat", type=int, default=5, help="number of repetitions")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        srcdir = Path(tmp) / "src"
+        srcdir.mkdir()
+        (srcdir / "conf.py").write_text('html_theme = "sphinxawesome_theme"\n')
+        docnames = [f"page{i}" for i in range(args.pages)]
+        toctree = "".join(f"   {docname}\n" for docname in docnames)
+        (srcdir / "index.rst").write_text(f"Index\n=====\n\n.. toctree::\n\n{toctree}")
+        for docname in docnames:
+            (srcdir / f"{docname}.rst").write_text(sectioned_document(args.sections))
+
+        app = Sphinx(srcdir, srcdir, Path(tmp) / "out", Path(tmp) / "doctrees", "html", status=None)
+        app.build()
+        builder = cast(StandaloneHTMLBuilder, app.builder)
+        env = cast(toc.TocBuildEnvironment, builder.env)
+        print(f"{args.pages} pages with {args.sections * 4} TOC entries each")
+
+        def render_partial() -> list[str]:
+            return [builder.render_partial(toc.get_local_toc(builder, docname))["fragment"] for docname in docnames]
+
+        def render_direct() -> list[str]:
+            return [toc.render_toc(toc.get_local_toc(builder, docname)) or "" for docname in docnames]
+
+        def cached() -> list[str]:
+            return [env.awesome_tocs[docname] for docname in docnames]
+
+        assert render_partial() == render_direct() == cached(), "the renderers produce different output"  # noqa: S101
+        for name, renderer in [("render_partial", render_partial), ("direct", render_direct), ("cached", cached)]:
+            seconds = min(timeit.repeat(renderer, number=1, repeat=args.repeat))
+            print(f"{name:>15}: {seconds * 1000 / args.pages:8.3f} ms per page")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,7 +16,7 @@ from sphinx.deprecation import RemovedInSphinx10Warning
 from sphinx.util.docfields import Field
 
 from sphinxawesome_theme import ThemeOptions, __version__
-from sphinxawesome_theme.postprocess import Icons
+from sphinxawesome_theme.icons import Icons
 
 load_dotenv()
 
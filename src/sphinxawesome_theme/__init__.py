@@ -18,12 +18,28 @@ from sphinx.util import logging
 from sphinxcontrib.serializinghtml import JSONHTMLBuilder
 
 from . import jsonimpl
-from .builder import AwesomeHTMLBuilder
+from .builder import (
+    AwesomeHTMLBuilder,
+    purge_pygments_classes,
+    select_pygments_classes,
+)
+from .bundle import setup_bundles
 from .code import AwesomeCodeBlock
+from .fingerprint import setup_fingerprint
+from .highlighting import setup_highlight_cache, setup_long_code_blocks
 from .jinja_functions import setup_jinja
 from .logos import copy_logos, setup_logo_path, update_config
-from .postprocess import changed_docs, post_process_html
-from .toc import change_toc
+from .nav import setup_nav, setup_nav_fragment, write_nav_fragment
+from .profiling import (
+    connect,
+    setup_build_report,
+    setup_memory_report,
+    write_build_report,
+    write_memory_report,
+)
+from .sprite import setup_header_icons, write_sprite
+from .toc import cache_toc, change_toc, merge_tocs, purge_toc
+from .translator import setup_translator
 
 logger = logging.getLogger(__name__)
 
@@ -98,6 +114,150 @@ class ThemeOptions:
     This option is inherited from the ``basic`` theme.
     """
 
+    awesome_html_parser: str = "html.parser"
+    """The parser for post-processing the generated HTML.
+
+    Python's built-in ``html.parser`` is always available.
+    For a faster build, install the `lxml <https://lxml.de>`_ package and use ``lxml``.
+    If ``lxml`` isn't installed, the theme falls back to ``html.parser``.
+    Other parsers, such as ``html5lib``, aren't supported, because they change the structure of the HTML.
+    """
+
+    awesome_postprocess_engine: str = "tree"
+    """The engine for post-processing the generated HTML.
+
+    The default ``tree`` engine parses every page into a tree with BeautifulSoup.
+    The ``stream`` engine rewrites the HTML without building a tree,
+    which is faster and uses less memory for large pages.
+    The rewritten page is still kept in memory until Sphinx writes it.
+    The ``awesome_html_parser`` option has no effect with the ``stream`` engine.
+    """
+
+    awesome_cache_dir: str = ""
+    """A directory for caching the results of the theme across builds.
+
+    Relative paths are relative to the directory with the ``conf.py`` file.
+    Pages with the same HTML and theme options aren't post-processed again,
+    and code blocks with the same code and options aren't highlighted again,
+    even if you remove the output directory before each build.
+    If empty, the theme doesn't cache anything.
+    """
+
+    awesome_cache_max_size: int = 256
+    """The maximum size of each cache in MiB.
+
+    At the end of each build, the least recently used files are removed from the cache.
+    """
+
+    awesome_fingerprint_assets: bool = False
+    """If true, the theme writes its assets under names with a hash of their content.
+
+    This includes the CSS and JavaScript files of the theme, ``pygments.css``, and the logos.
+    The pages reference the assets with the hashed names,
+    for example, ``_static/theme.3f2a9c1b7d4e.css``.
+    Because the content of a file with a hashed name never changes,
+    you can serve these files with headers that let browsers and CDNs cache them forever.
+    """
+
+    awesome_bundle_assets: bool = False
+    """If true, the pages load one stylesheet and one deferred script instead of several.
+
+    The theme joins the stylesheets of Sphinx, the theme, and the extensions,
+    in the order of their priorities, and removes comments and whitespace.
+    The deferred scripts are joined in the same way.
+    Files from other servers and files with other attributes, such as ``media``, aren't bundled.
+    """
+
+    awesome_build_report: str = ""
+    """A JSON file for a report about how long the theme takes during the build.
+
+    Relative paths are relative to the directory with the ``conf.py`` file.
+    The report has the total time and the percentiles of the time per page
+    for every event handler and every post-processing step of the theme,
+    and the pages where the theme takes the most time.
+    If empty, the theme doesn't measure anything.
+    """
+
+    awesome_memory_report: str = ""
+    """A JSON file for a report about how much memory the theme uses during the build.
+
+    Relative paths are relative to the directory with the ``conf.py`` file.
+    The report has the peak and the retained memory for the pages and code blocks
+    that use the most memory while the theme post-processes or highlights them.
+    The build log includes the first few of them.
+    Tracing the memory makes the build a lot slower.
+    If empty, the theme doesn't trace the memory.
+    """
+
+    awesome_icon_sprite: bool = False
+    """If true, the theme writes its icons once into an SVG sprite in the ``_static`` directory.
+
+    Instead of inlining the full SVG markup of an icon on every link,
+    the pages reference the icons in the sprite.
+    This includes the icons of external links, collapsible navigation links,
+    and the icons from the ``extra_header_link_icons`` option.
+    The icons of headerlinks reference the sprite,
+    unless another extension replaces the theme's HTML translator.
+    Chromium-based browsers don't load icons from an external sprite for pages opened as files,
+    so the icons only show if you serve the pages with a web server.
+    """
+
+    awesome_nav_fragment: bool = False
+    """If true, the theme writes the navigation sidebar once into a shared file in the ``_static`` directory.
+
+    Instead of including the navigation of the whole site,
+    each page loads the shared navigation with a small script.
+    Adding a page then doesn't change the other pages,
+    and the size of the pages doesn't depend on the size of the site.
+    The navigation requires JavaScript and isn't shown if you open the files without a web server.
+    """
+
+    awesome_linespans_max_lines: int = 0
+    """The maximum number of lines for wrapping each line of a code block in a ``<span>`` element.
+
+    For very long code blocks, such as generated files in a ``literalinclude`` directive,
+    the line spans make the page larger and take time to write.
+    Code blocks with highlighted, added, or removed lines, and diffs always keep their line spans.
+    If ``0``, all code blocks have line spans.
+    """
+
+    awesome_code_eager_lines: int = 0
+    """The number of lines of a code block that the browser renders right away.
+
+    The browser renders the remaining lines only when you scroll to them.
+    This makes pages with very long code blocks faster to display and scroll.
+    Copying the code, searching in the page, and links to lines still work.
+    You can override this option for a code block with the ``:eager-lines:`` option.
+    If ``0``, the browser renders all lines right away.
+    """
+
+    awesome_prune_pygments_css: bool = False
+    """If true, the ``pygments.css`` file only includes the styles for tokens that appear in your code blocks.
+
+    The theme finds the tokens by lexing the code of your documents after reading them,
+    and the modules that the ``sphinx.ext.viewcode`` extension shows.
+    This lexes the code of each document that Sphinx reads a second time,
+    unless the code blocks are cached with the ``awesome_cache_dir`` option from an earlier build.
+    Don't use this option if you add highlighted code without Sphinx,
+    for example, as raw HTML, or if another extension writes pages with highlighted code.
+    Their styles are removed.
+    """
+
+
+def setup_postprocess(app: Sphinx) -> None:
+    """Post-process the HTML pages, if the builder writes them.
+
+    Other builders, such as ``latex`` or ``linkcheck``, don't load the ``postprocess`` module,
+    which imports BeautifulSoup.
+    """
+    if app.builder is None or app.builder.name not in ["html", "dirhtml"]:
+        return
+
+    # Import here, because importing BeautifulSoup is slow
+    from .postprocess import post_process_pages
+
+    post_process_pages(app)
+
 
 def setup(app: Sphinx) -> dict[str, Any]:
     """Register the theme and its extensions wih Sphinx."""
@@ -130,13 +290,34 @@ def setup(app: Sphinx) -> dict[str, Any]:
     # The theme is set up _after_ extensions are set up,
     # so I can't use internal extensions.
     # For the same reason, I also can't call the `config-inited` event
-    app.connect("builder-inited", update_config)
-    app.connect("html-page-context", setup_logo_path)
-    app.connect("html-page-context", setup_jinja)
-    app.connect("html-page-context", change_toc)
-    app.connect("build-finished", copy_logos)
-    app.connect("env-before-read-docs", changed_docs)
-    app.connect("build-finished", post_process_html)
+    connect(app, "builder-inited", update_config)
+    connect(app, "html-page-context", setup_logo_path)
+    connect(app, "html-page-context", setup_jinja)
+    connect(app, "html-page-context", change_toc)
+    # Render the TOC after Sphinx collected it
+    connect(app, "doctree-read", cache_toc, priority=900)
+    connect(app, "env-merge-info", merge_tocs)
+    connect(app, "env-purge-doc", purge_toc)
+    connect(app, "html-page-context", setup_nav)
+    connect(app, "html-page-context", setup_header_icons)
+    connect(app, "env-purge-doc", purge_pygments_classes)
+    connect(app, "env-updated", select_pygments_classes)
+    connect(app, "build-finished", copy_logos)
+    connect(app, "builder-inited", setup_translator)
+    connect(app, "builder-inited", setup_postprocess)
+    connect(app, "builder-inited", setup_nav_fragment)
+    connect(app, "builder-inited", setup_highlight_cache)
+    connect(app, "builder-inited", setup_long_code_blocks)
+    connect(app, "build-finished", write_sprite)
+    connect(app, "build-finished", write_nav_fragment)
+    connect(app, "builder-inited", setup_bundles)
+    # Hash the assets after the bundles are written
+    connect(app, "builder-inited", setup_fingerprint)
+    # Measure the other handlers, and write the report after them
+    app.connect("builder-inited", setup_build_report, priority=100)
+    app.connect("builder-inited", setup_memory_report, priority=100)
+    app.connect("build-finished", write_build_report, priority=900)
+    app.connect("build-finished", write_memory_report, priority=900)
 
     JSONHTMLBuilder.out_suffix = ".json"
     JSONHTMLBuilder.implementation = jsonimpl  # type: ignore
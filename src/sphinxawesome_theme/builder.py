@@ -4,8 +4,21 @@ This extension extends the default HTML builder by changing the way
 Pygments CSS is handled.
 
 - Add a ``pygments_style_dark`` configuration option.
-- Append dark mode styles to the main ``pygments.css`` file,
-  based on `prefers-color-scheme`.
+- Merge the light and dark mode styles into one set of rules in ``pygments.css``.
+  Properties that differ between the styles reference CSS variables,
+  which change with the ``dark`` class of the ``<html>`` element.
+- If the ``awesome_prune_pygments_css`` theme option is true,
+  remove the rules for tokens that no code block uses from ``pygments.css``.
+
+For pruning, the theme lexes the code of the documents that were read in this build
+after reading, and the modules that ``sphinx.ext.viewcode`` writes pages for.
+The environment keeps the CSS classes of the tokens for each document and module,
+so that documents that weren't read again and modules that didn't change aren't lexed.
+If the ``awesome_cache_dir`` theme option is set,
+the classes are also cached with the highlighted code blocks,
+so that code blocks that were highlighted in an earlier build aren't lexed again.
+Sphinx writes ``pygments.css`` before the pages,
+so that the ``?v=`` checksum in the pages matches the pruned file.
 
 :copyright: Copyright Kai Welke.
 :license: MIT, see LICENSE for details.
@@ -13,13 +26,53 @@ Pygments CSS is handled.
 
 from __future__ import annotations
 
+import hashlib
+import re
+from collections.abc import Set
 from os import path
+from typing import Any, cast
 
+from docutils import nodes
+from docutils.nodes import Node
+from pygments.util import get_list_opt
+from sphinx.application import Sphinx
 from sphinx.builders.html import StandaloneHTMLBuilder
+from sphinx.config import Config
+from sphinx.environment import BuildEnvironment
 from sphinx.highlighting import PygmentsBridge
+from sphinx.transforms.post_transforms.code import HighlightLanguageVisitor
+from sphinx.util import logging
 
+from . import logos
 from .highlighting import AwesomePygmentsBridge
 
+logger = logging.getLogger(__name__)
+
+# The languages for which Sphinx removes the doctest flags, like ``TrimDoctestFlagsTransform``
+PYCON = {"pycon", "pycon3"}
+PYTHON = {"py", "python", "py3", "python3", "default"}
+
+# The rules for tokens have a comment with the token type, for example: ``.highlight .k { ... } /* Keyword */``
+TOKEN_RULE = re.compile(r"^\.highlight \.([\w-]+) \{[^}]*\} /\* [\w.]+ \*/\n?", re.MULTILINE)
+
+CSS_WIDE_KEYWORDS = {"inherit", "initial", "unset", "revert", "revert-layer"}
+
+# Pygments writes every rule on one line
+RULE = re.compile(r"^(?P<selector>[^{}\n]+?) \{(?P<declarations>[^}]*)\}", re.MULTILINE)
+
+
+class PygmentsBuildEnvironment(BuildEnvironment):
+    """Build environment with the CSS classes of the tokens in the code of each document."""
+
+    awesome_pygments_classes: dict[str, list[str]]
+    """Map document names to the CSS classes of the tokens in their code blocks and inline code.
+
+    Documents whose classes aren't known aren't included.
+    """
+
+    awesome_module_classes: dict[str, tuple[str, list[str]]]
+    """Map the modules that ``sphinx.ext.viewcode`` writes pages for to the hash of their code and its classes."""
+
 
 class AwesomeHTMLBuilder(StandaloneHTMLBuilder):
     """HTML builder that overrides a few methods related to handling CSS for Pygments."""
@@ -53,13 +106,217 @@ class AwesomeHTMLBuilder(StandaloneHTMLBuilder):
         else:
             self.dark_highlighter = None
 
+    pygments_classes: frozenset[str] | None = None
+    """The CSS classes of the tokens that the rules in ``pygments.css`` are for, or ``None`` for all tokens."""
+
     def create_pygments_style_file(self: AwesomeHTMLBuilder) -> None:
         """Create CSS file for Pygments."""
-        stylesheet = self.highlighter.get_stylesheet()
-        if self.dark_highlighter:
-            stylesheet += "\n@media (prefers-color-scheme: dark) {\n"
-            stylesheet += self.dark_highlighter.get_stylesheet()
-            stylesheet += "\n}"
-
         with open(path.join(self.outdir, "_static", "pygments.css"), "w", encoding="utf-8") as f:
-            f.write(stylesheet)
+            f.write(get_pygments_stylesheet(self, getattr(self, "pygments_classes", None)))
+
+
+def prune_stylesheet(stylesheet: str, classes: Set[str]) -> str:
+    """Remove the rules for tokens whose classes aren't in ``classes``."""
+    return TOKEN_RULE.sub(lambda rule: rule.group(0) if rule.group(1) in classes else "", stylesheet)
+
+
+def parse_stylesheet(stylesheet: str) -> dict[str, dict[str, str]]:
+    """Map the selectors of a Pygments stylesheet to their declarations."""
+    rules: dict[str, dict[str, str]] = {}
+    for rule in RULE.finditer(stylesheet):
+        declarations = (declaration.partition(":") for declaration in rule["declarations"].split(";"))
+        rules[rule["selector"]] = {name.strip(): value.strip() for name, _, value in declarations if name.strip()}
+    return rules
+
+
+def merge_stylesheets(light: str, dark: str) -> str:
+    """Merge the Pygments stylesheets for light and dark mode into one set of rules.
+
+    If both styles set a property to different values, the rule references a CSS variable.
+    The variable has the light value for ``:root`` and the dark value for ``:root.dark``.
+    Rules with the same pair of values share the variable.
+    Properties that only the light style sets apply in both modes, as before.
+    Properties that only the dark style sets go into an extra rule for dark mode.
+    The rules have the same specificity as the rules from Pygments,
+    so that the theme's CSS can still override them.
+    The merged stylesheet doesn't include the comments with the names of the tokens.
+    """
+    light_rules = parse_stylesheet(light)
+    dark_rules = parse_stylesheet(dark)
+
+    # Map pairs of light and dark values to the names of their variables, which are short to keep the file small
+    variables: dict[tuple[str, str], str] = {}
+    rules: list[str] = []
+    dark_only_rules: list[str] = []
+    for selector in {**light_rules, **dark_rules}:
+        light_declarations = light_rules.get(selector, {})
+        dark_declarations = dark_rules.get(selector, {})
+        declarations = []
+        dark_only = []
+        for name, value in light_declarations.items():
+            dark_value = dark_declarations.get(name, value)
+            if dark_value == value:
+                declarations.append(f"{name}: {value}")
+            elif CSS_WIDE_KEYWORDS.intersection([value, dark_value]):
+                # Variables can't hold keywords such as ``inherit``
+                declarations.append(f"{name}: {value}")
+                dark_only.append(f"{name}: {dark_value}")
+            else:
+                variable = variables.setdefault((value, dark_value), f"--pg-{len(variables)}")
+                declarations.append(f"{name}: var({variable})")
+        if declarations:
+            rules.append(f"{selector} {{ {'; '.join(declarations)} }}\n")
+
+        dark_only += [f"{name}: {value}" for name, value in dark_declarations.items() if name not in light_declarations]
+        if dark_only:
+            dark_selector = ", ".join(f":where(.dark) {part.strip()}" for part in selector.split(","))
+            dark_only_rules.append(f"{dark_selector} {{ {'; '.join(dark_only)} }}\n")
+
+    stylesheet = ""
+    if variables:
+        stylesheet += ":root {\n" + "".join(f"  {name}: {light};\n" for (light, _), name in variables.items()) + "}\n"
+        stylesheet += (
+            ":root.dark {\n" + "".join(f"  {name}: {dark};\n" for (_, dark), name in variables.items()) + "}\n"
+        )
+    return stylesheet + "".join(rules) + "".join(dark_only_rules)
+
+
+def get_pygments_stylesheet(builder: StandaloneHTMLBuilder, classes: Set[str] | None = None) -> str:
+    """Return the CSS for Pygments in light and dark mode.
+
+    If ``classes`` isn't ``None``, only include the rules for tokens with these classes.
+    """
+    stylesheet = builder.highlighter.get_stylesheet()
+    if classes is not None:
+        stylesheet = prune_stylesheet(stylesheet, classes)
+
+    dark_highlighter = getattr(builder, "dark_highlighter", None)
+    if not dark_highlighter:
+        return stylesheet
+
+    dark_stylesheet = dark_highlighter.get_stylesheet()
+    if classes is not None:
+        dark_stylesheet = prune_stylesheet(dark_stylesheet, classes)
+    return merge_stylesheets(stylesheet, dark_stylesheet)
+
+
+def is_pruning_enabled(app: Sphinx) -> bool:
+    """Check if the ``awesome_prune_pygments_css`` theme option is true for a builder with the theme's highlighter."""
+    if not isinstance(app.builder, StandaloneHTMLBuilder) or not isinstance(
+        getattr(app.builder, "highlighter", None), AwesomePygmentsBridge
+    ):
+        return False
+    return bool(logos.get_theme_options(app).get("awesome_prune_pygments_css", False))
+
+
+class CodeLanguageVisitor(HighlightLanguageVisitor):
+    """Find the code that Sphinx highlights and its language, without changing the document.
+
+    Sphinx sets the languages of the code blocks only before it writes the pages.
+    """
+
+    def __init__(self: CodeLanguageVisitor, document: nodes.document, config: Config) -> None:
+        """Start with the ``highlight_language`` configuration value."""
+        super().__init__(document, config.highlight_language)
+        self.trim_flags = config.trim_doctest_flags
+        self.code: list[tuple[str, str, dict[str, Any], Node]] = []
+
+    def trim_doctest_flags(self: CodeLanguageVisitor, node: nodes.Element) -> str:
+        """Return the code without the doctest flags, like Sphinx's ``TrimDoctestFlagsTransform``."""
+        # Import here, so that importing the theme doesn't import the extension
+        from sphinx.ext import doctest
+
+        source = node.rawsource
+        if node.get("trim_flags", self.trim_flags):
+            source = doctest.blankline_re.sub("", source)
+            source = doctest.doctestopt_re.sub("", source)
+        return source
+
+    def visit_literal_block(self: CodeLanguageVisitor, node: nodes.literal_block) -> None:
+        """Add a code block, unless it's a parsed literal block."""
+        if node.rawsource != node.astext():
+            return
+        language = node.get("language", self.settings[-1].language)
+        source = node.rawsource
+        if language in PYCON or (language in PYTHON and source.startswith(">>>")):
+            source = self.trim_doctest_flags(node)
+        self.code.append((source, language, node.get("highlight_args", {}), node))
+
+    def visit_doctest_block(self: CodeLanguageVisitor, node: nodes.doctest_block) -> None:
+        """Add a doctest block, which is highlighted as an interactive Python session."""
+        if node.rawsource == node.astext():
+            self.code.append((self.trim_doctest_flags(node), "default", {}, node))
+
+    def visit_literal(self: CodeLanguageVisitor, node: nodes.literal) -> None:
+        """Add inline code with a language."""
+        if "code" in node["classes"] and node.get("language"):
+            self.code.append((node.astext(), node["language"], {}, node))
+
+
+def get_code_classes(highlighter: AwesomePygmentsBridge, doctree: nodes.document, config: Config) -> set[str]:
+    """Return the CSS classes of the tokens in the code of a document."""
+    visitor = CodeLanguageVisitor(doctree, config)
+    doctree.walkabout(visitor)
+
+    classes: set[str] = set()
+    for source, language, highlight_args, node in visitor.code:
+        opts = dict(config.highlight_options.get(language, {}))
+        # The same options as in ``AwesomePygmentsBridge.highlight_block``
+        hl_text = get_list_opt(highlight_args, "hl_text", [])
+        if hl_text:
+            opts["hl_text"] = hl_text
+        classes |= highlighter.get_token_classes(source, language, opts, node)
+    return classes
+
+
+def purge_pygments_classes(app: Sphinx, env: BuildEnvironment, docname: str) -> None:
+    """Remove the CSS classes of a removed or changed document."""
+    getattr(env, "awesome_pygments_classes", {}).pop(docname, None)
+
+
+def get_module_classes(highlighter: AwesomePygmentsBridge, env: PygmentsBuildEnvironment) -> set[str]:
+    """Return the CSS classes of the tokens in the modules that ``sphinx.ext.viewcode`` writes pages for.
+
+    Only modules whose code changed are lexed again.
+    """
+    if not hasattr(env, "awesome_module_classes"):
+        env.awesome_module_classes = {}
+    module_classes = {}
+    # Modules without a page have the value ``False``
+    for modname, entry in getattr(env, "_viewcode_modules", {}).items():
+        if not entry:
+            continue
+        digest = hashlib.sha256(entry[0].encode("utf-8")).hexdigest()
+        known = env.awesome_module_classes.get(modname)
+        if known is None or known[0] != digest:
+            known = (digest, sorted(highlighter.get_token_classes(entry[0], "python")))
+        module_classes[modname] = known
+    # Forget the modules that were removed
+    env.awesome_module_classes = module_classes
+    return {name for _, classes in module_classes.values() for name in classes}
+
+
+def select_pygments_classes(app: Sphinx, env: BuildEnvironment) -> None:
+    """Select the CSS classes for ``pygments.css`` before Sphinx writes it and the pages.
+
+    The code of documents that were read in this build and of changed modules is lexed.
+    The other documents and modules keep their classes from earlier builds.
+    """
+    if not is_pruning_enabled(app):
+        return
+
+    builder = cast(AwesomeHTMLBuilder, app.builder)
+    highlighter = cast(AwesomePygmentsBridge, builder.highlighter)
+    env = cast(PygmentsBuildEnvironment, env)
+    if not hasattr(env, "awesome_pygments_classes"):
+        env.awesome_pygments_classes = {}
+    doc_classes = env.awesome_pygments_classes
+
+    used: set[str] = set()
+    for docname in sorted(env.all_docs):
+        if docname not in doc_classes:
+            doctree = env.get_doctree(docname)
+            doc_classes[docname] = sorted(get_code_classes(highlighter, doctree, app.config))
+        used.update(doc_classes[docname])
+    used |= get_module_classes(highlighter, env)
+    builder.pygments_classes = frozenset(used)
@@ -0,0 +1,230 @@
+"""Bundle the stylesheets and the deferred scripts into one file each.
+
+If the ``awesome_bundle_assets`` theme option is true,
+the pages load ``_static/awesome-bundle.css`` instead of the stylesheets of Sphinx,
+the theme, and the extensions, and ``_static/awesome-bundle.js`` instead of the deferred scripts.
+
+A bundle has the files in the order of their ``priority`` values.
+Only files that keep their meaning in a bundle are bundled:
+local files directly in the ``_static`` directory,
+stylesheets without other attributes, such as ``media``,
+and scripts with only the ``defer`` attribute.
+Every other file keeps its place between the bundles.
+If such a file has a priority between the priorities of bundled files,
+the files before and after it go into separate bundles,
+for example, ``awesome-bundle.css`` and ``awesome-bundle-2.css``.
+
+The bundles are written right after Sphinx copies the static files, before it writes the pages,
+so that the ``?v=`` checksum in the pages matches the content of the bundles.
+
+:copyright: Copyright Kai Welke.
+:license: MIT, see LICENSE for details.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, cast
+
+from sphinx.application import Sphinx
+from sphinx.builders.html import StandaloneHTMLBuilder
+
+from . import logos
+from .profiling import connect
+
+STATIC = "_static/"
+
+CSS_BUNDLE = "awesome-bundle.css"
+JS_BUNDLE = "awesome-bundle.js"
+
+# Strings are kept as they are, comments are removed, and whitespace is removed or collapsed
+CSS_TOKENS = re.compile(r"""("(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')|/\*.*?\*/|\s*([{};,])\s*|\s+""", re.DOTALL)
+CSS_CHARSET = re.compile(r'^\ufeff?(?:@charset\s+"[^"]*";)?')
+SOURCE_MAP = re.compile(r"^//[#@] sourceMappingURL=.*$", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class Bundle:
+    """A file with the content of other files in the ``_static`` directory."""
+
+    name: str
+    """The file name of the bundle in the ``_static`` directory."""
+    members: tuple[str, ...]
+    """The paths of the bundled files, relative to the output directory, in order."""
+    priority: int
+    """The priority of the first bundled file."""
+
+
+def bundle_name(name: str, index: int) -> str:
+    """Return the name of a bundle, with a number for the second and later bundles."""
+    if index == 0:
+        return name
+    stem, _, suffix = name.rpartition(".")
+    return f"{stem}-{index + 1}.{suffix}"
+
+
+def has_import(path: Path) -> bool:
+    """Check if a stylesheet imports other stylesheets, which only works at the start of a file."""
+    # Check the file again after it changed, for example, between builds in the same process
+    return _has_import(path, path.stat().st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=256)
+def _has_import(path: Path, mtime_ns: int) -> bool:
+    return b"@import" in path.read_bytes()
+
+
+def is_local(filename: str, outdir: Path) -> bool:
+    """Check if a file exists directly in the ``_static`` directory."""
+    return filename.startswith(STATIC) and "/" not in filename[len(STATIC) :] and (outdir / filename).is_file()
+
+
+def is_bundled_stylesheet(css: Any, outdir: Path) -> bool:  # noqa: ANN401
+    """Check if a stylesheet can be bundled."""
+    filename = os.fspath(css.filename)
+    return (
+        css.attributes == {"rel": "stylesheet", "type": "text/css"}
+        and is_local(filename, outdir)
+        and not has_import(outdir / filename)
+    )
+
+
+def is_bundled_script(js: Any, outdir: Path) -> bool:  # noqa: ANN401
+    """Check if a script can be bundled."""
+    return js.attributes == {"defer": "defer"} and bool(js.filename) and is_local(os.fspath(js.filename), outdir)
+
+
+def find_bundles(assets: list[Any], is_bundled: Callable[[Any], bool], name: str) -> list[Bundle]:
+    """Group the consecutive bundled files, in the order of their priorities."""
+    runs: list[list[Any]] = []
+    in_run = False
+    for asset in sorted(assets, key=lambda asset: asset.priority):
+        if not is_bundled(asset):
+            in_run = False
+        elif in_run:
+            runs[-1].append(asset)
+        else:
+            runs.append([asset])
+            in_run = True
+    return [
+        Bundle(bundle_name(name, index), tuple(os.fspath(asset.filename) for asset in run), run[0].priority)
+        for index, run in enumerate(runs)
+    ]
+
+
+def get_bundles(builder: StandaloneHTMLBuilder) -> tuple[list[Bundle], list[Bundle]]:
+    """Return the bundles of the stylesheets and scripts that every page loads."""
+    outdir = Path(builder.outdir)
+    # Sphinx keeps the files for all pages, before the pages add their own files
+    css_files = getattr(builder, "_orig_css_files", builder._css_files)
+    js_files = getattr(builder, "_orig_js_files", builder._js_files)
+    return (
+        find_bundles(css_files, lambda css: is_bundled_stylesheet(css, outdir), CSS_BUNDLE),
+        find_bundles(js_files, lambda js: is_bundled_script(js, outdir), JS_BUNDLE),
+    )
+
+
+def replace_assets(assets: list[Any], bundles: list[Bundle]) -> list[Any]:
+    """Replace the bundled files with their bundles, at the position of the first bundled file."""
+    members = {member: bundle for bundle in bundles for member in bundle.members}
+    output = []
+    added = set()
+    for asset in assets:
+        filename = getattr(asset, "filename", None)
+        bundle = members.get(os.fspath(filename)) if filename else None
+        if bundle is None:
+            output.append(asset)
+        elif bundle.name not in added:
+            added.add(bundle.name)
+            output.append(type(asset)(STATIC + bundle.name, priority=bundle.priority, **asset.attributes))
+    return output
+
+
+def minify_css(css: str) -> str:
+    """Remove comments and whitespace from a stylesheet."""
+
+    def replace(match: re.Match[str]) -> str:
+        string, punctuation = match.groups()
+        if string or punctuation:
+            return string or punctuation
+        return "" if match.group().startswith("/*") else " "
+
+    return CSS_TOKENS.sub(replace, CSS_CHARSET.sub("", css)).strip()
+
+
+def minify_js(js: str) -> str:
+    """Remove the reference to the source map from a script.
+
+    The scripts of the theme are minified when they're built.
+    """
+    return SOURCE_MAP.sub("", js).strip()
+
+
+def join_css(contents: list[str]) -> str:
+    """Join the minified stylesheets."""
+    return "".join(minify_css(css) for css in contents) + "\n"
+
+
+def join_js(contents: list[str]) -> str:
+    """Join the scripts, so that every script ends its last statement."""
+    return "".join(minify_js(js) + "\n;" for js in contents) + "\n"
+
+
+def is_enabled(app: Sphinx) -> bool:
+    """Check if the ``awesome_bundle_assets`` theme option is true for an HTML builder."""
+    if app.builder is None or app.builder.name not in ["html", "dirhtml"]:
+        return False
+    return bool(logos.get_theme_options(app).get("awesome_bundle_assets"))
+
+
+def write_bundles(builder: StandaloneHTMLBuilder) -> tuple[list[Bundle], list[Bundle]]:
+    """Write the bundles whose content changed and return the bundles of the stylesheets and scripts."""
+    outdir = Path(builder.outdir)
+    css_bundles, js_bundles = get_bundles(builder)
+    for bundles, join in [(css_bundles, join_css), (js_bundles, join_js)]:
+        for bundle in bundles:
+            content = join([(outdir / member).read_text(encoding="utf-8") for member in bundle.members])
+            path = outdir / STATIC / bundle.name
+            if not path.is_file() or path.read_text(encoding="utf-8") != content:
+                path.write_text(content, encoding="utf-8")
+    return css_bundles, js_bundles
+
+
+def setup_bundles(app: Sphinx) -> None:
+    """Write the bundles after Sphinx copied the static files, before it writes the pages.
+
+    The bundles don't change after they're written,
+    so the pages reference the same bundles without finding them again.
+    """
+    if not is_enabled(app):
+        return
+
+    builder = cast(StandaloneHTMLBuilder, app.builder)
+    copy_static_files = builder.copy_static_files
+    css_bundles: list[Bundle] = []
+    js_bundles: list[Bundle] = []
+
+    def copy_and_bundle() -> None:
+        copy_static_files()
+        css, js = write_bundles(builder)
+        css_bundles[:] = css
+        js_bundles[:] = js
+
+    def use_bundles(
+        app: Sphinx,
+        pagename: str,
+        templatename: str,
+        context: dict[str, Any],
+        doctree: Any,  # noqa: ANN401
+    ) -> None:
+        context["css_files"] = replace_assets(context["css_files"], css_bundles)
+        context["script_files"] = replace_assets(context["script_files"], js_bundles)
+
+    cast(Any, builder).copy_static_files = copy_and_bundle
+    # Reference the bundles after the other handlers added their files
+    connect(app, "html-page-context", use_bundles, priority=900)
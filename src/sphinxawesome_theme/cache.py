@@ -0,0 +1,139 @@
+"""A persistent, content-addressed cache on disk.
+
+The theme can cache the results of expensive steps across builds,
+even if the output directory is removed before each build.
+The results are stored in files whose names are the hashes of the inputs.
+Set the directory with the ``awesome_cache_dir`` theme option.
+
+Worker processes of parallel builds share the cache directory
+and the counters for the statistics.
+At the end of the build, the least recently used files are removed
+until the cache fits into the ``awesome_cache_max_size`` theme option.
+
+:copyright: Copyright Kai Welke.
+:license: MIT, see LICENSE for details.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import multiprocessing
+import os
+import tempfile
+from pathlib import Path
+
+from sphinx.application import Sphinx
+from sphinx.util import logging
+
+from . import logos
+
+logger = logging.getLogger(__name__)
+
+MEBIBYTE = 1024 * 1024
+
+
+class FileCache:
+    """A directory with cached text, addressed by the hash of the inputs."""
+
+    def __init__(self: FileCache, directory: Path | str, max_size: int, version: str = "") -> None:
+        """Create a cache in a directory with a maximum size in bytes.
+
+        The ``version`` of the theme is part of every key,
+        so that a new version of the theme doesn't use old results.
+        """
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.version = version
+        # Shared with the worker processes, which are forked from the main process
+        self.hits = multiprocessing.Value("i", 0)
+        self.misses = multiprocessing.Value("i", 0)
+
+    @classmethod
+    def from_app(cls: type[FileCache], app: Sphinx, name: str) -> FileCache | None:
+        """Create a cache in a subdirectory of the ``awesome_cache_dir`` theme option.
+
+        Relative paths are relative to the configuration directory.
+        Return ``None`` if the option isn't set.
+        """
+        from . import __version__
+
+        theme_options = logos.get_theme_options(app)
+        cache_dir = theme_options.get("awesome_cache_dir")
+        if not cache_dir:
+            return None
+        max_size = int(theme_options.get("awesome_cache_max_size", 256)) * MEBIBYTE
+        return cls(Path(app.confdir) / cache_dir / name, max_size, __version__)
+
+    def key(self: FileCache, *parts: str) -> str:
+        """Return the hash of the inputs and the version of the theme."""
+        digest = hashlib.sha256()
+        for part in (self.version, *parts):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def path(self: FileCache, key: str) -> Path:
+        """Return the path for a key."""
+        return self.directory / key[:2] / key[2:]
+
+    def get(self: FileCache, key: str) -> str | None:
+        """Return the cached text or ``None`` if it isn't cached."""
+        path = self.path(key)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except OSError:
+            with self.misses.get_lock():
+                self.misses.value += 1
+            return None
+
+        # Mark the file as recently used
+        os.utime(path)
+        with self.hits.get_lock():
+            self.hits.value += 1
+        return text
+
+    def set(self: FileCache, key: str, text: str) -> None:
+        """Store the text in the cache.
+
+        The text is written into a temporary file first,
+        so that other processes never read a partial file.
+        """
+        path = self.path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent, delete=False) as tmp:
+                tmp.write(text)
+            os.replace(tmp.name, path)
+        except OSError as err:
+            logger.warning("Can't write to the cache %s: %s", self.directory, err)
+
+    def evict(self: FileCache) -> int:
+        """Remove the least recently used files until the cache fits into the maximum size.
+
+        Return the number of removed files.
+        """
+        files = [(entry.stat(), entry) for entry in self.directory.glob("*/*") if entry.is_file()]
+        size = sum(stat.st_size for stat, _ in files)
+        removed = 0
+        for stat, entry in sorted(files, key=lambda item: item[0].st_mtime):
+            if size <= self.max_size:
+                break
+            entry.unlink(missing_ok=True)
+            size -= stat.st_size
+            removed += 1
+        return removed
+
+    def finish(self: FileCache, name: str) -> None:
+        """Remove old files and report the statistics of the build."""
+        removed = self.evict()
+        hits, misses = self.hits.value, self.misses.value
+        total = hits + misses
+        rate = f"{hits / total:.0%}" if total else "n/a"
+        logger.info(
+            "%s cache: %d hits, %d misses (hit rate %s), %d files evicted",
+            name,
+            hits,
+            misses,
+            rate,
+            removed,
+        )
@@ -5,6 +5,7 @@ New options:
 - ``:emphasize-added:``: highlight added lines
 - ``:emphasize-removed:``: highlight removed lines
 - ``:emphasize-text:``: highlight a single word, such as, a placeholder
+- ``:eager-lines:``: the number of lines that the browser renders right away
 
 :copyright: Copyright Kai Welke.
 :license: MIT, see LICENSE for details.
@@ -30,6 +31,7 @@ class AwesomeCodeBlock(CodeBlock):
     - ``:emphasize-added:`` highlight added lines
     - ``:emphasize-removed:`` highlight removed lines
     - ``:emphasize-text:`` highlight placeholder text
+    - ``:eager-lines:`` render only the first lines right away
 
     The job of the directive is to set the correct options for the ``literal_block`` node,
     which represents a code block in the parsed reStructuredText tree.
@@ -43,6 +45,7 @@ class AwesomeCodeBlock(CodeBlock):
         "emphasize-added": directives.unchanged_required,
         "emphasize-removed": directives.unchanged_required,
         "emphasize-text": directives.unchanged_required,
+        "eager-lines": directives.nonnegative_int,
     }
 
     option_spec = CodeBlock.option_spec
@@ -91,6 +94,8 @@ class AwesomeCodeBlock(CodeBlock):
             highlight_args["hl_removed"] = hl_removed
         if "emphasize-text" in self.options:
             highlight_args["hl_text"] = self.options["emphasize-text"]
+        if "eager-lines" in self.options:
+            highlight_args["eager_lines"] = self.options["eager-lines"]
 
     def run(self: AwesomeCodeBlock) -> list[Node]:
         """Handle parsing extra options for highlighting."""
@@ -0,0 +1,174 @@
+"""Write the static assets of the theme under names with a hash of their content.
+
+If the ``awesome_fingerprint_assets`` theme option is true,
+the theme copies its CSS and JavaScript files, the bundles, ``pygments.css``, and the logos
+to files with a hash of their content in their names,
+for example, ``_static/theme.3f2a9c1b7d4e.css``,
+and the pages reference the new names without Sphinx's ``?v=`` checksum.
+A file with the same name always has the same content,
+so that browsers and CDNs can cache it forever.
+
+The files are written right after Sphinx copies the static files, before it writes the pages,
+and the theme changes the names in the context of each page.
+The theme never removes files with hashed names,
+so cached pages from earlier builds still find their assets.
+
+:copyright: Copyright Kai Welke.
+:license: MIT, see LICENSE for details.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, cast
+
+from docutils.nodes import Node
+from sphinx.application import Sphinx
+from sphinx.builders.html import StandaloneHTMLBuilder
+from sphinx.util import isurl
+
+from . import bundle, logos
+from .profiling import connect
+
+THEME_ASSETS = [
+    "theme.css",
+    "theme.js",
+    "awesome-nav.js",
+    "awesome-sphinx-design.css",
+    "awesome-myst-nb.css",
+    "awesome-docsearch.css",
+    "pygments.css",
+]
+"""The files in the ``_static`` directory that get hashed names, in addition to the bundles and the logos."""
+
+HASH_LENGTH = 12
+
+STATIC = "_static/"
+
+CHECKSUM = re.compile(r'\?v=[0-9a-f]+(?=")')
+
+
+def fingerprinted_name(name: str, content: bytes) -> str:
+    """Insert the hash of the content before the extension of a file name."""
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    stem, dot, suffix = name.rpartition(".")
+    return f"{stem}.{digest}.{suffix}" if dot else f"{name}.{digest}"
+
+
+def get_assets(app: Sphinx) -> dict[str, Path]:
+    """Map the names of the theme's assets, the bundles, and the logos in the ``_static`` directory to their files.
+
+    The light and dark logos are copied only at the end of the build,
+    so their content comes from the configuration directory.
+    """
+    static_dir = Path(app.outdir) / "_static"
+    assets = {name: static_dir / name for name in THEME_ASSETS}
+    if bundle.is_enabled(app):
+        for bundles in bundle.get_bundles(cast(StandaloneHTMLBuilder, app.builder)):
+            assets.update((item.name, static_dir / item.name) for item in bundles)
+    theme_options = logos.get_theme_options(app)
+    for logo in [theme_options.get("logo_light"), theme_options.get("logo_dark")]:
+        if logo and not isurl(logo):
+            assets[os.path.basename(logo)] = Path(app.confdir) / logo
+    if app.config.html_logo and not isurl(app.config.html_logo):
+        name = os.path.basename(app.config.html_logo)
+        assets[name] = static_dir / name
+    return assets
+
+
+def write_fingerprinted_assets(static_dir: Path, assets: dict[str, Path]) -> dict[str, str]:
+    """Write the assets to files with hashed names and map the old names to the new names."""
+    hashed_names = {}
+    for name, path in assets.items():
+        if not path.is_file():
+            continue
+        content = path.read_bytes()
+        hashed_name = fingerprinted_name(name, content)
+        hashed_path = static_dir / hashed_name
+        if not hashed_path.exists():
+            hashed_path.write_bytes(content)
+        hashed_names[name] = hashed_name
+    return hashed_names
+
+
+def rename_assets(assets: list[Any], hashed_names: dict[str, str]) -> list[Any]:
+    """Replace the CSS and JavaScript files of a page with the files with hashed names."""
+    output = []
+    for asset in assets:
+        filename = os.fspath(getattr(asset, "filename", "") or "")
+        name = filename[len(STATIC) :] if filename.startswith(STATIC) else ""
+        if name in hashed_names:
+            asset = type(asset)(STATIC + hashed_names[name], priority=asset.priority, **asset.attributes)
+        output.append(asset)
+    return output
+
+
+def without_checksum(tag: Callable[[Any], str], hashed_names: dict[str, str]) -> Callable[[Any], str]:
+    """Remove Sphinx's ``?v=`` checksum from the tags of the assets with hashed names.
+
+    The names already change with the content.
+    """
+    hashed = {STATIC + name for name in hashed_names.values()}
+
+    def tag_without_checksum(asset: Any) -> str:  # noqa: ANN401
+        html = tag(asset)
+        if os.fspath(getattr(asset, "filename", "") or "") in hashed:
+            html = CHECKSUM.sub("", html, count=1)
+        return html
+
+    return tag_without_checksum
+
+
+def use_fingerprinted_names(context: dict[str, Any], hashed_names: dict[str, str]) -> None:
+    """Reference the assets and the logos with their hashed names in the context of a page."""
+    context["css_files"] = rename_assets(context["css_files"], hashed_names)
+    context["script_files"] = rename_assets(context["script_files"], hashed_names)
+    for key in ["css_tag", "js_tag"]:
+        if key in context:
+            context[key] = without_checksum(context[key], hashed_names)
+    for key in ["theme_logo_dark", "theme_logo_light"]:
+        if context.get(key) in hashed_names:
+            context[key] = hashed_names[context[key]]
+    # Sphinx already made the URL of ``html_logo`` relative to the page
+    head, static, name = (context.get("logo_url") or "").rpartition(STATIC)
+    if static and name in hashed_names:
+        context["logo_url"] = head + static + hashed_names[name]
+
+
+def is_enabled(app: Sphinx) -> bool:
+    """Check if the ``awesome_fingerprint_assets`` theme option is true for an HTML builder."""
+    if app.builder is None or app.builder.name not in ["html", "dirhtml"]:
+        return False
+    return bool(logos.get_theme_options(app).get("awesome_fingerprint_assets"))
+
+
+def setup_fingerprint(app: Sphinx) -> None:
+    """Write the assets under hashed names before Sphinx writes the pages, and reference them in the pages."""
+    if not is_enabled(app):
+        return
+
+    builder = cast(StandaloneHTMLBuilder, app.builder)
+    static_dir = Path(builder.outdir) / "_static"
+    copy_static_files = builder.copy_static_files
+    hashed_names: dict[str, str] = {}
+
+    def copy_and_fingerprint() -> None:
+        copy_static_files()
+        hashed_names.update(write_fingerprinted_assets(static_dir, get_assets(app)))
+
+    def use_hashed_names(
+        app: Sphinx,
+        pagename: str,
+        templatename: str,
+        context: dict[str, Any],
+        doctree: Node,
+    ) -> None:
+        use_fingerprinted_names(context, hashed_names)
+
+    cast(Any, builder).copy_static_files = copy_and_fingerprint
+    # Rename the assets after the other handlers added them and replaced them with the bundles
+    connect(app, "html-page-context", use_hashed_names, priority=950)
@@ -10,6 +10,22 @@ For highlighted lines, this extension uses ``<mark>``, ``<ins>``, and ``<del>``
 Define a new custom Pygments filter ``AwesomePlaceholders``,
 which wraps each encountered placeholder word in a ``Generic.Emphasized`` token,
 such that we can style placeholders by CSS.
+For many placeholders, the filter finds them with an Aho-Corasick automaton
+instead of a regular expression.
+
+If the ``awesome_cache_dir`` theme option is set,
+the highlighted code blocks are cached across builds,
+together with the CSS classes of their tokens.
+
+Code blocks with more lines than the ``awesome_linespans_max_lines`` theme option
+don't wrap each line in a ``<span>`` element,
+unless some of their lines are highlighted.
+
+Code blocks with more lines than the ``eager_lines`` option
+group the remaining lines into chunks with ``content-visibility: auto``.
+The browser only renders these chunks when they're close to the visible part of the page.
+The text stays in the page, so that copying the code,
+searching in the page, and links to ``#line-N`` still work.
 
 :copyright: Copyright Kai Welke.
 :license: MIT, see LICENSE for details.
@@ -18,19 +34,31 @@ such that we can style placeholders by CSS.
 from __future__ import annotations
 
 import contextlib
+import copy
+import functools
+import hashlib
+import logging as pylogging
 import re
-from collections.abc import Generator, Iterable, Iterator
+from collections.abc import Generator, Hashable, Iterable, Iterator
 from re import Pattern
 from typing import Any, Literal
 
+import pygments
+import sphinx
 from pygments.filter import Filter
 from pygments.formatters import HtmlFormatter
 from pygments.lexer import Lexer
+from pygments.lexers import DiffLexer
 from pygments.token import Generic, _TokenType
-from pygments.util import get_list_opt
+from pygments.util import get_int_opt, get_list_opt
+from sphinx.application import Sphinx
 from sphinx.highlighting import PygmentsBridge
 from sphinx.util import logging
 
+from . import logos
+from .cache import FileCache
+from .profiling import MEMORY, connect, describe_location, measure_memory
+
 logger = logging.getLogger(__name__)
 
 # type alias (Old notation for Python 3.9)
@@ -38,11 +66,10 @@ TokenType = _TokenType | int
 TokenStream = Generator[tuple[TokenType, str], None, None]
 
 
-def _replace_placeholders(ttype: TokenType, value: str, regex: Pattern[str]) -> TokenStream:
-    """Replace every occurence of ``regex`` with ``Generic.Emph`` token."""
+def _replace_placeholders(ttype: TokenType, value: str, spans: Iterable[tuple[int, int]]) -> TokenStream:
+    """Replace every span of ``value`` with a ``Generic.Emph`` token."""
     last = 0
-    for match in regex.finditer(value):
-        start, end = match.start(), match.end()
+    for start, end in spans:
         if start != last:
             yield ttype, value[last:start]
         yield Generic.Emph, value[start:end]
@@ -51,6 +78,87 @@ def _replace_placeholders(ttype: TokenType, value: str, regex: Pattern[str]) ->
         yield ttype, value[last:]
 
 
+def _regex_spans(regex: Pattern[str], value: str) -> Iterator[tuple[int, int]]:
+    """Return the spans of the matches of a regular expression."""
+    for match in regex.finditer(value):
+        yield match.span()
+
+
+class PlaceholderAutomaton:
+    """Find many placeholders at once with an Aho-Corasick automaton.
+
+    A regular expression with one alternative for each placeholder
+    tries every alternative at every position of the text.
+    The automaton reads every character only once,
+    no matter how many placeholders there are.
+
+    The matches are the same as for the regular expression ``a|b|...``:
+    they don't overlap, the leftmost match wins,
+    and for matches at the same position, the placeholder that comes first wins.
+    """
+
+    def __init__(self: PlaceholderAutomaton, placeholders: Iterable[str]) -> None:
+        """Build the automaton for the non-empty placeholders."""
+        # The trie of the placeholders: the transitions and the matches for each state
+        goto: list[dict[str, int]] = [{}]
+        matches: list[list[tuple[int, int]]] = [[]]
+        for index, placeholder in enumerate(placeholders):
+            if not placeholder:
+                continue
+            state = 0
+            for char in placeholder:
+                if char not in goto[state]:
+                    goto[state][char] = len(goto)
+                    goto.append({})
+                    matches.append([])
+                state = goto[state][char]
+            matches[state].append((index, len(placeholder)))
+
+        # Follow the failure links in breadth-first order,
+        # so that every state inherits the transitions and matches of its longest proper suffix
+        self.transitions: list[dict[str, int]] = [dict(goto[0])]
+        self.transitions.extend({} for _ in goto[1:])
+        self.matches = matches
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            self.transitions[state] = {**self.transitions[fail[state]], **goto[state]}
+            for char, child in goto[state].items():
+                fail[child] = self.transitions[fail[state]].get(char, 0)
+                self.matches[child] = self.matches[child] + self.matches[fail[child]]
+                queue.append(child)
+        # Bound methods are faster to call in the loop over the characters
+        self.lookups = [transition.get for transition in self.transitions]
+
+    def spans(self: PlaceholderAutomaton, value: str) -> Iterator[tuple[int, int]]:
+        """Return the spans of the placeholders in ``value``."""
+        lookups = self.lookups
+        matches = self.matches
+        # Map the start of every match to the index of the first placeholder and the end of the match
+        found: dict[int, tuple[int, int]] = {}
+        state = 0
+        # A counter is faster than ``enumerate`` here
+        end = 0
+        for char in value:
+            end += 1  # noqa: SIM113
+            state = lookups[state](char, 0)
+            if matches[state]:
+                for index, length in matches[state]:
+                    start = end - length
+                    if start not in found or index < found[start][0]:
+                        found[start] = (index, end)
+
+        last = 0
+        for start in sorted(found):
+            if start >= last:
+                last = found[start][1]
+                yield start, last
+
+
+AUTOMATON_THRESHOLD = 64
+"""The number of placeholders from which the filter uses the automaton."""
+
+
 class AwesomePlaceholders(Filter):
     """A Pygments filter for marking up placeholder text.
 
@@ -65,19 +173,39 @@ class AwesomePlaceholders(Filter):
     For more information, see the `Pygments documentation <https://pygments.org/docs/quickstart/>`__.
     """
 
-    def __init__(self, **options: str) -> None:
+    def __init__(self, **options: str | list[str]) -> None:
         """Create an instance of the ``AwesomePlaceholders`` filter."""
         Filter.__init__(self, **options)
-        placeholders = get_list_opt(options, "hl_text", [])
-        self.placeholders_re = re.compile(r"|".join([re.escape(x) for x in placeholders if x]))
+        placeholders = [x for x in get_list_opt(options, "hl_text", []) if x]
+        self.placeholders_re = re.compile(r"|".join([re.escape(x) for x in placeholders]))
+        self.automaton = PlaceholderAutomaton(placeholders) if len(placeholders) >= AUTOMATON_THRESHOLD else None
 
-    def filter(  # type: ignore
-        self, lexer: Any, stream: TokenStream
+    def filter(
+        self, lexer: Any, stream: Iterable[tuple[TokenType, str]]
     ) -> Iterator[tuple[_TokenType, str]]:
         """Filter on all tokens."""
-        regex = self.placeholders_re
+        if self.automaton is not None:
+            spans = self.automaton.spans
+        else:
+            spans = functools.partial(_regex_spans, self.placeholders_re)
         for ttype, value in stream:
-            yield from _replace_placeholders(ttype, value, regex)  # type: ignore
+            yield from _replace_placeholders(ttype, value, spans(value))  # type: ignore
+
+
+@functools.lru_cache(maxsize=256)
+def placeholder_filter(hl_text: tuple[str, ...]) -> AwesomePlaceholders:
+    """Return a filter for the placeholders.
+
+    The filter compiles its regular expression only once for each set of placeholders.
+    """
+    return AwesomePlaceholders(hl_text=list(hl_text))
+
+
+WRITE_CHUNK_SIZE: int = 1024
+"""The number of pieces of HTML that the formatter writes at once."""
+
+LAZY_CHUNK_LINES = 100
+"""The number of lines in each chunk that the browser renders when it's visible."""
 
 
 class AwesomeHtmlFormatter(HtmlFormatter):
@@ -99,16 +227,19 @@ class AwesomeHtmlFormatter(HtmlFormatter):
         return line_numbers
 
     def __init__(self, **options: Any) -> None:
-        """Implement `hl_added` and `hl_removed` options.
+        """Implement `hl_added`, `hl_removed`, and `eager_lines` options.
 
-        Also set the ``linespans`` and ``wrapcode`` options of the Pygments HTML formatter to ``True``.
+        Also set the ``linespans`` and ``wrapcode`` options of the Pygments HTML formatter,
+        unless the ``linespans`` option is already set.
         """
         self.added_lines = self._get_line_numbers(options, "hl_added")
         self.removed_lines = self._get_line_numbers(options, "hl_removed")
+        self.eager_lines = get_int_opt(options, "eager_lines", 0)
 
         # These options aren't compatible with `sphinx.ext.autodoc`
         # options["lineanchors"] = "code"
-        options["linespans"] = "line"
+        # The highlighter turns off the line spans for long code blocks
+        options.setdefault("linespans", "line")
         options["wrapcode"] = True
 
         super().__init__(**options)
@@ -130,6 +261,43 @@ class AwesomeHtmlFormatter(HtmlFormatter):
             else:
                 yield 1, value
 
+    def _wrap_lazy_lines(self, inner: TokenStream) -> TokenStream:
+        """Group the lines after the first ``eager_lines`` lines into chunks.
+
+        The ``--lines`` variable sets the height of a chunk before the browser renders it.
+        """
+        lines = 0
+        chunk: list[str] = []
+        chunk_lines = 0
+        for t, piece in inner:
+            # The pieces that complete a line have the token type ``1``
+            line_end = 1 if t == 1 else 0
+            if lines < self.eager_lines:
+                lines += line_end
+                yield t, piece
+                continue
+
+            chunk.append(piece)
+            chunk_lines += line_end
+            if chunk_lines == LAZY_CHUNK_LINES:
+                yield 1, f'<span class="lazy-lines" style="--lines: {chunk_lines}">{"".join(chunk)}</span>'
+                chunk.clear()
+                chunk_lines = 0
+        if chunk:
+            yield 1, f'<span class="lazy-lines" style="--lines: {chunk_lines}">{"".join(chunk)}</span>'
+
+    def _wrap_code(self, inner: TokenStream) -> TokenStream:
+        """Wrap the code in a ``<code>`` element.
+
+        Without line spans, the ``<code>`` element has the padding of the lines.
+        """
+        yield 0, "<code>" if self.linespans else '<code class="no-linespans">'
+        # The line numbers in a separate table column can't follow the chunks
+        if self.eager_lines and self.linenos != 1:
+            inner = self._wrap_lazy_lines(inner)
+        yield from inner
+        yield 0, "</code>"
+
     def format_unencoded(
         self,
         tokensource: Iterable[tuple[_TokenType, str]],
@@ -164,8 +332,56 @@ class AwesomeHtmlFormatter(HtmlFormatter):
             if self.full:
                 source = self._wrap_full(source, outfile)  # type: ignore
 
+        # Write the pieces in chunks, which is faster for long code blocks
+        chunk: list[str] = []
         for _, piece in source:
-            outfile.write(piece)
+            chunk.append(piece)
+            if len(chunk) == WRITE_CHUNK_SIZE:
+                outfile.write("".join(chunk))
+                chunk.clear()
+        outfile.write("".join(chunk))
+
+
+class _WarningRecorder(pylogging.Handler):
+    """Record if Sphinx logs warnings while highlighting a code block."""
+
+    def __init__(self: _WarningRecorder) -> None:
+        super().__init__(pylogging.WARNING)
+        self.warned = False
+
+    def emit(self: _WarningRecorder, record: pylogging.LogRecord) -> None:
+        self.warned = True
+
+
+@contextlib.contextmanager
+def _record_warnings() -> Generator[_WarningRecorder, None, None]:
+    """Record if Sphinx's highlighting module logs warnings."""
+    recorder = _WarningRecorder()
+    sphinx_logger = pylogging.getLogger("sphinx.sphinx.highlighting")
+    sphinx_logger.addHandler(recorder)
+    try:
+        yield recorder
+    finally:
+        sphinx_logger.removeHandler(recorder)
+
+
+def _lexer_key(source: str, lang: str, opts: dict[str, Any], force: bool) -> Hashable | None:
+    """Return a key for reusing a lexer, or ``None`` if the options aren't hashable."""
+    options = tuple(sorted((name, tuple(value) if isinstance(value, list) else value) for name, value in opts.items()))
+    # Sphinx uses a different lexer for interactive Python sessions
+    key = (lang, source.startswith(">>>"), options, force)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+# The maximum number of reused lexers and guessed languages
+LEXER_CACHE_SIZE = 4096
+
+# The classes of the elements in a highlighted code block
+CLASS_ATTRIBUTE = re.compile(r'\sclass="([^"]*)"')
 
 
 class AwesomePygmentsBridge(PygmentsBridge):
@@ -173,6 +389,27 @@ class AwesomePygmentsBridge(PygmentsBridge):
 
     html_formatter = AwesomeHtmlFormatter
 
+    cache: FileCache | None = None
+    """A persistent cache for the highlighted code blocks."""
+
+    linespans_max_lines: int = 0
+    """The maximum number of lines of code blocks with line spans, or ``0`` for no maximum."""
+
+    eager_lines: int = 0
+    """The number of lines that the browser renders right away for code blocks without the ``eager_lines`` option.
+
+    If ``0``, the browser renders all lines right away.
+    """
+
+    def __init__(self: AwesomePygmentsBridge, *args: Any, **kwargs: Any) -> None:
+        """Create the caches for lexers and for the CSS classes of token types."""
+        super().__init__(*args, **kwargs)
+        self.lexers: dict[Hashable, Lexer] = {}
+        self.guessed_lexers: dict[bytes, str] = {}
+        # The CSS classes for each token type, with the formatter that knows them
+        self.token_classes: dict[TokenType, list[str]] = {}
+        self.token_formatter: AwesomeHtmlFormatter | None = None
+
     def get_lexer(
         self: AwesomePygmentsBridge,
         source: str,
@@ -184,15 +421,84 @@ class AwesomePygmentsBridge(PygmentsBridge):
         """Extend the ``PygmentsBridge.get_lexer`` method.
 
         Adds a filter to lexers if the ``hl_text`` option is present.
+        Lexers are reused for code blocks with the same language and options.
+        For code blocks without a language, the guessed language is reused for the same code.
         """
-        lexer = super().get_lexer(source, lang, opts, force, location)
-        hl_text = opts.get("hl_text") if opts else None
-
+        opts = opts or {}
+        digest = None
+        if lang == "guess":
+            digest = hashlib.sha256(source.encode("utf-8")).digest()
+            lang = self.guessed_lexers.get(digest, lang)
+
+        # Lexers for code without a known guess depend on the code
+        key = _lexer_key(source, lang, opts, force) if lang != "guess" else None
+        lexer = self.lexers.get(key) if key is not None else None
+        if lexer is not None:
+            return lexer
+
+        with _record_warnings() as recorder:
+            lexer = super().get_lexer(source, lang, opts, force, location)
+
+        hl_text = get_list_opt(opts, "hl_text", [])
         if hl_text:
-            lexer.add_filter(AwesomePlaceholders(hl_text=hl_text))
-
+            # Sphinx shares some lexers between all code blocks
+            lexer = copy.copy(lexer)
+            lexer.filters = [*lexer.filters, placeholder_filter(tuple(hl_text))]
+
+        # Don't reuse lexers with warnings, so that every code block shows them
+        if recorder.warned:
+            return lexer
+        # Only guessed lexers with a name can be found again for the same code
+        if lang == "guess" and digest is not None and lexer.aliases and not source.startswith(">>>"):
+            if len(self.guessed_lexers) >= LEXER_CACHE_SIZE:
+                self.guessed_lexers.clear()
+            self.guessed_lexers[digest] = lexer.aliases[0]
+            key = _lexer_key(source, lexer.aliases[0], opts, force)
+        if key is not None:
+            if len(self.lexers) >= LEXER_CACHE_SIZE:
+                self.lexers.clear()
+            self.lexers[key] = lexer
         return lexer
 
+    def get_token_classes(
+        self: AwesomePygmentsBridge,
+        source: str,
+        lang: str,
+        opts: dict[str, Any] | None = None,
+        location: Any = None,
+    ) -> set[str]:
+        """Return the CSS classes of the tokens of a code block without formatting it.
+
+        The lexer doesn't stop at errors, like in Sphinx's relaxed mode,
+        so that the classes include the ones of every fallback.
+        Warnings appear only when the code block is highlighted.
+        If the highlighted code blocks are cached,
+        the classes are cached with them and the code isn't lexed again.
+        """
+        cache = self.cache
+        key = self.classes_key(source, lang, opts or {}) if cache is not None else ""
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return set(cached.split())
+
+        if self.token_formatter is None:
+            self.token_formatter = AwesomeHtmlFormatter(**self.formatter_args)
+        with logging.suppress_logging():
+            lexer = self.get_lexer(source, lang, opts, True, location)
+
+        classes: set[str] = set()
+        for ttype, _ in lexer.get_tokens(source):
+            token_classes = self.token_classes.get(ttype)
+            if token_classes is None:
+                token_classes = self.token_formatter._get_css_classes(ttype).split()  # type: ignore
+                self.token_classes[ttype] = token_classes
+            classes.update(token_classes)
+
+        if cache is not None:
+            cache.set(key, " ".join(sorted(classes)))
+        return classes
+
     def highlight_block(
         self: AwesomePygmentsBridge,
         source: str,
@@ -212,6 +518,117 @@ class AwesomePygmentsBridge(PygmentsBridge):
         hl_text = get_list_opt(kwargs, "hl_text", [])
 
         if hl_text:
-            opts["hl_text"] = hl_text
+            # Sphinx passes the options from the ``highlight_options`` configuration value
+            opts = {**opts, "hl_text": hl_text}
+
+        if not self.has_linespans(source, lang, kwargs):
+            kwargs = {**kwargs, "linespans": ""}
+        if self.eager_lines and "eager_lines" not in kwargs:
+            kwargs = {**kwargs, "eager_lines": self.eager_lines}
+
+        name = f"{describe_location(location)} ({lang})" if MEMORY.enabled else ""
+        with measure_memory("highlighting", name):
+            return self._highlight_block(source, lang, opts, force, location, **kwargs)
+
+    def has_linespans(self: AwesomePygmentsBridge, source: str, lang: str, kwargs: dict[str, Any]) -> bool:
+        """Check if the code block wraps its lines in ``<span>`` elements.
+
+        Code blocks with highlighted lines and diffs keep the line spans,
+        because the styles for these lines depend on them.
+        """
+        if not self.linespans_max_lines or source.count("\n") < self.linespans_max_lines:
+            return True
+        return lang in DiffLexer.aliases or any(kwargs.get(name) for name in ["hl_lines", "hl_added", "hl_removed"])
+
+    def _highlight_block(
+        self: AwesomePygmentsBridge,
+        source: str,
+        lang: str,
+        opts: dict[str, Any],
+        force: bool,
+        location: Any,
+        **kwargs: Any,
+    ) -> str:
+        """Highlight a code block or read it from the cache."""
+        if self.cache is None:
+            return super().highlight_block(source, lang, opts, force, location, **kwargs)
+
+        key = self.cache_key(source, lang, opts, force, kwargs)
+        highlighted = self.cache.get(key)
+        if highlighted is not None:
+            return highlighted
+
+        # Don't cache code blocks with warnings, so that the next build shows them again
+        with _record_warnings() as recorder:
+            highlighted = super().highlight_block(source, lang, opts, force, location, **kwargs)
+
+        if not recorder.warned:
+            self.cache.set(key, highlighted)
+            # The classes of the code that was actually highlighted, for pruning ``pygments.css`` in later builds
+            classes = {name for value in CLASS_ATTRIBUTE.findall(highlighted) for name in value.split()}
+            self.cache.set(self.classes_key(source, lang, opts), " ".join(sorted(classes)))
+        return highlighted
+
+    def cache_key(
+        self: AwesomePygmentsBridge,
+        source: str,
+        lang: str,
+        opts: dict[str, Any],
+        force: bool,
+        kwargs: dict[str, Any],
+    ) -> str:
+        """Return the cache key for a code block.
 
-        return super().highlight_block(source, lang, opts, force, location, **kwargs)
+        The key includes the options of the code block, the Pygments style,
+        and the versions of Pygments and Sphinx.
+        """
+        assert self.cache is not None  # noqa: S101
+        style = self.formatter_args.get("style")
+        return self.cache.key(
+            pygments.__version__,
+            sphinx.__version__,
+            f"{getattr(style, '__module__', '')}.{getattr(style, '__qualname__', style)}",
+            lang,
+            repr(sorted(opts.items())),
+            repr(force),
+            repr(sorted(kwargs.items())),
+            source,
+        )
+
+    def classes_key(self: AwesomePygmentsBridge, source: str, lang: str, opts: dict[str, Any]) -> str:
+        """Return the cache key for the CSS classes of the tokens of a code block.
+
+        The classes don't depend on the options for formatting the code block, such as line numbers.
+        """
+        assert self.cache is not None  # noqa: S101
+        return self.cache.key("classes", pygments.__version__, sphinx.__version__, lang, repr(sorted(opts.items())), source)
+
+
+def setup_highlight_cache(app: Sphinx) -> None:
+    """Cache the highlighted code blocks, if the ``awesome_cache_dir`` theme option is set."""
+    highlighter = getattr(app.builder, "highlighter", None)
+    if not isinstance(highlighter, AwesomePygmentsBridge):
+        return
+
+    cache = FileCache.from_app(app, "highlight")
+    if cache is None:
+        return
+    highlighter.cache = cache
+
+    def finish_cache(app: Sphinx, exc: Exception | None) -> None:
+        cache.finish("highlight")
+
+    connect(app, "build-finished", finish_cache)
+
+
+def setup_long_code_blocks(app: Sphinx) -> None:
+    """Set the options for long code blocks from the theme options.
+
+    - ``awesome_linespans_max_lines``: the maximum number of lines with line spans
+    - ``awesome_code_eager_lines``: the number of lines that the browser renders right away
+    """
+    highlighter = getattr(app.builder, "highlighter", None)
+    if isinstance(highlighter, AwesomePygmentsBridge):
+        theme_options = logos.get_theme_options(app)
+        highlighter.linespans_max_lines = int(theme_options.get("awesome_linespans_max_lines", 0))
+        highlighter.eager_lines = int(theme_options.get("awesome_code_eager_lines", 0))
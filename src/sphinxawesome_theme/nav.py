@@ -0,0 +1,217 @@
+"""Make the links in the navigation sidebar collapsible.
+
+The sidebar renders the navigation with the ``awesome_sidebar_toctree()`` helper,
+which wraps Sphinx's ``toctree()`` helper.
+The ``toctree()`` helper itself isn't changed for other templates.
+The navigation has the same structure on every page:
+only the URLs and the ``current`` classes change from page to page.
+
+Instead of transforming the navigation of every page with BeautifulSoup,
+the theme splits the rendered navigation into its structure,
+the tags and the text, and the attributes of the start tags.
+For each structure, it finds the collapsible links only once.
+For every page, it then adds the attributes to the start tags
+and inserts the buttons at positions it already knows.
+The post-processing then skips the navigation links of pages
+whose sidebar was rendered with this helper.
+
+If the ``awesome_nav_fragment`` theme option is true,
+the pages don't include the navigation at all.
+The theme writes the navigation once into ``_static/awesome-nav.html``,
+and the script ``awesome-nav.js`` loads it into the sidebar
+and marks the link of the current page.
+
+:copyright: Copyright Kai Welke.
+:license: MIT, see LICENSE for details.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, cast
+
+from docutils.nodes import Node
+from sphinx.application import Sphinx
+from sphinx.builders.html import StandaloneHTMLBuilder
+
+from . import logos
+from .icons import Icons
+from .sprite import sprite_url, use_icon
+
+START_TAG = re.compile(r"(<)([a-zA-Z][\w-]*)([^>]*)(>)")
+END_TAG = re.compile(r"</([a-zA-Z][\w-]*)\s*>")
+CLASS = re.compile(r'(\sclass=")([^"]*)(")')
+
+NAV_FRAGMENT = "awesome-nav.html"
+"""The file name of the navigation fragment in the ``_static`` directory."""
+
+SIDEBAR_COLLAPSIBLE = "awesome_sidebar_collapsible"
+"""The key in the context of a page that's true if the sidebar's navigation is already collapsible."""
+
+# Elements without end tags
+VOID_ELEMENTS = {"br", "hr", "img", "input", "meta", "link", "source", "wbr"}
+
+
+def collapsible_button(icon: str) -> str:
+    """Return the button that expands or collapses a nested list."""
+    return (
+        '<button type="button" @click.prevent.stop="expanded = !expanded" x-cloak="">'
+        f'<span class="sr-only"></span>{icon}</button>'
+    )
+
+
+COLLAPSIBLE_BUTTON = collapsible_button(Icons.chevron_right)
+
+
+@dataclass(frozen=True)
+class NavPlan:
+    """The changes that make the links of a navigation structure collapsible."""
+
+    texts: dict[int, str]
+    """Map the index of a start tag to the text before it, with the button inserted."""
+
+    patches: dict[int, str]
+    """Map the index of a start tag to the kind of change: ``li``, ``a``, or ``ul``."""
+
+
+def _patch(kind: str, attrs: str) -> str:
+    """Add the attributes for a collapsible link to the attributes of a start tag."""
+    if kind == "li":
+        return f"{attrs} x-data=\"{{ expanded: $el.classList.contains('current') ? true : false }}\""
+    if kind == "a":
+        if CLASS.search(attrs):
+            attrs = CLASS.sub(r"\1\2 expandable\3", attrs, count=1)
+        else:
+            attrs += ' class="expandable"'
+        return f'{attrs} @click="expanded = !expanded" :class="{{ \'expanded\' : expanded }}"'
+    # The nested list stays visible while Alpine.js loads if it contains the current page
+    match = CLASS.search(attrs)
+    if match and "current" in match.group(2).split():
+        return f'{attrs} x-show="expanded"'
+    return f'{attrs} x-show="expanded" x-cloak=""'
+
+
+@functools.lru_cache(maxsize=32)
+def get_plan(texts: tuple[str, ...], names: tuple[str, ...], button: str = COLLAPSIBLE_BUTTON) -> NavPlan:
+    """Find the collapsible links in a navigation structure.
+
+    A link is collapsible if a nested list directly follows it.
+    The ``texts`` are the pieces of HTML between the start tags with the given ``names``.
+    The ``button`` is inserted at the end of each collapsible link.
+    """
+    new_texts: dict[int, str] = {}
+    patches: dict[int, str] = {}
+    # Open elements as pairs of the index of the start tag and the tag name
+    stack: list[tuple[int, str]] = []
+
+    for index, name in enumerate(names):
+        # Close the elements with end tags in the text before the start tag
+        text = texts[index]
+        # The link whose end tag directly precedes the start tag
+        closed_link = None
+        for end in END_TAG.finditer(text):
+            closed = None
+            while stack:
+                start, open_name = stack.pop()
+                if open_name == end.group(1):
+                    closed = start
+                    break
+            closed_link = closed if end.group(1) == "a" and end.end() == len(text) else None
+
+        if name == "ul" and closed_link is not None:
+            patches[closed_link] = "a"
+            patches[index] = "ul"
+            if stack:
+                patches[stack[-1][0]] = "li"
+            new_texts[index] = text[: -len("</a>")] + button + "</a>"
+        if name not in VOID_ELEMENTS:
+            stack.append((index, name))
+
+    return NavPlan(new_texts, patches)
+
+
+def collapsible_nav(html: str, button: str = COLLAPSIBLE_BUTTON) -> str:
+    """Make the links in the navigation that have nested lists collapsible."""
+    # For each start tag, ``parts`` contains the text before it, ``<``, the name, the attributes, and ``>``
+    parts = START_TAG.split(html)
+    plan = get_plan(tuple(parts[0:-1:5]), tuple(parts[2::5]), button)
+
+    # Only change the parts of the collapsible links
+    for index, text in plan.texts.items():
+        parts[5 * index] = text
+    for index, kind in plan.patches.items():
+        parts[5 * index + 3] = _patch(kind, parts[5 * index + 3])
+    return "".join(parts)
+
+
+def setup_nav(
+    app: Sphinx,
+    pagename: str,
+    templatename: str,
+    context: dict[str, Any],
+    doctree: Node,
+) -> None:
+    """Add the ``awesome_sidebar_toctree()`` helper, which renders a collapsible navigation.
+
+    The helper marks the page in the context,
+    so that the post-processing doesn't change the navigation again.
+    """
+    toctree: Callable[..., str] | None = context.get("toctree")
+    if toctree is None:
+        return
+
+    button = COLLAPSIBLE_BUTTON
+    sprite = sprite_url(app.builder, pagename) if app.builder else ""
+    if sprite:
+        button = collapsible_button(use_icon(Icons.chevron_right, "chevron_right", sprite))
+
+    def sidebar_toctree(**kwargs: Any) -> str:  # noqa: ANN401
+        context[SIDEBAR_COLLAPSIBLE] = True
+        return collapsible_nav(toctree(**kwargs), button)
+
+    context["awesome_sidebar_toctree"] = sidebar_toctree
+
+
+def is_fragment_enabled(app: Sphinx) -> bool:
+    """Check if the ``awesome_nav_fragment`` theme option is true for an HTML builder."""
+    if app.builder is None or app.builder.name not in ["html", "dirhtml"]:
+        return False
+    return bool(logos.get_theme_options(app).get("awesome_nav_fragment"))
+
+
+def setup_nav_fragment(app: Sphinx) -> None:
+    """Add the script that loads the navigation fragment."""
+    if is_fragment_enabled(app):
+        app.add_js_file("awesome-nav.js", loading_method="defer")
+
+
+def write_nav_fragment(app: Sphinx, exc: Exception | None) -> None:
+    """Write the collapsible navigation once into the ``_static`` directory.
+
+    The links are relative to the root document.
+    The navigation is the same as the one from the ``awesome_sidebar_toctree()`` helper
+    in the ``sidebar_toc.html`` template, but without a current page.
+    """
+    if exc or not is_fragment_enabled(app):
+        return
+
+    builder = cast(StandaloneHTMLBuilder, app.builder)
+    root_doc = app.config.root_doc
+    includehidden = logos.get_theme_options(app).get("globaltoc_includehidden", True)
+    if isinstance(includehidden, str):
+        includehidden = includehidden.lower() in ["true", "1", "yes"]
+
+    # The same helper that renders the ``toctree()`` in the templates
+    html = builder._get_local_toctree(root_doc, collapse=False, titles_only=True, includehidden=includehidden)
+    sprite = sprite_url(builder, root_doc)
+    button = (
+        collapsible_button(use_icon(Icons.chevron_right, "chevron_right", sprite)) if sprite else COLLAPSIBLE_BUTTON
+    )
+
+    fragment = Path(app.outdir) / "_static" / NAV_FRAGMENT
+    fragment.parent.mkdir(parents=True, exist_ok=True)
+    fragment.write_text(collapsible_nav(html, button), encoding="utf-8")
@@ -4,13 +4,22 @@ Some modifications can be done more easily on the finished HTML.
 
 This module defines a simple pipeline:
 
-1. Read all HTML files
-2. Parse them with `BeautifulSoup`
-3. Perform a chain of actions on the tree in place
-
-See the `_modify_html()` function for the list of
+1. Render a page with the templates
+2. Parse the HTML with `BeautifulSoup`
+3. Walk the tree once and perform a chain of actions on the matching nodes in place
+4. Let Sphinx write the transformed HTML
+
+Each transformation registers one or more `Visitor` objects,
+which select the nodes the transformation is interested in.
+See the `get_visitors()` function for the list of
 transformations.
 
+If Sphinx runs in parallel mode (``-j``), the pages are
+transformed in the worker processes that write them.
+
+The ``streaming.py`` module applies the same transformations
+without building a tree.
+
 Note: This file is not processed by Webpack; don't use Tailwind utility classes.
 They might not show up in the final CSS.
 
@@ -20,203 +29,502 @@ They might not show up in the final CSS.
 
 from __future__ import annotations
 
+import functools
+import importlib.util
 import os
-import pathlib
-from dataclasses import dataclass
-from typing import cast
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, replace
+from typing import Any, cast
 
-from bs4 import BeautifulSoup, Comment
+from bs4 import BeautifulSoup, Comment, PageElement, Tag
 from sphinx.application import Sphinx
 from sphinx.builders.html import StandaloneHTMLBuilder
 from sphinx.environment import BuildEnvironment
-from sphinx.util.display import status_iterator
+from sphinx.util import logging
 
 from . import logos
+from .cache import FileCache
+from .icons import Icons
+from .nav import SIDEBAR_COLLAPSIBLE
+from .profiling import TIMINGS, connect, measure, measure_memory, timed
+from .sprite import sprite_url, use_icon
+
+logger = logging.getLogger(__name__)
 
 
 class AwesomeBuildEnvironment(BuildEnvironment):
-    """Build environment with tracked changed documents."""
+    """Build environment with the documents written in the current build."""
+
+    awesome_written_docs: set[str]
+    """The documents that were transformed and written in the current build."""
+
+
+@dataclass(frozen=True)
+class PostprocessOptions:
+    """Theme options that affect the post-processing.
+
+    The options are collected once, when the builder is initialized.
+    """
+
+    external_links: bool = False
+    """If true, add icons and ``rel`` attributes to external links."""
+
+    headerlinks: bool = False
+    """If true, headerlinks copy their URL on click."""
+
+    parser: str = "html.parser"
+    """The parser that BeautifulSoup uses to build the tree."""
+
+    engine: str = "tree"
+    """Either ``tree`` to transform a BeautifulSoup tree or ``stream`` to rewrite the HTML while reading it."""
+
+    translator: bool = False
+    """If true, the HTML translator already added the attributes to external links and headerlinks."""
+
+    sprite: str = ""
+    """The URL of the SVG sprite relative to the current page.
+
+    If empty, the icons are inlined.
+    """
+
+    collapsible_nav: bool = True
+    """If true, make the links in the left sidebar collapsible.
+
+    False for pages whose sidebar the ``awesome_sidebar_toctree()`` helper already made collapsible.
+    """
+
+    @classmethod
+    def from_app(cls: type[PostprocessOptions], app: Sphinx) -> PostprocessOptions:
+        """Collect the post-processing options from the theme options."""
+        # Import here, because the translator module imports from this module
+        from .translator import AwesomeHTMLTranslator
+
+        theme_options = logos.get_theme_options(app)
+        builder = app.builder
+        return cls(
+            external_links=bool(theme_options.get("awesome_external_links")),
+            headerlinks=bool(theme_options.get("awesome_headerlinks")),
+            parser=get_html_parser(theme_options.get("awesome_html_parser") or "html.parser"),
+            engine=get_engine(theme_options.get("awesome_postprocess_engine") or "tree"),
+            translator=isinstance(builder, StandaloneHTMLBuilder)
+            and issubclass(builder.get_translator_class(), AwesomeHTMLTranslator),
+        )
 
-    awesome_changed_docs: list[str]
+
+HTML_PARSERS = {"html.parser", "lxml"}
+"""The parsers you can select with the ``awesome_html_parser`` theme option."""
+
+
+def get_html_parser(name: str) -> str:
+    """Return the name of an available parser for BeautifulSoup.
+
+    Python's built-in ``html.parser`` is always available.
+    If the requested parser isn't installed, fall back to ``html.parser``.
+    """
+    if name not in HTML_PARSERS:
+        logger.warning("Unknown HTML parser %r. Use one of: %s.", name, ", ".join(sorted(HTML_PARSERS)))
+        return "html.parser"
+    if name != "html.parser" and importlib.util.find_spec(name) is None:
+        logger.warning("The HTML parser %r isn't installed. Falling back to 'html.parser'.", name)
+        return "html.parser"
+    return name
+
+
+ENGINES = {"tree", "stream"}
+"""The engines you can select with the ``awesome_postprocess_engine`` theme option."""
+
+
+def get_engine(name: str) -> str:
+    """Return the name of a post-processing engine.
+
+    If the requested engine is unknown, fall back to ``tree``.
+    """
+    if name not in ENGINES:
+        logger.warning("Unknown post-processing engine %r. Use one of: %s.", name, ", ".join(sorted(ENGINES)))
+        return "tree"
+    return name
+
+
+Handler = Callable[[BeautifulSoup, Any], None]
 
 
 @dataclass(frozen=True)
-class Icons:
-    """Icons from Material Design.
+class Visitor:
+    """Apply a handler to the nodes of the tree that match a simple selector.
 
-    See: https://material.io/resources/icons/
+    A visitor without a ``name``, ``class_``, or ``within`` selector matches every element.
     """
 
-    external_link: str = '<svg xmlns="http://www.w3.org/2000/svg" height="1em" width="1em" fill="currentColor" stroke="none" viewBox="0 96 960 960"><path d="M188 868q-11-11-11-28t11-28l436-436H400q-17 0-28.5-11.5T360 336q0-17 11.5-28.5T400 296h320q17 0 28.5 11.5T760 336v320q0 17-11.5 28.5T720 696q-17 0-28.5-11.5T680 656V432L244 868q-11 11-28 11t-28-11Z"/></svg>'
-    chevron_right: str = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24" width="18px" height="18px" stroke="none" fill="currentColor"><path d="M10 6L8.59 7.41 13.17 12l-4.58 4.59L10 18l6-6z"/></svg>'
-    permalinks_icon: str = '<svg xmlns="http://www.w3.org/2000/svg" height="1em" width="1em" viewBox="0 0 24 24"><path d="M3.9 12c0-1.71 1.39-3.1 3.1-3.1h4V7H7c-2.76 0-5 2.24-5 5s2.24 5 5 5h4v-1.9H7c-1.71 0-3.1-1.39-3.1-3.1zM8 13h8v-2H8v2zm9-6h-4v1.9h4c1.71 0 3.1 1.39 3.1 3.1s-1.39 3.1-3.1 3.1h-4V17h4c2.76 0 5-2.24 5-5s-2.24-5-5-5z"/></svg>'
+    handler: Handler
+    """A function that modifies the matching node in place."""
 
+    name: str | None = None
+    """Match elements with this tag name."""
 
-def changed_docs(app: Sphinx, env: BuildEnvironment, docnames: list[str]) -> None:
-    """Add a list of changed docs to the environment.
+    class_: str | None = None
+    """Match elements with this CSS class or with this exact ``class`` attribute.
 
-    This is useful to make sure postprocessing only runs on changed files.
+    This works like the ``class_`` argument of BeautifulSoup's ``find_all()`` method.
     """
-    del env
-    awesome_env = cast(AwesomeBuildEnvironment, app.env)
-    awesome_env.awesome_changed_docs = docnames
 
+    within: str | None = None
+    """Match only elements inside the element with this ``id``."""
+
+    comment: bool = False
+    """If true, match HTML comments instead of elements."""
+
+    def matches(self: Visitor, tag: Tag, scopes: frozenset[str]) -> bool:
+        """Check if the element matches the selector.
 
-def get_html_files(outdir: pathlib.Path | str) -> list[str]:
-    """Get a list of HTML files."""
-    html_list = []
-    for root, _, files in os.walk(outdir):
-        html_list.extend([os.path.join(root, file) for file in files if file.endswith(".html")])
-    return html_list
+        The ``scopes`` are the IDs of the ancestors of the element.
+        """
+        if self.name is not None and tag.name != self.name:
+            return False
+        if self.within is not None and self.within not in scopes:
+            return False
+        if self.class_ is not None:
+            classes = tag.get("class") or []
+            if self.class_ not in classes and " ".join(classes) != self.class_:
+                return False
+        return True
+
+
+def _visit_element(tree: BeautifulSoup, tag: Tag, visitors: list[Visitor], scopes: frozenset[str]) -> bool:
+    """Run the matching visitors on an element.
+
+    Return false if one of the visitors removed the element from the tree.
+    """
+    for visitor in visitors:
+        if visitor.matches(tag, scopes):
+            visitor.handler(tree, tag)
+            if tag.parent is None:
+                return False
+    return True
+
+
+def walk(tree: BeautifulSoup, visitors: Sequence[Visitor]) -> None:
+    """Walk the tree once and dispatch every node to the matching visitors.
+
+    The nodes are visited in document order.
+    For each node, the visitors run in the order in which they're registered,
+    and each visitor sees the changes made by the visitors before it.
+    The result is the same as running the transformations one after another,
+    but the tree is only traversed once.
+    """
+    element_visitors = [visitor for visitor in visitors if not visitor.comment]
+    comment_visitors = [visitor for visitor in visitors if visitor.comment]
+    scope_ids = {visitor.within for visitor in element_visitors if visitor.within is not None}
+    dispatch: dict[str, list[Visitor]] = {}
+
+    stack: list[tuple[PageElement, frozenset[str]]] = [(child, frozenset()) for child in reversed(tree.contents)]
+    while stack:
+        node, scopes = stack.pop()
+        if isinstance(node, Tag):
+            candidates = dispatch.get(node.name)
+            if candidates is None:
+                candidates = [visitor for visitor in element_visitors if visitor.name in (None, node.name)]
+                dispatch[node.name] = candidates
+            # Don't visit the children of nodes that a handler removed from the tree
+            if not _visit_element(tree, node, candidates, scopes):
+                continue
+            node_id = node.get("id")
+            if isinstance(node_id, str) and node_id in scope_ids:
+                scopes = scopes | {node_id}
+            # Collect the children after the handlers ran to include new nodes
+            stack.extend((child, scopes) for child in reversed(node.contents))
+        elif isinstance(node, Comment):
+            for visitor in comment_visitors:
+                visitor.handler(tree, node)
 
 
 # FIXME: The code works but I don't know how to fix the types
-def collapsible_nav(tree: BeautifulSoup) -> None:
-    """Make navigation links with children collapsible."""
-    for link in tree.select("#left-sidebar a"):
-        # Check if the link has "children"
-        children = link.next_sibling
-        if children and children.name == "ul":  # type: ignore
-            # State must be available in the link and the list
-            li = link.parent
-            if li:
-                li["x-data"] = "{ expanded: $el.classList.contains('current') ? true : false }"
-            link["@click"] = "expanded = !expanded"
-            # The expandable class is a hack because we can't use Tailwind
-            # I want to have _only_ expandable links with `justify-between`
-            link["class"].append("expandable")  # type: ignore
-            link[":class"] = "{ 'expanded' : expanded }"
-            children["x-show"] = "expanded"  # type: ignore
-            if "current" not in children.get("class", []):  # type: ignore
-                children["x-cloak"] = ""  # type: ignore
-
-            # Create a button with an icon inside to get focus behavior
-            button = tree.new_tag(
-                "button",
-                attrs={
-                    "type": "button",
-                    "@click.prevent.stop": "expanded = !expanded",
-                    "x-cloak": "",
-                },
-            )
-            label = tree.new_tag("span", attrs={"class": "sr-only"})
-            button.append(label)
+def _collapsible_nav_link(tree: BeautifulSoup, link: Tag, icon: str = Icons.chevron_right) -> None:
+    """Make a navigation link with children collapsible."""
+    # The navigation from the ``awesome_sidebar_toctree()`` helper is already collapsible
+    if "expandable" in link.get("class", []):
+        return
+    # Check if the link has "children"
+    children = link.next_sibling
+    if children and children.name == "ul":  # type: ignore
+        # State must be available in the link and the list
+        li = link.parent
+        if li:
+            li["x-data"] = "{ expanded: $el.classList.contains('current') ? true : false }"
+        link["@click"] = "expanded = !expanded"
+        # The expandable class is a hack because we can't use Tailwind
+        # I want to have _only_ expandable links with `justify-between`
+        link["class"].append("expandable")  # type: ignore
+        link[":class"] = "{ 'expanded' : expanded }"
+        children["x-show"] = "expanded"  # type: ignore
+        if "current" not in children.get("class", []):  # type: ignore
+            children["x-cloak"] = ""  # type: ignore
+
+        # Create a button with an icon inside to get focus behavior
+        button = tree.new_tag(
+            "button",
+            attrs={
+                "type": "button",
+                "@click.prevent.stop": "expanded = !expanded",
+                "x-cloak": "",
+            },
+        )
+        label = tree.new_tag("span", attrs={"class": "sr-only"})
+        button.append(label)
 
-            # create the icon
-            svg = BeautifulSoup(Icons.chevron_right, "html.parser").svg
-            if svg:
-                button.append(svg)
-            link.append(button)
+        # create the icon
+        svg = BeautifulSoup(icon, "html.parser").svg
+        if svg:
+            button.append(svg)
+        link.append(button)
 
 
-def remove_empty_toctree(tree: BeautifulSoup) -> None:
-    """Remove empty toctree divs.
+def _remove_empty_toctree(tree: BeautifulSoup, div: Tag) -> None:
+    """Remove an empty toctree div.
 
     If you include a `toctree` with the `hidden` option,
     an empty `div` is inserted. Remove them.
     The empty `div` contains a single `end-of-line` character.
     """
-    for div in tree("div", class_="toctree-wrapper"):
-        children = list(div.children)
-        if len(children) == 1 and not children[0].strip():
-            div.extract()
+    children = list(div.children)
+    if len(children) == 1 and not children[0].strip():  # type: ignore
+        div.extract()
+
+
+def _headerlink(tree: BeautifulSoup, link: Tag) -> None:
+    """Make a headerlink copy its URL on click."""
+    link["@click.prevent"] = (
+        "window.navigator.clipboard.writeText($el.href); $el.setAttribute('data-tooltip', 'Copied!'); setTimeout(() => $el.setAttribute('data-tooltip', 'Copy link to this element'), 2000)"
+    )
+    del link["title"]
+    link["aria-label"] = "Copy link to this element"
+    link["data-tooltip"] = "Copy link to this element"
+
+
+def _scrollspy_headerlink(tree: BeautifulSoup, link: Tag) -> None:
+    """Set the active section when a headerlink of a section or object scrolls into view."""
+    if link.parent.name in ["h2", "h3"] or (link.parent.name == "dt" and "sig" in link.parent.get("class", "")):  # type: ignore
+        active_link = link["href"]
+        link["x-intersect.margin.0%.0%.-70%.0%"] = f"activeSection = '{active_link}'"
+
+
+def _scrollspy_toc_link(tree: BeautifulSoup, link: Tag) -> None:
+    """Mark the link in the right sidebar as current when its section is active."""
+    active_link = link["href"]
+    link[":data-current"] = f"activeSection === '{active_link}'"
+
+
+def _external_link(tree: BeautifulSoup, link: Tag, icon: str = Icons.external_link) -> None:
+    """Add `rel="nofollow noopener"` and an icon to an external link.
+
+    The ``AwesomeHTMLTranslator`` adds the same attributes,
+    if no other extension replaces the HTML translator.
+    """
+    link["rel"] = "nofollow noopener"
+    # append icon
+    link.append(BeautifulSoup(icon, "html.parser").svg)  # type: ignore
+
+
+def _strip_comment(tree: BeautifulSoup, comment: Comment) -> None:
+    """Remove an HTML comment from the document."""
+    comment.extract()
+
+
+COLLAPSIBLE_NAV = (Visitor(_collapsible_nav_link, name="a", within="left-sidebar"),)
+EXTERNAL_LINKS = (Visitor(_external_link, name="a", class_="reference external"),)
+REMOVE_EMPTY_TOCTREE = (Visitor(_remove_empty_toctree, name="div", class_="toctree-wrapper"),)
+SCROLLSPY_HEADERLINKS = (Visitor(_scrollspy_headerlink, name="a", class_="headerlink"),)
+SCROLLSPY_TOC = (Visitor(_scrollspy_toc_link, name="a", within="right-sidebar"),)
+SCROLLSPY = (*SCROLLSPY_HEADERLINKS, *SCROLLSPY_TOC)
+HEADERLINKS = (Visitor(_headerlink, name="a", class_="headerlink"),)
+STRIP_COMMENTS = (Visitor(_strip_comment, comment=True),)
+
+
+def collapsible_nav(tree: BeautifulSoup) -> None:
+    """Make navigation links with children collapsible."""
+    walk(tree, COLLAPSIBLE_NAV)
+
+
+def remove_empty_toctree(tree: BeautifulSoup) -> None:
+    """Remove empty toctree divs."""
+    walk(tree, REMOVE_EMPTY_TOCTREE)
 
 
 def headerlinks(tree: BeautifulSoup) -> None:
     """Make headerlinks copy their URL on click."""
-    for link in tree("a", class_="headerlink"):
-        link["@click.prevent"] = (
-            "window.navigator.clipboard.writeText($el.href); $el.setAttribute('data-tooltip', 'Copied!'); setTimeout(() => $el.setAttribute('data-tooltip', 'Copy link to this element'), 2000)"
-        )
-        del link["title"]
-        link["aria-label"] = "Copy link to this element"
-        link["data-tooltip"] = "Copy link to this element"
+    walk(tree, HEADERLINKS)
 
 
 def scrollspy(tree: BeautifulSoup) -> None:
     """Add an active class to current TOC links in the right sidebar."""
-    for link in tree("a", class_="headerlink"):
-        if link.parent.name in ["h2", "h3"] or (link.parent.name == "dt" and "sig" in link.parent.get("class", "")):
-            active_link = link["href"]
-            link["x-intersect.margin.0%.0%.-70%.0%"] = f"activeSection = '{active_link}'"
-
-    for link in tree.select("#right-sidebar a"):
-        active_link = link["href"]
-        link[":data-current"] = f"activeSection === '{active_link}'"
+    walk(tree, SCROLLSPY)
 
 
 def external_links(tree: BeautifulSoup) -> None:
-    """Add `rel="nofollow noopener"` to external links.
-
-    The alternative was to copy `visit_reference` in the HTMLTranslator
-    and change literally one line.
-    """
-    for link in tree("a", class_="reference external"):
-        link["rel"] = "nofollow noopener"
-        # append icon
-        link.append(BeautifulSoup(Icons.external_link, "html.parser").svg)
+    """Add `rel="nofollow noopener"` to external links."""
+    walk(tree, EXTERNAL_LINKS)
 
 
 def strip_comments(tree: BeautifulSoup) -> None:
     """Remove HTML comments from documents."""
-    comments = tree.find_all(string=lambda text: isinstance(text, Comment))
-    for c in comments:
-        c.extract()
+    walk(tree, STRIP_COMMENTS)
 
 
-def modify_html(html_filename: os.PathLike[str] | str, app: Sphinx) -> None:
-    """Modify a single HTML document.
+def get_visitors(options: PostprocessOptions) -> list[Visitor]:
+    """Return the visitors for all enabled transformations in order.
 
-    1. The HTML document is parsed into a BeautifulSoup tree.
-    2. The modifications are performed in order and in place.
-    3. After these modifications, the HTML is written into a file,
-    overwriting the original file.
+    If the HTML translator already added the attributes to the links,
+    the transformations for external links and headerlinks are skipped.
+    If the navigation is already collapsible, its transformation is skipped.
+    """
+    visitors: list[Visitor] = []
+    if options.collapsible_nav and options.sprite:
+        handler = functools.partial(
+            _collapsible_nav_link, icon=use_icon(Icons.chevron_right, "chevron_right", options.sprite)
+        )
+        visitors.extend(replace(visitor, handler=handler) for visitor in COLLAPSIBLE_NAV)
+    elif options.collapsible_nav:
+        visitors.extend(COLLAPSIBLE_NAV)
+    if options.external_links and not options.translator:
+        if options.sprite:
+            icon = use_icon(Icons.external_link, "external_link", options.sprite)
+            handler = functools.partial(_external_link, icon=icon)
+            visitors.extend(replace(visitor, handler=handler) for visitor in EXTERNAL_LINKS)
+        else:
+            visitors.extend(EXTERNAL_LINKS)
+    visitors.extend(REMOVE_EMPTY_TOCTREE)
+    if not options.translator:
+        visitors.extend(SCROLLSPY_HEADERLINKS)
+    visitors.extend(SCROLLSPY_TOC)
+    if options.headerlinks and not options.translator:
+        visitors.extend(HEADERLINKS)
+    visitors.extend(STRIP_COMMENTS)
+    return visitors
+
+
+def timed_visitors(visitors: list[Visitor]) -> list[Visitor]:
+    """Measure the time of the visitors' handlers, if the ``awesome_build_report`` theme option is set."""
+    if not TIMINGS.enabled:
+        return visitors
+    timed_visitors = []
+    for visitor in visitors:
+        handler = visitor.handler
+        # The handlers with icons from the sprite are partial functions
+        if isinstance(handler, functools.partial):
+            handler = handler.func
+        name = getattr(handler, "__name__", repr(handler)).lstrip("_")
+        timed_visitors.append(replace(visitor, handler=timed(visitor.handler, "visitors", name)))
+    return timed_visitors
+
+
+def transform_html(html: str, options: PostprocessOptions) -> str:
+    """Apply the post-processing transformations to an HTML document.
+
+    With the ``tree`` engine, the document is parsed into a BeautifulSoup tree
+    and the modifications are performed in place during a single walk of the tree.
+    With the ``stream`` engine, the HTML is rewritten without building a tree.
+    """
+    if options.engine == "stream":
+        # Import here, because the streaming module imports from this module
+        from .streaming import rewrite
+
+        with measure("transforms", "stream"):
+            output = rewrite(html, options)
+    else:
+        with measure("transforms", "parse"):
+            tree = BeautifulSoup(html, options.parser)
+        with measure("transforms", "walk"):
+            walk(tree, timed_visitors(get_visitors(options)))
+        with measure("transforms", "serialize"):
+            output = str(tree)
+    return output
+
+
+def transform_cached(html: str, options: PostprocessOptions, cache: FileCache | None) -> str:
+    """Apply the post-processing transformations or return the result from the cache."""
+    if cache is None:
+        return transform_html(html, options)
+
+    key = cache.key(repr(options), html)
+    output = cache.get(key)
+    if output is None:
+        output = transform_html(html, options)
+        cache.set(key, output)
+    return output
+
+
+def modify_html(html_filename: os.PathLike[str] | str, options: PostprocessOptions) -> None:
+    """Modify a single HTML file in place.
+
+    The theme transforms the pages before Sphinx writes them.
+    Use this function for HTML files that were written without the theme.
     """
     with open(html_filename, encoding="utf-8") as html:
-        tree = BeautifulSoup(html, "html.parser")
-
-    theme_options = logos.get_theme_options(app)
-
-    collapsible_nav(tree)
-    if theme_options.get("awesome_external_links"):
-        external_links(tree)
-    remove_empty_toctree(tree)
-    scrollspy(tree)
-    if theme_options.get("awesome_headerlinks"):
-        headerlinks(tree)
-    strip_comments(tree)
+        content = html.read()
 
     with open(html_filename, "w", encoding="utf-8") as out_file:
-        out_file.write(str(tree))
-
-
-def post_process_html(app: Sphinx, exc: Exception | None) -> None:
-    """Modify the HTML after building.
-
-    Make some changes that are easier to do in the final HTML rather than
-    the tree of nodes.
-    This function requires, that the list of files to postprocess is in the
-    environment as ``app.env.awesome_changed_docs``.
+        out_file.write(transform_html(content, options))
+
+
+def post_process_pages(app: Sphinx) -> None:
+    """Transform the HTML of the documents before Sphinx writes them.
+
+    Wrap the template renderer of the builder,
+    so that every document is transformed in memory after rendering
+    and written only once.
+    If Sphinx writes in parallel mode (``-j``),
+    the transformations run in the same worker processes that write the documents.
+    Other pages, such as the search page or the index, aren't transformed.
+
+    The documents that Sphinx writes in this build are tracked
+    in ``app.env.awesome_written_docs``.
+    This includes documents that Sphinx writes without reading them again,
+    for example, because the toctree or the templates changed.
+    Every document in this set is transformed, because it's transformed while it's rendered.
+    Sphinx renders a document again from the templates every time it writes it,
+    so no document is transformed twice.
+
+    If the ``awesome_cache_dir`` theme option is set,
+    the transformed pages are cached across builds.
+    If the ``awesome_icon_sprite`` theme option is true,
+    the icons reference the SVG sprite relative to each page.
     """
-    if exc is not None:
-        return
-
-    if app.builder is not None and app.builder.name not in ["html", "dirhtml"]:
+    if app.builder is None or app.builder.name not in ["html", "dirhtml"]:
         return
 
     builder = cast(StandaloneHTMLBuilder, app.builder)
     env = cast(AwesomeBuildEnvironment, app.env)
+    options = PostprocessOptions.from_app(app)
+    cache = FileCache.from_app(app, "postprocess")
+    render = builder.templates.render
+    write_doc_serialized = builder.write_doc_serialized
+    env.awesome_written_docs = set()
+
+    def render_and_transform(template_name: str, context: dict[str, Any]) -> str:
+        output = render(template_name, context)
+        pagename = context.get("pagename")
+        if pagename in builder.env.all_docs:
+            page_options = replace(
+                options,
+                sprite=sprite_url(builder, pagename),
+                collapsible_nav=not context.get(SIDEBAR_COLLAPSIBLE),
+            )
+            with measure_memory("postprocess", pagename):
+                output = transform_cached(output, page_options, cache)
+        return output
 
-    files_to_postprocess = [builder.get_outfilename(doc) for doc in env.awesome_changed_docs]
+    def track_written_doc(docname: str, doctree: Any) -> None:  # noqa: ANN401
+        # Sphinx calls this method in the main process for every document it writes
+        env.awesome_written_docs.add(docname)
+        write_doc_serialized(docname, doctree)
 
-    if len(files_to_postprocess) == 0:
-        return
+    # Replace the methods of this builder only
+    cast(Any, builder.templates).render = render_and_transform
+    cast(Any, builder).write_doc_serialized = track_written_doc
+
+    if cache is not None:
+
+        def finish_cache(app: Sphinx, exc: Exception | None) -> None:
+            cache.finish("postprocess")
+
+        connect(app, "build-finished", finish_cache)
 
-    for doc in status_iterator(
-        files_to_postprocess,
-        "postprocess html... ",
-        "brown",
-        len(files_to_postprocess),
-        app.verbosity,
-    ):
-        modify_html(doc, app)
@@ -0,0 +1,409 @@
+"""Measure the time and the memory of the event handlers and the post-processing of the theme.
+
+Time
+----
+
+If the ``awesome_build_report`` theme option is set,
+the theme times every call of its event handlers
+and every step of the post-processing,
+and writes the results as JSON at the end of the build.
+The report has these keys:
+
+- ``builder``: the name of the builder
+- ``handlers``: the time of the event handlers, such as ``html-page-context:setup_nav``
+- ``transforms``: the time of parsing, walking, and serializing the pages,
+  or of rewriting them with the ``stream`` engine
+- ``visitors``: the time of each transformation during the walk, such as ``collapsible_nav_link``
+- ``pages``: the time of writing each page and the part of it that the theme takes
+- ``slowest_pages``: the pages where the theme takes the most time
+
+For each name, the report has the number of calls, the total time,
+and the percentiles of the time per call or per page in seconds.
+
+Memory
+------
+
+If the ``awesome_memory_report`` theme option is set,
+the theme traces the memory allocations with ``tracemalloc``
+while it post-processes each page and highlights each code block.
+For each page and code block, it records the peak of the allocated memory,
+and the memory that's still allocated afterwards, for example, for the result.
+At the end of the build, the theme logs the pages and code blocks with the highest peaks,
+and writes them as JSON.
+Tracing the memory allocations makes the build a lot slower.
+
+For both reports, pages are read and written in parallel by several processes.
+Each process appends one line for each page, code block, or call outside of pages
+to a file in the doctree directory.
+
+:copyright: Copyright Kai Welke.
+:license: MIT, see LICENSE for details.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import math
+import time
+import tracemalloc
+from collections import defaultdict
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, TypeVar, cast
+
+from sphinx.application import Sphinx
+from sphinx.builders.html import StandaloneHTMLBuilder
+from sphinx.util import logging
+
+from . import logos
+from .cache import MEBIBYTE
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+PERCENTILES = (50, 90, 99)
+
+SLOWEST_PAGES = 10
+"""The number of pages in the ``slowest_pages`` list of the report."""
+
+MEMORY_TOP = 10
+"""The number of pages and code blocks with the highest peaks in the memory report."""
+
+MEMORY_LOG_TOP = 5
+"""The number of pages and code blocks with the highest peaks in the build log."""
+
+
+class Timings:
+    """The times that the current process measured."""
+
+    enabled: bool = False
+    """If true, measure the times."""
+
+    records: Path | None = None
+    """The file with the times of the pages and of the calls outside of pages."""
+
+    page: dict[str, dict[str, float]] | None = None
+    """Map the kind and the name of a measurement to the total time for the current page."""
+
+    def add(self: Timings, kind: str, name: str, seconds: float) -> None:
+        """Add a measurement to the current page, or append a call outside of pages to the file.
+
+        Calls outside of pages, such as the handlers of the ``doctree-read`` event,
+        can run in the processes that read the documents in parallel,
+        so they're written to the file instead of being kept in memory.
+        """
+        if self.page is not None:
+            kind_times = self.page.setdefault(kind, {})
+            kind_times[name] = kind_times.get(name, 0.0) + seconds
+        else:
+            self.write(None, seconds, {kind: {name: seconds}})
+
+    def write(self: Timings, pagename: str | None, seconds: float, times: dict[str, dict[str, float]]) -> None:
+        """Append the times of a page, or of a call outside of pages without a page name, to the file."""
+        if self.records is None:
+            return
+        line = json.dumps([pagename, seconds, times]) + "\n"
+        with self.records.open("a", encoding="utf-8") as f:
+            f.write(line)
+
+    def reset(self: Timings) -> None:
+        """Stop measuring and forget the state of a previous build in the same process."""
+        self.enabled = False
+        self.records = None
+        self.page = None
+
+
+TIMINGS = Timings()
+
+
+class MemoryRecorder:
+    """Record the memory that the current process allocates."""
+
+    enabled: bool = False
+    """If true, measure the memory."""
+
+    started: bool = False
+    """If true, the theme started tracing the memory allocations and stops them after the build."""
+
+    records: Path | None = None
+    """The file with the peak and the retained memory of the pages and code blocks."""
+
+    def add(self: MemoryRecorder, kind: str, name: str, peak: int, retained: int) -> None:
+        """Append the memory of a page or a code block to the file."""
+        if self.records is None:
+            return
+        line = json.dumps([kind, name, peak, retained]) + "\n"
+        with self.records.open("a", encoding="utf-8") as f:
+            f.write(line)
+
+    def reset(self: MemoryRecorder) -> None:
+        """Stop measuring and forget the state of a previous build in the same process."""
+        if self.started and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.enabled = False
+        self.started = False
+        self.records = None
+
+
+MEMORY = MemoryRecorder()
+
+
+@contextmanager
+def measure(kind: str, name: str) -> Generator[None, None, None]:
+    """Measure the time of a block, if measuring is enabled."""
+    if not TIMINGS.enabled:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        TIMINGS.add(kind, name, time.perf_counter() - start)
+
+
+@contextmanager
+def measure_memory(kind: str, name: str) -> Generator[None, None, None]:
+    """Measure the peak and the retained memory of a block, if measuring the memory is enabled."""
+    if not MEMORY.enabled:
+        yield
+        return
+
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    try:
+        yield
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        MEMORY.add(kind, name, peak - start, current - start)
+
+
+def read_records(path: Path) -> list[Any]:
+    """Return the records of a file with one JSON value per line.
+
+    The processes append to the file while they run,
+    so a process that's stopped while writing can leave an incomplete line.
+    Skip the lines that aren't valid JSON.
+    """
+    records = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            logger.debug("Skipped an incomplete record in %s", path)
+    return records
+
+
+def describe_location(location: Any) -> str:  # noqa: ANN401
+    """Return the source file and line of a node, or of a tuple of a document name and a line."""
+    if location is None:
+        return "<unknown>"
+    if isinstance(location, tuple):
+        return ":".join(str(part) for part in location if part is not None)
+    return logging.get_node_location(location) or "<unknown>"
+
+
+def timed(func: F, kind: str, name: str) -> F:
+    """Measure the time of every call of a function, if measuring is enabled."""
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        if not TIMINGS.enabled:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            TIMINGS.add(kind, name, time.perf_counter() - start)
+
+    return cast(F, wrapper)
+
+
+def connect(app: Sphinx, event: str, handler: Callable[..., Any], priority: int = 500) -> None:
+    """Connect a handler to a Sphinx event and measure the time of its calls."""
+    name = getattr(handler, "__name__", repr(handler))
+    app.connect(event, timed(handler, "handlers", f"{event}:{name}"), priority=priority)
+
+
+def get_report_path(app: Sphinx) -> Path | None:
+    """Return the path of the report from the ``awesome_build_report`` theme option.
+
+    Relative paths are relative to the configuration directory.
+    Return ``None`` if the option isn't set or the builder doesn't write HTML pages.
+    """
+    report = logos.get_theme_options(app).get("awesome_build_report")
+    if not report or not isinstance(app.builder, StandaloneHTMLBuilder):
+        return None
+    return Path(app.confdir) / report
+
+
+def get_pages_file(app: Sphinx) -> Path:
+    """Return the file with the times of the pages written in this build."""
+    builder_name = app.builder.name if app.builder else ""
+    return Path(app.doctreedir) / f"awesome-timings-{builder_name}.jsonl"
+
+
+def setup_build_report(app: Sphinx) -> None:
+    """Start measuring, if the ``awesome_build_report`` theme option is set.
+
+    Wrap the method of the builder that writes a page,
+    so that the times of each page are recorded separately.
+    The times are kept in a module-level object,
+    which is reset for every build, for example, for several builds in the same process.
+    """
+    TIMINGS.reset()
+    if get_report_path(app) is None:
+        return
+
+    builder = cast(StandaloneHTMLBuilder, app.builder)
+    TIMINGS.records = get_pages_file(app)
+    TIMINGS.records.parent.mkdir(parents=True, exist_ok=True)
+    TIMINGS.records.write_text("", encoding="utf-8")
+    TIMINGS.enabled = True
+    handle_page = builder.handle_page
+
+    def timed_handle_page(pagename: str, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
+        TIMINGS.page = {}
+        start = time.perf_counter()
+        try:
+            handle_page(pagename, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            page, TIMINGS.page = TIMINGS.page, None
+            TIMINGS.write(pagename, seconds, page)
+
+    cast(Any, builder).handle_page = timed_handle_page
+
+
+def percentile(values: list[float], p: int) -> float:
+    """Return the nearest-rank percentile of sorted values."""
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+def summarize(values: list[float]) -> dict[str, Any]:
+    """Return the number of values, their total, and their percentiles."""
+    values = sorted(values)
+    summary: dict[str, Any] = {"calls": len(values), "total": sum(values)}
+    if values:
+        summary.update({f"p{p}": percentile(values, p) for p in PERCENTILES})
+        summary["max"] = values[-1]
+    return summary
+
+
+def get_report(app: Sphinx) -> dict[str, Any]:
+    """Combine the times of the pages and the other calls of all processes into a report."""
+    times: dict[str, dict[str, list[float]]] = defaultdict(lambda: defaultdict(list))
+    pages = []
+    for pagename, seconds, page in read_records(get_pages_file(app)):
+        for kind, names in page.items():
+            for name, page_seconds in names.items():
+                times[kind][name].append(page_seconds)
+        # Calls outside of pages have no page name
+        if pagename is None:
+            continue
+        # The visitors run during the walk, so their times are already included
+        theme = sum(sum(page.get(kind, {}).values()) for kind in ["handlers", "transforms"])
+        pages.append({"page": pagename, "time": seconds, "theme": theme})
+
+    slowest = sorted(pages, key=lambda page: page["theme"], reverse=True)[:SLOWEST_PAGES]
+    return {
+        "builder": app.builder.name if app.builder else "",
+        **{
+            kind: {name: summarize(times[kind][name]) for name in sorted(times[kind])}
+            for kind in ["handlers", "transforms", "visitors"]
+        },
+        "pages": {
+            "time": summarize([page["time"] for page in pages]),
+            "theme": summarize([page["theme"] for page in pages]),
+        },
+        "slowest_pages": slowest,
+    }
+
+
+def write_build_report(app: Sphinx, exc: Exception | None) -> None:
+    """Write the report after the other handlers of the ``build-finished`` event."""
+    report_path = get_report_path(app)
+    enabled, TIMINGS.enabled = TIMINGS.enabled, False
+    TIMINGS.records = None
+    if exc or report_path is None or not enabled:
+        return
+
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(get_report(app), indent=2) + "\n", encoding="utf-8")
+
+
+def get_memory_report_path(app: Sphinx) -> Path | None:
+    """Return the path of the report from the ``awesome_memory_report`` theme option.
+
+    Relative paths are relative to the configuration directory.
+    Return ``None`` if the option isn't set or the builder doesn't write HTML pages.
+    """
+    report = logos.get_theme_options(app).get("awesome_memory_report")
+    if not report or not isinstance(app.builder, StandaloneHTMLBuilder):
+        return None
+    return Path(app.confdir) / report
+
+
+def setup_memory_report(app: Sphinx) -> None:
+    """Start tracing the memory allocations, if the ``awesome_memory_report`` theme option is set."""
+    MEMORY.reset()
+    if get_memory_report_path(app) is None:
+        return
+
+    builder_name = app.builder.name if app.builder else ""
+    MEMORY.records = Path(app.doctreedir) / f"awesome-memory-{builder_name}.jsonl"
+    MEMORY.records.parent.mkdir(parents=True, exist_ok=True)
+    MEMORY.records.write_text("", encoding="utf-8")
+    MEMORY.enabled = True
+    MEMORY.started = not tracemalloc.is_tracing()
+    if MEMORY.started:
+        tracemalloc.start()
+
+
+def format_size(size: int) -> str:
+    """Return a number of bytes in MiB."""
+    return f"{size / MEBIBYTE:.1f} MiB"
+
+
+def get_memory_report(app: Sphinx, records: list[tuple[str, str, int, int]]) -> dict[str, Any]:
+    """Return the pages and code blocks with the highest peaks."""
+    report: dict[str, Any] = {"builder": app.builder.name if app.builder else ""}
+    for kind in ["postprocess", "highlighting"]:
+        kind_records = sorted((record for record in records if record[0] == kind), key=lambda record: -record[2])
+        report[kind] = {
+            "count": len(kind_records),
+            "peak": kind_records[0][2] if kind_records else 0,
+            "retained": sum(record[3] for record in kind_records),
+            "top": [{"name": name, "peak": peak, "retained": retained} for _, name, peak, retained in kind_records][
+                :MEMORY_TOP
+            ],
+        }
+    return report
+
+
+def write_memory_report(app: Sphinx, exc: Exception | None) -> None:
+    """Stop tracing the memory allocations, log the highest peaks, and write the report."""
+    report_path = get_memory_report_path(app)
+    enabled, MEMORY.enabled = MEMORY.enabled, False
+    if MEMORY.started:
+        tracemalloc.stop()
+        MEMORY.started = False
+    if exc or report_path is None or not enabled or MEMORY.records is None:
+        return
+
+    report = get_memory_report(app, read_records(MEMORY.records))
+    for kind in ["postprocess", "highlighting"]:
+        for record in report[kind]["top"][:MEMORY_LOG_TOP]:
+            logger.info(
+                "%s memory: peak %s, retained %s: %s",
+                kind,
+                format_size(record["peak"]),
+                format_size(record["retained"]),
+                record["name"],
+            )
+
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
@@ -0,0 +1,138 @@
+"""Reference icons from an SVG sprite instead of inlining them.
+
+By default, the theme inlines the full SVG markup of its icons
+on every external link, every collapsible link in the navigation,
+every headerlink, and for every icon in the header.
+If the ``awesome_icon_sprite`` theme option is true,
+the theme writes every icon once as a ``<symbol>`` into the file
+``_static/awesome-icons.svg``.
+The pages reference the icons with ``<svg><use href="..."></use></svg>``.
+Chromium-based browsers block these references for pages opened with ``file://`` URLs,
+so the icons are missing unless the pages are served by a web server.
+
+:copyright: Copyright Kai Welke.
+:license: MIT, see LICENSE for details.
+"""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Any
+
+from docutils.nodes import Node
+from sphinx.application import Sphinx
+from sphinx.util.osutil import relative_uri
+
+from . import logos
+from .icons import Icons
+
+ICON_SPRITE = "awesome-icons.svg"
+"""The file name of the sprite in the ``_static`` directory."""
+
+SVG = re.compile(r"\s*<svg\b([^>]*)>(.*)</svg>\s*", re.DOTALL)
+VIEWBOX = re.compile(r'\sviewBox="([^"]*)"')
+
+
+def icon_id(name: str) -> str:
+    """Return the ``id`` of the icon's symbol in the sprite."""
+    return "awesome-icon-" + name.replace("_", "-")
+
+
+def use_icon(svg: str, name: str, sprite: str) -> str:
+    """Reference an icon in the sprite instead of inlining its SVG markup.
+
+    The outer ``<svg>`` element keeps its attributes for the size and the color.
+    If ``sprite`` is empty, or if the icon isn't an SVG, return the icon unchanged.
+    """
+    match = SVG.fullmatch(svg)
+    if not sprite or not match:
+        return svg
+    attrs = VIEWBOX.sub("", match.group(1))
+    return f'<svg{attrs}><use href="{sprite}#{icon_id(name)}"></use></svg>'
+
+
+def to_symbol(svg: str, name: str) -> str | None:
+    """Convert the SVG markup of an icon into a ``<symbol>`` for the sprite."""
+    match = SVG.fullmatch(svg)
+    if not match:
+        return None
+    viewbox = VIEWBOX.search(match.group(1))
+    attrs = f' viewBox="{viewbox.group(1)}"' if viewbox else ""
+    return f'<symbol id="{icon_id(name)}"{attrs}>{match.group(2)}</symbol>'
+
+
+def is_enabled(theme_options: dict[str, Any]) -> bool:
+    """Check if the ``awesome_icon_sprite`` theme option is true."""
+    return bool(theme_options.get("awesome_icon_sprite"))
+
+
+def sprite_url(builder: Any, pagename: str) -> str:  # noqa: ANN401
+    """Return the URL of the sprite relative to a page, or an empty string if the sprite is disabled."""
+    if not is_enabled(builder.theme_options):
+        return ""
+    return relative_uri(builder.get_target_uri(pagename), f"_static/{ICON_SPRITE}")
+
+
+def header_icons(theme_options: dict[str, Any]) -> dict[str, str]:
+    """Map the names of the icons in the ``extra_header_link_icons`` theme option to their SVG markup."""
+    link_icons = theme_options.get("extra_header_link_icons")
+    if not isinstance(link_icons, dict):
+        return {}
+    return {
+        f"header_{index}": str(url["icon"])
+        for index, url in enumerate(link_icons.values())
+        if isinstance(url, dict) and "icon" in url
+    }
+
+
+def get_icons(app: Sphinx) -> dict[str, str]:
+    """Return the names and the SVG markup of all icons in the sprite."""
+    return {
+        "external_link": Icons.external_link,
+        "chevron_right": Icons.chevron_right,
+        "permalink": app.config.html_permalinks_icon,
+        **header_icons(logos.get_theme_options(app)),
+    }
+
+
+def setup_header_icons(
+    app: Sphinx,
+    pagename: str,
+    templatename: str,
+    context: dict[str, Any],
+    doctree: Node,
+) -> None:
+    """Reference the icons of the ``extra_header_link_icons`` theme option from the sprite."""
+    link_icons = context.get("theme_extra_header_link_icons")
+    if app.builder is None or not isinstance(link_icons, dict) or not is_enabled(logos.get_theme_options(app)):
+        return
+
+    sprite = sprite_url(app.builder, pagename)
+    context["theme_extra_header_link_icons"] = {
+        text: {**url, "icon": use_icon(str(url["icon"]), f"header_{index}", sprite)}
+        if isinstance(url, dict) and "icon" in url
+        else url
+        for index, (text, url) in enumerate(link_icons.items())
+    }
+
+
+def write_sprite(app: Sphinx, exc: Exception | None) -> None:
+    """Write the icons into the sprite in the ``_static`` directory."""
+    if (
+        exc
+        or app.builder is None
+        or app.builder.name not in ["html", "dirhtml"]
+        or not is_enabled(logos.get_theme_options(app))
+    ):
+        return
+
+    # Icons that aren't SVGs stay inline
+    symbols = [symbol for name, svg in get_icons(app).items() if (symbol := to_symbol(svg, name))]
+
+    sprite = Path(app.outdir) / "_static" / ICON_SPRITE
+    sprite.parent.mkdir(parents=True, exist_ok=True)
+    sprite.write_text(
+        '<svg xmlns="http://www.w3.org/2000/svg">\n' + "\n".join(symbols) + "\n</svg>\n",
+        encoding="utf-8",
+    )
@@ -0,0 +1 @@
+(()=>{function e(e){const t=new URL(e);return t.hash="",t.pathname=t.pathname.replace(/index\.html$/,""),t.href}function t(e,t){e.classList.add("current");for(let r=e.parentElement;r&&r!==t;r=r.parentElement)r.matches("li, ul")&&(r.classList.add("current"),r.removeAttribute("x-cloak"))}(async function(){const r=document.getElementById("awesome-nav");if(!r)return;const n=new URL(r.dataset.src,document.baseURI),a=new URL("..",n),o=await fetch(n);if(!o.ok)return;const c=document.createElement("template");c.innerHTML=await o.text();const l=c.content,s=e(window.location.href);for(const r of l.querySelectorAll("a[href]")){const n=new URL(r.getAttribute("href"),a);r.setAttribute("href",n.href),n.hash||e(n)!==s||t(r,l)}for(const e of l.querySelectorAll("use[href]"))e.setAttribute("href",new URL(e.getAttribute("href"),a).href);r.replaceChildren(l)})()})();
@@ -0,0 +1,431 @@
+"""Rewrite the HTML produced by Sphinx without building a tree.
+
+This module is an alternative to the BeautifulSoup engine in ``postprocess.py``.
+It reads the HTML with the tokenizer from Python's ``html.parser`` module
+and writes the rewritten HTML while it reads.
+Markup that doesn't change is copied verbatim,
+but text with only whitespace is collapsed like BeautifulSoup does,
+so that both engines produce the same text.
+
+A few tags are held back while the rewriter waits for the context that it needs,
+for example, to check if a navigation link is followed by a nested list.
+Everything else is passed on immediately.
+The theme rewrites the rendered page as one string,
+so the rewritten page is still kept in memory, but no tree is built.
+
+Select this engine with the ``awesome_postprocess_engine`` theme option.
+
+:copyright: Copyright Kai Welke.
+:license: MIT, see LICENSE for details.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from html import escape
+from html.parser import HTMLParser
+
+from .icons import Icons
+from .nav import collapsible_button
+from .postprocess import PostprocessOptions
+from .sprite import use_icon
+from .translator import HEADERLINK_CLICK
+
+# Elements without end tags
+VOID_ELEMENTS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "param",
+    "source",
+    "track",
+    "wbr",
+}
+
+# Elements whose descendants some transformations select
+SCOPE_IDS = {"left-sidebar", "right-sidebar"}
+
+# Elements in which BeautifulSoup keeps text with only whitespace as it is
+PRESERVE_WHITESPACE = {"pre", "textarea"}
+
+# The whitespace characters that BeautifulSoup collapses
+ASCII_SPACES = " \n\t\f\r"
+
+
+@dataclass(eq=False)
+class StartTag:
+    """A start tag that the rewriter can still change before writing it."""
+
+    name: str
+    attrs: dict[str, str | None]
+    text: str
+    held: int = 0
+    """The number of reasons to keep the tag in memory."""
+    changed: bool = False
+
+    def has_class(self: StartTag, class_: str) -> bool:
+        """Check the class like the ``class_`` argument of BeautifulSoup's ``find_all()`` method."""
+        classes = (self.attrs.get("class") or "").split()
+        return class_ in classes or " ".join(classes) == class_
+
+    def set(self: StartTag, name: str, value: str | None) -> None:
+        """Set an attribute."""
+        self.attrs[name] = value
+        self.changed = True
+
+    def remove(self: StartTag, name: str) -> None:
+        """Remove an attribute if it's present."""
+        if self.attrs.pop(name, None) is not None:
+            self.changed = True
+
+    def __str__(self: StartTag) -> str:
+        """Return the original text or serialize the changed tag."""
+        if not self.changed:
+            return self.text
+        attrs = "".join(
+            f" {name}" if value is None else f' {name}="{escape(value, quote=True)}"'
+            for name, value in self.attrs.items()
+        )
+        return f"<{self.name}{attrs}>"
+
+
+@dataclass(eq=False)
+class LinkEnd:
+    """The end tag of a link, before which the rewriter might insert markup."""
+
+    held: bool = True
+    before: list[str] = field(default_factory=list)
+
+    def __str__(self: LinkEnd) -> str:
+        """Return the inserted markup and the end tag."""
+        return "".join(self.before) + "</a>"
+
+
+Piece = str | StartTag | LinkEnd
+
+
+@dataclass(eq=False)
+class Element:
+    """An open element."""
+
+    start: StartTag
+    scopes: frozenset[str]
+    """The IDs of the ancestors of the element's children that a transformation selects."""
+    parent_hold: bool = False
+    """If true, the start tag is held because a link among the children might change it."""
+    link_end: LinkEnd | None = None
+
+    def release(self: Element) -> None:
+        """Release the start tag if it's held for a link among the children."""
+        if self.parent_hold:
+            self.parent_hold = False
+            self.start.held -= 1
+
+
+class AwesomeHTMLRewriter(HTMLParser):
+    """Apply the post-processing transformations to a stream of HTML.
+
+    Feed the HTML to the rewriter with the ``feed()`` method.
+    The rewritten HTML is passed to the ``write`` callback in pieces.
+    Call ``close()`` at the end to write the remaining HTML.
+    """
+
+    def __init__(self: AwesomeHTMLRewriter, write: Callable[[str], object], options: PostprocessOptions) -> None:
+        """Create a rewriter."""
+        super().__init__(convert_charrefs=False)
+        self.write = write
+        self.options = options
+        self.button = collapsible_button(use_icon(Icons.chevron_right, "chevron_right", options.sprite))
+        # Without the transformation of the navigation, the left sidebar is copied as it is
+        self.scope_ids = SCOPE_IDS if options.collapsible_nav else SCOPE_IDS - {"left-sidebar"}
+        self.stack: list[Element] = []
+        self.buffer: list[Piece] = []
+        # The index of the first piece in the buffer that isn't written yet
+        self.written = 0
+        # A link in the left sidebar that might be followed by a nested list
+        self.pending_link: Element | None = None
+        # A toctree wrapper that might only contain whitespace
+        self.pending_toctree: StartTag | None = None
+        self.pending_toctree_text = False
+        # The text since the last tag, which might be split at character references
+        self.text: list[str] = []
+        self.text_is_space = True
+
+    # -- Buffering
+
+    def append(self: AwesomeHTMLRewriter, piece: Piece) -> None:
+        """Add a piece of HTML and write everything that's no longer held."""
+        self.buffer.append(piece)
+        self.flush()
+
+    def flush(self: AwesomeHTMLRewriter) -> None:
+        """Write the pieces of HTML up to the first held piece.
+
+        The pieces before the first held piece were already checked,
+        so the search starts there instead of at the beginning of the buffer.
+        """
+        end = self.written
+        while end < len(self.buffer):
+            piece = self.buffer[end]
+            if not isinstance(piece, str) and piece.held:
+                break
+            end += 1
+        if end > self.written:
+            self.write("".join(map(str, self.buffer[self.written : end])))
+            self.written = end
+        if self.written == len(self.buffer):
+            self.buffer.clear()
+            self.written = 0
+
+    def close(self: AwesomeHTMLRewriter) -> None:
+        """Process the remaining HTML and write everything."""
+        super().close()
+        if self.text:
+            self.end_text()
+        self.before_node()
+        for piece in self.buffer[self.written :]:
+            if not isinstance(piece, str):
+                piece.held = False
+        self.flush()
+
+    # -- Context for the transformations
+
+    def before_node(self: AwesomeHTMLRewriter, start: StartTag | None = None, end: str | None = None) -> None:
+        """Resolve the pending decisions before the next node.
+
+        Pass the ``start`` tag or the name of the ``end`` tag of the next node, if it's a tag.
+        """
+        if self.pending_link is not None:
+            link = self.pending_link
+            self.pending_link = None
+            self.resolve_link(link, start if start is not None and start.name == "ul" else None)
+
+        if self.pending_toctree is not None and not (end == "div" and self.pending_toctree_text):
+            self.pending_toctree.held -= 1
+            self.pending_toctree = None
+
+        # Parents in the left sidebar are held until another element or their end tag follows
+        if self.stack and (end is not None or (start is not None and start.name != "a")):
+            self.stack[-1].release()
+
+    def resolve_link(self: AwesomeHTMLRewriter, link: Element, children: StartTag | None) -> None:
+        """Make a link in the left sidebar collapsible if it's followed by a nested list."""
+        link.start.held -= 1
+        if link.link_end is not None:
+            link.link_end.held = False
+        # The navigation from the ``awesome_sidebar_toctree()`` helper is already collapsible
+        if children is None or link.start.has_class("expandable"):
+            return
+
+        parent = self.stack[-1].start if self.stack else None
+        if parent is not None:
+            parent.set("x-data", "{ expanded: $el.classList.contains('current') ? true : false }")
+        link.start.set("@click", "expanded = !expanded")
+        link.start.set("class", " ".join([*(link.start.attrs.get("class") or "").split(), "expandable"]))
+        link.start.set(":class", "{ 'expanded' : expanded }")
+        children.set("x-show", "expanded")
+        if "current" not in (children.attrs.get("class") or "").split():
+            children.set("x-cloak", "")
+        if link.link_end is not None:
+            link.link_end.before.insert(0, self.button)
+
+    def start_link(self: AwesomeHTMLRewriter, start: StartTag, scopes: frozenset[str]) -> None:
+        """Change the start tag of a link."""
+        if "left-sidebar" in scopes:
+            # Wait until the next sibling of the link is known
+            start.held += 1
+        # The translator already changed external links and headerlinks
+        if not self.options.translator:
+            if self.options.external_links and start.has_class("reference external"):
+                start.set("rel", "nofollow noopener")
+            if start.has_class("headerlink"):
+                self.start_headerlink(start)
+        if "right-sidebar" in scopes and "href" in start.attrs:
+            start.set(":data-current", f"activeSection === '{start.attrs['href']}'")
+
+    def start_headerlink(self: AwesomeHTMLRewriter, start: StartTag) -> None:
+        """Change the start tag of a headerlink."""
+        parent = self.stack[-1].start if self.stack else None
+        if parent is not None and (
+            parent.name in ["h2", "h3"] or (parent.name == "dt" and "sig" in (parent.attrs.get("class") or "").split())
+        ):
+            start.set("x-intersect.margin.0%.0%.-70%.0%", f"activeSection = '{start.attrs.get('href')}'")
+        if self.options.headerlinks:
+            start.set("@click.prevent", HEADERLINK_CLICK)
+            start.remove("title")
+            start.set("aria-label", "Copy link to this element")
+            start.set("data-tooltip", "Copy link to this element")
+
+    # -- Events from the tokenizer
+
+    def handle_starttag(self: AwesomeHTMLRewriter, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        """Handle a start tag."""
+        if self.text:
+            self.end_text()
+        self.start_element(tag, attrs, void=tag in VOID_ELEMENTS)
+
+    def handle_startendtag(self: AwesomeHTMLRewriter, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        """Handle an empty element tag, such as ``<br/>``."""
+        if self.text:
+            self.end_text()
+        self.start_element(tag, attrs, void=True)
+
+    def start_element(self: AwesomeHTMLRewriter, tag: str, attrs: list[tuple[str, str | None]], void: bool) -> None:
+        """Change a start tag and open the element."""
+        start = StartTag(tag, dict(attrs), self.get_starttag_text() or "")
+        self.before_node(start=start)
+
+        scopes = self.stack[-1].scopes if self.stack else frozenset()
+        if tag == "a":
+            self.start_link(start, scopes)
+        elif tag == "div" and start.has_class("toctree-wrapper") and not void:
+            start.held += 1
+            self.pending_toctree = start
+            self.pending_toctree_text = False
+
+        if void:
+            self.append(start)
+            return
+
+        element_id = start.attrs.get("id")
+        child_scopes = scopes | {element_id} if element_id in self.scope_ids else scopes
+        element = Element(start, child_scopes)
+        if "left-sidebar" in child_scopes and tag != "a":
+            # A link among the children might need to change this tag
+            start.held += 1
+            element.parent_hold = True
+        self.append(start)
+        self.stack.append(element)
+
+    def handle_endtag(self: AwesomeHTMLRewriter, tag: str) -> None:
+        """Handle an end tag and close the element."""
+        if self.text:
+            self.end_text()
+        if self.pending_toctree is not None and tag == "div" and self.pending_toctree_text:
+            # Remove the toctree wrapper that only contains whitespace
+            index = next(i for i in range(self.written, len(self.buffer)) if self.buffer[i] is self.pending_toctree)
+            del self.buffer[index:]
+            self.pending_toctree = None
+            self.stack.pop()
+            self.flush()
+            return
+
+        self.before_node(end=tag)
+        if not any(element.start.name == tag for element in self.stack):
+            # Stray end tag
+            self.append(f"</{tag}>")
+            return
+
+        while self.stack:
+            element = self.stack.pop()
+            element.release()
+            if element.start.name == tag:
+                break
+            if element.start.name == "a" and element.start.held:
+                # A link without an end tag
+                self.resolve_link(element, None)
+
+        if tag == "a":
+            self.end_link(element)
+        else:
+            self.append(f"</{tag}>")
+
+    def end_link(self: AwesomeHTMLRewriter, link: Element) -> None:
+        """Close a link and insert icons before its end tag."""
+        link_end = LinkEnd(held=False)
+        if self.options.external_links and not self.options.translator and link.start.has_class("reference external"):
+            link_end.before.append(use_icon(Icons.external_link, "external_link", self.options.sprite))
+        if self.stack and "left-sidebar" in self.stack[-1].scopes:
+            # The start tag is still held until the next sibling is known
+            link_end.held = True
+            link.link_end = link_end
+            self.pending_link = link
+        self.append(link_end)
+
+    def handle_data(self: AwesomeHTMLRewriter, data: str) -> None:
+        """Collect text."""
+        self.text.append(data)
+        if self.text_is_space and data.strip(ASCII_SPACES):
+            self.text_is_space = False
+
+    def handle_entityref(self: AwesomeHTMLRewriter, name: str) -> None:
+        """Collect a named character reference as it is."""
+        self.text.append(f"&{name};")
+        self.text_is_space = False
+
+    def handle_charref(self: AwesomeHTMLRewriter, name: str) -> None:
+        """Collect a numeric character reference as it is."""
+        self.text.append(f"&#{name};")
+        self.text_is_space = False
+
+    def end_text(self: AwesomeHTMLRewriter) -> None:
+        """Write the text since the last tag.
+
+        Like BeautifulSoup, replace text with only whitespace with a line break or a space,
+        except inside ``<pre>`` and ``<textarea>`` elements.
+        """
+        if not self.text:
+            return
+        text = "".join(self.text)
+        is_space = self.text_is_space
+        self.text.clear()
+        self.text_is_space = True
+        if is_space and not any(element.start.name in PRESERVE_WHITESPACE for element in self.stack):
+            text = "\n" if "\n" in text else " "
+
+        if self.pending_toctree is not None and is_space:
+            self.pending_toctree_text = True
+            self.append(text)
+            return
+        self.before_node()
+        self.append(text)
+
+    def handle_comment(self: AwesomeHTMLRewriter, data: str) -> None:
+        """Remove comments."""
+        if self.text:
+            self.end_text()
+        self.before_node()
+
+    def handle_decl(self: AwesomeHTMLRewriter, decl: str) -> None:
+        """Copy a declaration, such as the doctype.
+
+        Like BeautifulSoup, write the doctype in upper case, followed by a line break.
+        """
+        if self.text:
+            self.end_text()
+        self.before_node()
+        if decl[: len("DOCTYPE ")].upper() == "DOCTYPE ":
+            self.append(f"<!DOCTYPE {decl[len('DOCTYPE ') :]}>\n")
+        else:
+            self.append(f"<!{decl}>")
+
+    def handle_pi(self: AwesomeHTMLRewriter, data: str) -> None:
+        """Copy a processing instruction."""
+        if self.text:
+            self.end_text()
+        self.before_node()
+        self.append(f"<?{data}>")
+
+    def unknown_decl(self: AwesomeHTMLRewriter, data: str) -> None:
+        """Copy a CDATA section."""
+        if self.text:
+            self.end_text()
+        self.before_node()
+        self.append(f"<![{data}]>")
+
+
+def rewrite(html: str, options: PostprocessOptions) -> str:
+    """Rewrite an HTML document in memory."""
+    pieces: list[str] = []
+    rewriter = AwesomeHTMLRewriter(pieces.append, options)
+    rewriter.feed(html)
+    rewriter.close()
+    return "".join(pieces)
@@ -1,29 +1,56 @@
 """Manipulate the on-page TOC.
 
+The on-page TOC is rendered directly from the ``bullet_list`` nodes of the TOC
+instead of publishing each TOC with a docutils HTML writer.
+The TOC of each document is rendered while the document is read,
+in the worker processes if Sphinx reads in parallel mode (``-j``),
+and cached in the environment until the document is read again.
+
 :copyright: Kai Welke.
 :license: MIT
 """
 
 from __future__ import annotations
 
-from typing import Any
+from collections.abc import Set
+from typing import Any, cast
 
 from docutils import nodes
 from docutils.nodes import Node
+from sphinx import addnodes
 from sphinx.application import Sphinx
 from sphinx.builders.html import StandaloneHTMLBuilder
+from sphinx.environment import BuildEnvironment
 from sphinx.environment.adapters.toctree import TocTree
 from sphinx.util.docutils import new_document
 
 
-def change_toc(
-    app: Sphinx,
-    pagename: str,
-    _templatename: str,
-    context: dict[str, Any],
-    _doctree: Node,
-) -> None:
-    """Change the way the `{{ toc }}` helper works.
+class TocBuildEnvironment(BuildEnvironment):
+    """Build environment with the rendered on-page TOCs."""
+
+    awesome_tocs: dict[str, str]
+    """Map document names to their rendered TOCs."""
+
+
+# Same as the HTML writers of docutils
+SPECIAL_CHARACTERS = {ord("&"): "&amp;", ord("<"): "&lt;", ord('"'): "&quot;", ord(">"): "&gt;", ord("@"): "&#64;"}
+
+# Attributes of TOC references that don't change the HTML
+REFERENCE_ATTRIBUTES = {
+    "refuri",
+    "anchorname",
+    "internal",
+    "secnumber",
+    "ids",
+    "classes",
+    "names",
+    "dupnames",
+    "backrefs",
+}
+
+
+def get_local_toc(builder: StandaloneHTMLBuilder, docname: str) -> Node | None:
+    """Return the on-page TOC of a document without the page title.
 
     By default, Sphinx includes the page title in the on-page TOC.
     We don't want that.
@@ -47,11 +74,7 @@ def change_toc(
 
     Then, we _outdent_ the tree.
     """
-    builder = app.builder
-    if not isinstance(builder, StandaloneHTMLBuilder):
-        return
-
-    toc = TocTree(builder.env).get_toc_for(pagename, builder)
+    toc = TocTree(builder.env).get_toc_for(docname, builder)
 
     # Remove `h1` node
     for node in toc.findall(nodes.reference):
@@ -72,7 +95,159 @@ def change_toc(
         ):
             doc.replace(node, node.next_node().next_node())  # type:ignore
 
-    toc_root = doc.children[0] if doc.children else None
+    return doc.children[0] if doc.children else None
+
+
+def _is_simple(node: nodes.bullet_list) -> bool:
+    """Check if the HTML writer adds the ``simple`` class to a list.
+
+    The HTML writer only considers lists with single paragraphs as simple.
+    Every link of the TOC is inside a ``compact_paragraph``,
+    which the check doesn't recognize.
+    """
+    return all(
+        isinstance(item, nodes.bullet_list) or (isinstance(item, nodes.list_item) and len(item) <= 1)
+        for item in node.findall(nodes.Element)
+    )
+
+
+def _render_reference(node: nodes.reference, parts: list[str], secnumber_suffix: str) -> bool:
+    """Append the HTML for a link of the TOC to ``parts``."""
+    if (
+        node["classes"]
+        or "refuri" not in node
+        or node["refuri"].startswith("mailto:")
+        or not set(node.attributes) <= REFERENCE_ATTRIBUTES
+        or not isinstance(node.parent, nodes.TextElement)
+    ):
+        return False
+
+    kind = "internal" if node.get("internal") else "external"
+    href = (node["refuri"] or "#").translate(SPECIAL_CHARACTERS)
+    parts.append(f'<a class="reference {kind}" href="{href}">')
+    if node.get("secnumber"):
+        parts.append(".".join(map(str, node["secnumber"])) + secnumber_suffix)
+    for child in node.children:
+        if not isinstance(child, nodes.Text):
+            return False
+        parts.append(child.astext().translate(SPECIAL_CHARACTERS))
+    parts.append("</a>")
+    return True
+
+
+def _render(node: Node, parts: list[str], secnumber_suffix: str, in_simple_list: bool = False) -> bool:
+    """Append the HTML for a node of the TOC to ``parts``.
+
+    Return ``False`` if the node contains anything that a TOC usually doesn't contain.
+    """
+    if not isinstance(node, nodes.Element) or node["ids"]:
+        return False
+
+    if isinstance(node, nodes.reference):
+        return _render_reference(node, parts, secnumber_suffix)
+
+    if isinstance(node, addnodes.compact_paragraph):
+        return all(_render(child, parts, secnumber_suffix, in_simple_list) for child in node.children)
+
+    if node["classes"] or not isinstance(node, (nodes.bullet_list, nodes.list_item)):
+        return False
+
+    if isinstance(node, nodes.list_item):
+        start, end, simple = "<li>", "</li>\n", in_simple_list
+    elif len(node) == 1 and isinstance(node[0], addnodes.toctree):
+        # The HTML writer skips lists with only a toctree
+        return True
+    else:
+        simple = _is_simple(node)
+        start, end = '<ul class="simple">\n' if simple and not in_simple_list else "<ul>\n", "</ul>\n"
+
+    parts.append(start)
+    if not all(_render(child, parts, secnumber_suffix, simple) for child in node.children):
+        return False
+    parts.append(end)
+    return True
+
+
+def render_toc(toc: Node | None, secnumber_suffix: str = ". ") -> str | None:
+    """Render the on-page TOC to the same HTML as the HTML writer.
+
+    Return ``None`` if the TOC contains nodes that only the HTML writer can render.
+    """
+    if toc is None:
+        return ""
+    if isinstance(toc, nodes.paragraph) and not toc.children:
+        # The TOC of a page that isn't a document
+        return "<p></p>\n"
+
+    parts: list[str] = []
+    if not _render(toc, parts, secnumber_suffix):
+        return None
+    return "".join(parts)
+
+
+def get_toc_html(builder: StandaloneHTMLBuilder, docname: str) -> str:
+    """Return the HTML of the on-page TOC of a document."""
+    toc = get_local_toc(builder, docname)
+    html = render_toc(toc, builder.config.html_secnumber_suffix)
+    if html is None:
+        html = builder.render_partial(toc)["fragment"]
+    return html
+
+
+def cache_toc(app: Sphinx, doctree: nodes.document) -> None:
+    """Render the on-page TOC of a document while it's read.
+
+    Sphinx numbers the sections only after reading all documents,
+    and the numbers can change without reading the document again.
+    For documents with numbered sections, the cache isn't used.
+    If the TOC needs the HTML writer, it's rendered when the page is written.
+    """
+    builder = app.builder
+    if not isinstance(builder, StandaloneHTMLBuilder):
+        return
+
+    env = cast(TocBuildEnvironment, app.env)
+    if not hasattr(env, "awesome_tocs"):
+        env.awesome_tocs = {}
+    html = render_toc(get_local_toc(builder, env.docname), builder.config.html_secnumber_suffix)
+    if html is not None:
+        env.awesome_tocs[env.docname] = html
+
+
+def merge_tocs(app: Sphinx, env: BuildEnvironment, docnames: Set[str], other: BuildEnvironment) -> None:
+    """Merge the rendered on-page TOCs from the environment of a worker process."""
+    other_tocs = getattr(other, "awesome_tocs", {})
+    env = cast(TocBuildEnvironment, env)
+    if not hasattr(env, "awesome_tocs"):
+        env.awesome_tocs = {}
+    env.awesome_tocs.update((docname, other_tocs[docname]) for docname in docnames if docname in other_tocs)
+
+
+def purge_toc(app: Sphinx, env: BuildEnvironment, docname: str) -> None:
+    """Remove the cached on-page TOC of a removed or changed document."""
+    getattr(env, "awesome_tocs", {}).pop(docname, None)
+
+
+def change_toc(
+    app: Sphinx,
+    pagename: str,
+    _templatename: str,
+    context: dict[str, Any],
+    _doctree: Node,
+) -> None:
+    """Change the way the `{{ toc }}` helper works.
+
+    The on-page TOC doesn't include the page title.
+    If the TOC of the document is cached and the document doesn't have numbered sections,
+    use the cached TOC.
+    """
+    builder = app.builder
+    if not isinstance(builder, StandaloneHTMLBuilder):
+        return
 
-    # Use the public builder API to render the doctree fragment.
-    context["toc"] = builder.render_partial(toc_root)["fragment"]
+    env = cast(TocBuildEnvironment, builder.env)
+    cached = getattr(env, "awesome_tocs", {}).get(pagename)
+    if cached is not None and pagename not in env.toc_secnumbers:
+        context["toc"] = cached
+    else:
+        context["toc"] = get_toc_html(builder, pagename)
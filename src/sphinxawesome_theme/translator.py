@@ -0,0 +1,138 @@
+"""Add the theme's attributes to links while translating documents to HTML.
+
+This extension replaces some of the post-processing transformations.
+The translator adds these attributes and icons when it writes the links:
+
+- ``rel="nofollow noopener"`` and an icon for external links,
+  if the ``awesome_external_links`` theme option is true.
+- Alpine.js attributes that copy the URL of a headerlink on click,
+  if the ``awesome_headerlinks`` theme option is true,
+  including the headerlinks of titles that link back to a table of contents.
+- Alpine.js attributes that mark the current section for the scrollspy
+  on the headerlinks of sections and API objects.
+
+If the ``awesome_icon_sprite`` theme option is true,
+the icons reference the SVG sprite instead of inlining the SVG markup.
+
+The theme only registers the translator,
+if no other extension registered a translator for the HTML builder.
+
+:copyright: Copyright Kai Welke.
+:license: MIT, see LICENSE for details.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from docutils import nodes
+from sphinx import addnodes
+from sphinx.application import Sphinx
+from sphinx.locale import _
+from sphinx.writers.html5 import HTML5Translator
+
+from .icons import Icons
+from .sprite import sprite_url, use_icon
+
+HEADERLINK_CLICK = "window.navigator.clipboard.writeText($el.href); $el.setAttribute('data-tooltip', 'Copied!'); setTimeout(() => $el.setAttribute('data-tooltip', 'Copy link to this element'), 2000)"
+
+
+def is_external(node: nodes.Element) -> bool:
+    """Check if a reference is rendered as ``a.reference.external`` without an image."""
+    return (
+        isinstance(node, nodes.reference)
+        and "refuri" in node
+        and not node.get("internal")
+        and isinstance(node.parent, nodes.TextElement)
+    )
+
+
+class AwesomeHTMLTranslator(HTML5Translator):
+    """HTML translator that adds the theme's attributes to links."""
+
+    def __init__(self: AwesomeHTMLTranslator, document: nodes.document, builder: Any) -> None:  # noqa: ANN401
+        """Read the theme options that affect the links."""
+        super().__init__(document, builder)
+        theme_options = builder.theme_options
+        self.awesome_external_links = bool(theme_options.get("awesome_external_links"))
+        self.awesome_headerlinks = bool(theme_options.get("awesome_headerlinks"))
+        sprite = sprite_url(builder, builder.current_docname) if hasattr(builder, "current_docname") else ""
+        self.external_link_icon = use_icon(Icons.external_link, "external_link", sprite)
+        self.permalink_icon = use_icon(self.config.html_permalinks_icon, "permalink", sprite)
+
+    def starttag(
+        self: AwesomeHTMLTranslator,
+        node: nodes.Element,
+        tagname: str,
+        suffix: str = "\n",
+        empty: bool = False,
+        **attributes: Any,  # noqa: ANN401
+    ) -> str:
+        """Add ``rel="nofollow noopener"`` to external links."""
+        if tagname == "a" and self.awesome_external_links and is_external(node):
+            attributes["rel"] = "nofollow noopener"
+        return super().starttag(node, tagname, suffix, empty, **attributes)
+
+    def depart_reference(self: AwesomeHTMLTranslator, node: nodes.reference) -> None:
+        """Add an icon to external links."""
+        if self.awesome_external_links and is_external(node):
+            self.body.append(self.external_link_icon)
+        super().depart_reference(node)
+
+    def add_permalink_ref(self: AwesomeHTMLTranslator, node: nodes.Element, title: str) -> None:
+        """Add a headerlink with the attributes for copying the link and for the scrollspy."""
+        if not (node["ids"] and self.config.html_permalinks and self.builder.add_permalinks):
+            return
+
+        self.body.append(f"{self.permalink_start_tag(node, title)}{self.permalink_icon}</a>")
+
+    def permalink_start_tag(self: AwesomeHTMLTranslator, node: nodes.Element, title: str) -> str:
+        """Return the start tag of a headerlink."""
+        href = f"#{node['ids'][0]}"
+        attributes = {"class": "headerlink", "href": href}
+        if self.in_scrollspy(node):
+            attributes["x-intersect.margin.0%.0%.-70%.0%"] = f"activeSection = '{href}'"
+        if self.awesome_headerlinks:
+            attributes["@click.prevent"] = HEADERLINK_CLICK
+            attributes["aria-label"] = "Copy link to this element"
+            attributes["data-tooltip"] = "Copy link to this element"
+        else:
+            attributes["title"] = title
+
+        attrs = "".join(f' {name}="{self.attval(value)}"' for name, value in attributes.items())
+        return f"<a{attrs}>"
+
+    def depart_title(self: AwesomeHTMLTranslator, node: nodes.title) -> None:
+        """Add the attributes to the headerlinks of titles that link back to the table of contents.
+
+        Sphinx writes these headerlinks without calling ``add_permalink_ref``.
+        The end tag of the title closes the headerlink.
+        """
+        if (
+            self.context[-1].startswith("</a></h")
+            and self.config.html_permalinks
+            and self.builder.add_permalinks
+            and node.parent.get("ids")
+        ):
+            self.body.append(f"</a>{self.permalink_start_tag(node.parent, _('Link to this heading'))}")
+            self.body.append(self.permalink_icon)
+            # Skip Sphinx's method, which would add another headerlink
+            super(HTML5Translator, self).depart_title(node)
+        else:
+            super().depart_title(node)
+
+    def in_scrollspy(self: AwesomeHTMLTranslator, node: nodes.Element) -> bool:
+        """Check if the headerlink belongs to an ``h2`` or ``h3`` heading or an API object."""
+        if isinstance(node, nodes.section):
+            # The end tag of the heading that's being written, after the end tag of a link back to the TOC
+            return self.context[-1].removeprefix("</a>").startswith(("</h2>", "</h3>"))
+        return isinstance(node, addnodes.desc_signature) and "sig" in node["classes"]
+
+
+def setup_translator(app: Sphinx) -> None:
+    """Use the translator for the HTML builders unless another translator is registered."""
+    if app.builder is None or app.builder.name not in ["html", "dirhtml"]:
+        return
+
+    if app.builder.name not in app.registry.translators:
+        app.set_translator(app.builder.name, AwesomeHTMLTranslator)
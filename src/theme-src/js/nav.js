@@ -0,0 +1,64 @@
+/**
+ * Load the navigation from a shared fragment.
+ *
+ * If the `awesome_nav_fragment` theme option is true,
+ * pages don't include the navigation.
+ * Instead, the sidebar contains an empty `nav#awesome-nav` element,
+ * whose `data-src` attribute points to the fragment in the `_static` directory.
+ * The links in the fragment are relative to the root of the site.
+ */
+
+/** Remove `index.html` and the hash, so that `dirhtml` URLs match */
+function normalize(url) {
+	const normalized = new URL(url);
+	normalized.hash = "";
+	normalized.pathname = normalized.pathname.replace(/index\.html$/, "");
+	return normalized.href;
+}
+
+/** Mark a link and its ancestors as current, like the `toctree()` helper does */
+function markCurrent(link, root) {
+	link.classList.add("current");
+	for (let el = link.parentElement; el && el !== root; el = el.parentElement) {
+		if (el.matches("li, ul")) {
+			el.classList.add("current");
+			el.removeAttribute("x-cloak");
+		}
+	}
+}
+
+/** Insert the navigation fragment into the sidebar */
+export async function loadNav() {
+	const nav = document.getElementById("awesome-nav");
+	if (!nav) {
+		return;
+	}
+
+	const src = new URL(nav.dataset.src, document.baseURI);
+	const root = new URL("..", src);
+	const response = await fetch(src);
+	if (!response.ok) {
+		return;
+	}
+
+	const template = document.createElement("template");
+	template.innerHTML = await response.text();
+	const fragment = template.content;
+	const page = normalize(window.location.href);
+
+	for (const link of fragment.querySelectorAll("a[href]")) {
+		const href = new URL(link.getAttribute("href"), root);
+		link.setAttribute("href", href.href);
+		if (!href.hash && normalize(href) === page) {
+			markCurrent(link, fragment);
+		}
+	}
+	for (const use of fragment.querySelectorAll("use[href]")) {
+		use.setAttribute("href", new URL(use.getAttribute("href"), root).href);
+	}
+
+	// Alpine.js initializes the collapsible links when they're added
+	nav.replaceChildren(fragment);
+}
+
+loadNav();
@@ -13,6 +13,7 @@ export default {
 	devtool: false,
 	entry: {
 		theme: "./js/app.js",
+		"awesome-nav": "./js/nav.js",
 		"awesome-docsearch": "./css/docsearch.css",
 		"awesome-sphinx-design": "./css/sphinx-design.css",
 		"awesome-myst-nb": "./css/myst-nb.css",
@@ -0,0 +1,5 @@
+"""Sphinx configuration file for testing the bundles."""
+
+html_static_path = ["_static"]
+# The stylesheet for printing isn't bundled and splits the bundle
+html_css_files = [("print.css", {"media": "print", "priority": 500}), "extra.css"]
@@ -0,0 +1 @@
+"""Sphinx configuration file for testing the post-processing."""
@@ -0,0 +1 @@
+"""Sphinx configuration file for testing the on-page TOC."""
@@ -0,0 +1,90 @@
+"""Test the bundles of the stylesheets and the deferred scripts."""
+
+import os
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from sphinx.application import Sphinx
+from sphinx.builders.html._assets import _CascadingStyleSheet, _JavaScript
+
+from sphinxawesome_theme.bundle import (
+    Bundle,
+    find_bundles,
+    has_import,
+    minify_css,
+    replace_assets,
+)
+
+from .util import asset_version, parse_html
+
+CONFIG = {
+    "html_theme": "sphinxawesome_theme",
+    "html_theme_options": {"awesome_bundle_assets": True},
+}
+
+
+def test_minify_css() -> None:
+    """It removes comments and whitespace, but not from strings."""
+    css = '@charset "utf-8";\n/* A comment */\n.a .b ,\n.c {\n  color: red ;\n  content: "a ,  b";\n}\n'
+    assert minify_css(css) == '.a .b,.c{color: red;content: "a ,  b";}'
+
+
+def test_has_import(tmp_path: Path) -> None:
+    """It checks a stylesheet again after it changed."""
+    css = tmp_path / "extension.css"
+    css.write_text("body { margin: 0 }\n")
+    assert not has_import(css)
+    css.write_text('@import "other.css";\n')
+    os.utime(css, ns=(css.stat().st_atime_ns, css.stat().st_mtime_ns + 1_000_000_000))
+    assert has_import(css)
+
+
+def test_find_bundles() -> None:
+    """It groups consecutive files in the order of their priorities."""
+    files = [
+        _CascadingStyleSheet("_static/late.css", priority=900),
+        _CascadingStyleSheet("_static/print.css", priority=500, media="print"),
+        _CascadingStyleSheet("_static/theme.css", priority=200),
+        _CascadingStyleSheet("_static/extension.css", priority=200),
+    ]
+    bundles = find_bundles(files, lambda css: "media" not in css.attributes, "awesome-bundle.css")
+    assert bundles == [
+        Bundle("awesome-bundle.css", ("_static/theme.css", "_static/extension.css"), 200),
+        Bundle("awesome-bundle-2.css", ("_static/late.css",), 900),
+    ]
+
+    scripts = [_JavaScript("_static/doctools.js"), _JavaScript("_static/theme.js", defer="defer")]
+    bundled = replace_assets(scripts, [Bundle("awesome-bundle.js", ("_static/theme.js",), 500)])
+    assert [(asset.filename, asset.attributes) for asset in bundled] == [
+        ("_static/doctools.js", {}),
+        ("_static/awesome-bundle.js", {"defer": "defer"}),
+    ]
+
+
+@pytest.mark.sphinx("html", testroot="highlighting", srcdir="bundle", freshenv=True, confoverrides=CONFIG)
+def test_bundle_assets(app: Sphinx, warning: StringIO) -> None:
+    """It references the bundles instead of the theme's stylesheets and scripts."""
+    app.build()
+    assert not warning.getvalue()
+
+    static = Path(app.outdir) / "_static"
+    tree = parse_html(Path(app.outdir) / "index.html")
+    # The checksums in the pages match the written bundles
+    stylesheets = [link["href"] for link in tree("link", rel="stylesheet")]
+    assert stylesheets == [f"_static/awesome-bundle.css?v={asset_version(static / 'awesome-bundle.css')}"]
+    sources = [script["src"] for script in tree("script") if script.get("src")]
+    assert f"_static/awesome-bundle.js?v={asset_version(static / 'awesome-bundle.js')}" in sources
+    scripts = [source.split("?")[0] for source in sources]
+    assert "_static/theme.js" not in scripts
+    # Scripts without ``defer`` aren't bundled
+    assert "_static/doctools.js" in scripts
+
+    css = (static / "awesome-bundle.css").read_text(encoding="utf-8")
+    # The bundle has the pruned ``pygments.css`` before the theme's stylesheet
+    pygments = minify_css((static / "pygments.css").read_text(encoding="utf-8"))
+    theme = minify_css((static / "theme.css").read_text(encoding="utf-8"))
+    assert css.index(pygments) < css.index(theme)
+
+    js = (static / "awesome-bundle.js").read_text(encoding="utf-8")
+    assert (static / "theme.js").read_text(encoding="utf-8").strip() in js
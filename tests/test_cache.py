@@ -0,0 +1,63 @@
+"""Test the persistent cache of the post-processed pages."""
+
+import os
+from io import StringIO
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sphinx.application import Sphinx
+
+from sphinxawesome_theme.cache import FileCache
+
+from .util import read_as_text
+
+PAGES = ["index.html", "first.html", "second.html", "third.html"]
+
+
+def test_cache_eviction(tmp_path: Path) -> None:
+    """It removes the least recently used files until the cache fits."""
+    cache = FileCache(tmp_path, max_size=10, version="1.0")
+    keys = [cache.key(str(number)) for number in range(3)]
+    for age, key in enumerate(keys):
+        cache.set(key, "12345")
+        os.utime(cache.path(key), (age, age))
+
+    assert cache.get(keys[0]) == "12345"
+    assert cache.get("0" * 64) is None
+    assert cache.evict() == 1
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == cache.get(keys[2]) == "12345"
+    assert (cache.hits.value, cache.misses.value) == (3, 2)
+    assert FileCache(tmp_path, 10, "2.0").key("0") != keys[0]
+
+
+@pytest.mark.sphinx(
+    "html",
+    testroot="postprocess",
+    freshenv=True,
+    confoverrides={"html_theme": "sphinxawesome_theme"},
+)
+def test_cache_across_clean_builds(app: Sphinx, make_app: Any, tmp_path: Path) -> None:
+    """It reuses the post-processed pages from a previous clean build."""
+    config = {
+        "html_theme": "sphinxawesome_theme",
+        "html_theme_options": {"awesome_cache_dir": str(tmp_path / "cache")},
+    }
+    outputs = []
+    for name in ["first", "second"]:
+        status = StringIO()
+        cached = make_app(
+            "html", srcdir=app.srcdir, builddir=tmp_path / name, freshenv=True, confoverrides=config, status=status
+        )
+        cached.build()
+        outputs.append(Path(cached.outdir))
+
+    assert "postprocess cache: 4 hits, 0 misses (hit rate 100%)" in status.getvalue()
+    assert len(list((tmp_path / "cache" / "postprocess").glob("*/*"))) == 4
+
+    # The uncached build produces the same pages
+    app.build()
+    for page in PAGES:
+        assert read_as_text(outputs[1] / page) == read_as_text(Path(app.outdir) / page)
+        assert read_as_text(outputs[0] / page) == read_as_text(Path(app.outdir) / page)
@@ -0,0 +1,75 @@
+"""Test the static assets with hashed names."""
+
+import re
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from sphinx.application import Sphinx
+
+from sphinxawesome_theme.fingerprint import fingerprinted_name
+
+from .util import parse_html
+
+CONFIG = {
+    "html_theme": "sphinxawesome_theme",
+    "html_theme_options": {
+        "awesome_fingerprint_assets": True,
+        "logo_light": "assets/light.svg",
+        "logo_dark": "assets/dark.svg",
+    },
+}
+
+HASHED = re.compile(r"_static/(?:theme|pygments|light|dark)\.[0-9a-f]{12}\.(?:css|js|svg)$")
+
+
+def test_fingerprinted_name() -> None:
+    """It inserts the hash of the content before the extension."""
+    assert fingerprinted_name("theme.css", b"body {}") == "theme.62368a1a2925.css"
+    assert fingerprinted_name("theme.css", b"body {}") != fingerprinted_name("theme.css", b"html {}")
+    assert fingerprinted_name("LICENSE", b"MIT") == "LICENSE.e5dcffe836b6"
+
+
+@pytest.mark.sphinx("html", testroot="logos", srcdir="fingerprint", freshenv=True, confoverrides=CONFIG)
+def test_fingerprint_assets(app: Sphinx, warning: StringIO) -> None:
+    """It references the theme's assets and the logos with hashed names."""
+    app.build()
+    assert not warning.getvalue()
+
+    tree = parse_html(Path(app.outdir) / "index.html")
+    urls = [link["href"] for link in tree("link", rel="stylesheet")] + [
+        element["src"] for element in tree(["script", "img"]) if element.get("src")
+    ]
+    # The hashed names don't have Sphinx's ``?v=`` checksum
+    hashed = {url for url in urls if HASHED.match(url)}
+    assert len(hashed) == 5
+    for url in hashed:
+        hashed_file = Path(app.outdir) / url
+        original = hashed_file.with_name(re.sub(r"\.[0-9a-f]{12}\.", ".", hashed_file.name))
+        # The hash matches the final content
+        assert hashed_file.read_bytes() == original.read_bytes()
+        assert hashed_file.name == fingerprinted_name(original.name, original.read_bytes())
+
+
+@pytest.mark.sphinx(
+    "html",
+    testroot="bundles",
+    srcdir="fingerprint-bundles",
+    freshenv=True,
+    confoverrides={
+        "html_theme": "sphinxawesome_theme",
+        "html_theme_options": {"awesome_fingerprint_assets": True, "awesome_bundle_assets": True},
+    },
+)
+def test_fingerprint_bundles(app: Sphinx, warning: StringIO) -> None:
+    """It references every bundle with a hashed name."""
+    app.build()
+    assert not warning.getvalue()
+
+    tree = parse_html(Path(app.outdir) / "index.html")
+    stylesheets = [link["href"] for link in tree("link", rel="stylesheet")]
+    assert len(stylesheets) == 3
+    assert re.fullmatch(r"_static/awesome-bundle\.[0-9a-f]{12}\.css", stylesheets[0])
+    assert stylesheets[1].startswith("_static/print.css?v=")
+    assert re.fullmatch(r"_static/awesome-bundle-2\.[0-9a-f]{12}\.css", stylesheets[2])
+    assert (Path(app.outdir) / stylesheets[2]).read_text(encoding="utf-8") == "body{margin: 0;}\n"
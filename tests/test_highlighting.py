@@ -2,11 +2,25 @@
 
 from io import StringIO
 from pathlib import Path
+from typing import Any
 
 import pytest
+from pygments.lexer import Lexer
+from pygments.lexers import PythonLexer
+from pygments.token import Generic
+from sphinx import highlighting
 from sphinx.application import Sphinx
 
-from .util import parse_html
+from sphinxawesome_theme import highlighting as highlighting_module
+from sphinxawesome_theme.highlighting import (
+    AUTOMATON_THRESHOLD,
+    AwesomePlaceholders,
+    AwesomePygmentsBridge,
+    PlaceholderAutomaton,
+    placeholder_filter,
+)
+
+from .util import parse_html, read_as_text
 
 
 @pytest.mark.sphinx(
@@ -42,3 +56,163 @@ def test_handles_highlighting(app: Sphinx, warning: StringIO) -> None:
 
     placeholder = code_block[1]("span", class_="ge")
     assert len(placeholder) == 1
+
+    assert len(code_block[0]("span", class_="lazy-lines")) == 0
+    lazy_lines = code_block[1]("span", class_="lazy-lines")
+    assert len(lazy_lines) == 1
+    assert lazy_lines[0]["style"] == "--lines: 2"
+
+
+@pytest.mark.sphinx(
+    "html",
+    testroot="highlighting",
+    srcdir="highlighting-cache",
+    confoverrides={"html_theme": "sphinxawesome_theme"},
+    freshenv=True,
+)
+def test_highlight_cache(app: Sphinx, make_app: Any, tmp_path: Path) -> None:
+    """It reuses the highlighted code blocks from a previous clean build."""
+    (Path(app.srcdir) / "index.rst").write_text(
+        read_as_text(Path(app.srcdir) / "index.rst") + "\n.. code-block:: python\n\n   a = $b\n"
+    )
+    config = {
+        "html_theme": "sphinxawesome_theme",
+        "html_theme_options": {"awesome_cache_dir": str(tmp_path / "cache")},
+    }
+    outputs = []
+    for name in ["first", "second"]:
+        status, warning = StringIO(), StringIO()
+        cached = make_app(
+            "html",
+            srcdir=app.srcdir,
+            builddir=tmp_path / name,
+            freshenv=True,
+            confoverrides=config,
+            status=status,
+            warning=warning,
+        )
+        cached.build()
+        outputs.append(read_as_text(Path(cached.outdir) / "index.html"))
+        # The code block with a lexing error isn't cached and warns in every build
+        assert "Lexing literal_block" in warning.getvalue()
+
+    assert "highlight cache: 2 hits, 1 misses" in status.getvalue()
+    assert outputs[0] == outputs[1]
+
+
+def test_lexer_reuse(monkeypatch: pytest.MonkeyPatch) -> None:
+    """It reuses lexers, placeholder filters, and guessed languages."""
+    bridge = AwesomePygmentsBridge("html", "sphinx")
+    opts = {"hl_text": ["WORLD"]}
+    lexer = bridge.get_lexer('print("WORLD")', "python", opts)
+    assert bridge.get_lexer('print("hello")', "python", {"hl_text": ["WORLD"]}) is lexer
+    assert bridge.get_lexer('print("hello")', "python") is not lexer
+    assert placeholder_filter(("WORLD",)) in lexer.filters
+
+    # Custom lexers are shared between all code blocks
+    monkeypatch.setitem(highlighting.lexers, "custom", PythonLexer())
+    assert bridge.get_lexer("x", "custom", opts) is not highlighting.lexers["custom"]
+    assert not highlighting.lexers["custom"].filters
+
+    guesses = []
+
+    def guess_lexer(source: str, **options: Any) -> Lexer:  # noqa: ANN401
+        guesses.append(source)
+        return PythonLexer(**options)
+
+    monkeypatch.setattr(highlighting, "guess_lexer", guess_lexer)
+    source = "def main():\n    pass\n"
+    assert bridge.get_lexer(source, "guess") is bridge.get_lexer(source, "guess")
+    assert guesses == [source]
+
+
+def test_guessed_lexers(monkeypatch: pytest.MonkeyPatch) -> None:
+    """It doesn't reuse the lexer of a guessed language for code in another language."""
+    bridge = AwesomePygmentsBridge("html", "sphinx")
+    # Guesses for interactive Python sessions aren't reused
+    session = bridge.get_lexer(">>> print(1)\n1\n", "guess")
+    c = bridge.get_lexer("#include <stdio.h>\nint main(void) { return 0; }\n", "guess")
+    assert c is not session
+    assert "c" in c.aliases
+
+    # Guessed lexers without aliases aren't reused
+    unnamed = PythonLexer()
+    unnamed.aliases = []
+
+    def guess_lexer(source: str, **options: Any) -> Lexer:  # noqa: ANN401
+        return unnamed if source.startswith("def") else PythonLexer(**options)
+
+    monkeypatch.setattr(highlighting, "guess_lexer", guess_lexer)
+    assert bridge.get_lexer("def main():\n    pass\n", "guess") is unnamed
+    assert bridge.get_lexer("print(1)\n", "guess") is not unnamed
+
+
+@pytest.mark.parametrize(
+    "placeholders",
+    [
+        ["WORLD", "WORLDS", "OR", "print"],
+        ["WORLDS", "WORLD", "LD", "D", "pri", "print("],
+        ["aa", "a", "aaa", "", "é", "héllo"],
+    ],
+)
+def test_placeholder_automaton(placeholders: list[str]) -> None:
+    """It finds the same placeholders with the automaton as with the regular expression."""
+    code = 'print("Hello WORLD")\nprint("WORLDS")  # héllo aaaaa\nprinted = "OR D LD"\n'
+    regex_filter = AwesomePlaceholders(hl_text=placeholders)
+    automaton_filter = AwesomePlaceholders(hl_text=placeholders)
+    automaton_filter.automaton = PlaceholderAutomaton(placeholders)
+
+    tokens = list(PythonLexer().get_tokens(code))
+    expected = list(regex_filter.filter(None, iter(tokens)))
+    assert any(ttype is Generic.Emph for ttype, _ in expected)
+    assert list(automaton_filter.filter(None, iter(tokens))) == expected
+
+    # Filters for many placeholders use the automaton
+    assert regex_filter.automaton is None
+    many = placeholders + [f"UNUSED_{index}" for index in range(AUTOMATON_THRESHOLD)]
+    many_filter = AwesomePlaceholders(hl_text=many)
+    assert many_filter.automaton is not None
+    assert list(many_filter.filter(None, iter(tokens))) == expected
+
+
+def test_linespans_max_lines(monkeypatch: pytest.MonkeyPatch) -> None:
+    """It wraps the lines of long code blocks in line spans only if they need them."""
+    bridge = AwesomePygmentsBridge("html", "sphinx")
+    source = "".join(f"x = {i}\n" for i in range(2000))
+    with_linespans = bridge.highlight_block(source, "python")
+    assert with_linespans.count('<span id="line-') == 2000
+
+    # The result is the same if each piece is written separately
+    monkeypatch.setattr(highlighting_module, "WRITE_CHUNK_SIZE", 1)
+    assert bridge.highlight_block(source, "python") == with_linespans
+
+    bridge.linespans_max_lines = 1000
+    highlighted = bridge.highlight_block(source, "python")
+    assert 'id="line-' not in highlighted
+    assert '<code class="no-linespans">' in highlighted
+    assert 'id="line-' in bridge.highlight_block(source, "python", hl_added=[2])
+    assert 'id="line-' in bridge.highlight_block(source, "diff")
+    assert 'id="line-' in bridge.highlight_block("x = 1\n", "python")
+
+
+def test_eager_lines() -> None:
+    """It groups the lines after the eager lines into chunks that the browser renders lazily."""
+    bridge = AwesomePygmentsBridge("html", "sphinx")
+    source = "".join(f"x = {i}\n" for i in range(250))
+    highlighted = bridge.highlight_block(source, "python", eager_lines=20)
+    assert highlighted.count('class="lazy-lines"') == 3
+    assert highlighted.count('style="--lines: 100"') == 2
+    assert highlighted.count('style="--lines: 30"') == 1
+    # The lines keep their anchors
+    assert highlighted.count('<span id="line-') == 250
+    assert (
+        highlighted.index('id="line-20"') < highlighted.index('class="lazy-lines"') < highlighted.index('id="line-21"')
+    )
+
+    assert "lazy-lines" not in bridge.highlight_block("x = 1\n", "python", eager_lines=20)
+    assert "lazy-lines" not in bridge.highlight_block(source, "python", eager_lines=20, linenos=True)
+
+    # The theme option sets the default for code blocks without the option
+    bridge.eager_lines = 200
+    assert bridge.highlight_block(source, "python").count('class="lazy-lines"') == 1
+    assert "lazy-lines" not in bridge.highlight_block(source, "python", eager_lines=0)
@@ -0,0 +1,72 @@
+"""Test that the theme only imports what a builder needs."""
+
+# ruff: noqa: S603
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.absolute() / "roots" / "test-root"
+
+BUILD = """
+import sys
+from sphinx.application import Sphinx
+
+srcdir, outdir, builder = sys.argv[1:]
+app = Sphinx(srcdir, srcdir, outdir, outdir + "/.doctrees", builder, status=None,
+             confoverrides={"extensions": ["sphinxawesome_theme"], "html_theme": "sphinxawesome_theme"})
+app.build()
+print("\\n".join(sys.modules))
+"""
+
+
+def imported_modules(code: str) -> set[str]:
+    """Run Python code with ``-X importtime`` and return the names of the imported modules."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    # Each line looks like: ``import time: self [us] | cumulative | module``
+    return {
+        line.rsplit("|", 1)[1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and "|" in line
+    }
+
+
+def built_modules(srcdir: Path, outdir: Path, builder: str) -> set[str]:
+    """Build the documentation in a new Python process and return the names of the imported modules."""
+    result = subprocess.run(
+        [sys.executable, "-c", BUILD, str(srcdir), str(outdir), builder],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return set(result.stdout.splitlines())
+
+
+def test_import_theme() -> None:
+    """It doesn't import BeautifulSoup when Sphinx loads the theme."""
+    modules = imported_modules("import sphinxawesome_theme")
+    assert "sphinxawesome_theme" in modules
+    assert "bs4" not in modules
+    assert "sphinxawesome_theme.postprocess" not in modules
+
+
+@pytest.mark.parametrize("builder", ["dummy", "latex"])
+def test_non_html_builders(builder: str, tmp_path: Path) -> None:
+    """It doesn't import the post-processing for builders that don't write HTML pages."""
+    modules = built_modules(ROOT, tmp_path, builder)
+    assert "sphinxawesome_theme" in modules
+    assert "bs4" not in modules
+    assert "sphinxawesome_theme.postprocess" not in modules
+
+
+def test_html_builder(tmp_path: Path) -> None:
+    """It imports the post-processing for the HTML builder."""
+    modules = built_modules(ROOT, tmp_path, "html")
+    assert "sphinxawesome_theme.postprocess" in modules
@@ -0,0 +1,112 @@
+"""Test the collapsible navigation links in the sidebar."""
+
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, cast
+
+import pytest
+from bs4 import BeautifulSoup
+from sphinx.application import Sphinx
+
+import sphinxawesome_theme
+from sphinxawesome_theme import nav
+from sphinxawesome_theme.postprocess import PostprocessOptions, transform_html
+
+from .util import parse_html, read_as_text
+
+NAV = (
+    '<ul{ul_class}><li class="toctree-l1{current}"><a class="reference internal" href="{href}">First</a>'
+    '<ul{ul_class}><li class="toctree-l2"><a class="reference internal" href="#">Third</a></li></ul></li>'
+    '<li class="toctree-l1"><a class="reference internal" href="second.html">Second</a></li></ul>'
+)
+
+
+def test_nav_plan_cache() -> None:
+    """It reuses the collapsible links for navigations with the same structure."""
+    nav.get_plan.cache_clear()
+    pages = [
+        NAV.format(ul_class="", current="", href="first.html"),
+        NAV.format(ul_class=' class="current"', current=" current", href="#"),
+    ]
+    trees = [BeautifulSoup(nav.collapsible_nav(html), "html.parser") for html in pages]
+
+    assert nav.get_plan.cache_info().hits == 1
+    for tree in trees:
+        assert len(tree.select("li[x-data] > a.expandable + ul[x-show]")) == 1
+        assert len(tree.select("a.expandable > button")) == 1
+    assert len(trees[0].select("ul[x-cloak]")) == 1
+    assert len(trees[1].select("ul[x-cloak]")) == 0
+    assert trees[1].select_one("a.expandable")["href"] == "#"  # type: ignore
+
+
+def test_sidebar_toctree() -> None:
+    """It adds a helper for the sidebar and leaves the ``toctree()`` helper as it is."""
+    html = NAV.format(ul_class="", current="", href="first.html")
+
+    def toctree(**kwargs: Any) -> str:  # noqa: ANN401
+        return html
+
+    context: dict[str, Any] = {"toctree": toctree}
+    nav.setup_nav(cast(Sphinx, SimpleNamespace(builder=None)), "index", "page.html", context, cast(Any, None))
+
+    assert context["toctree"] is toctree
+    assert not context.get(nav.SIDEBAR_COLLAPSIBLE)
+    assert context["awesome_sidebar_toctree"](titles_only=True) == nav.collapsible_nav(html)
+    assert context[nav.SIDEBAR_COLLAPSIBLE]
+
+
+@pytest.mark.parametrize("engine", ["tree", "stream"])
+def test_skip_collapsible_nav(engine: str) -> None:
+    """It doesn't transform the navigation again if the sidebar's helper made it collapsible."""
+    html = f'<div id="left-sidebar">{NAV.format(ul_class="", current="", href="first.html")}</div>'
+    assert "expandable" in transform_html(html, PostprocessOptions(engine=engine))
+    assert transform_html(html, PostprocessOptions(engine=engine, collapsible_nav=False)) == html
+
+
+@pytest.mark.sphinx(
+    "html",
+    testroot="postprocess",
+    freshenv=True,
+    confoverrides={"html_theme": "sphinxawesome_theme"},
+)
+def test_nav_equivalence(app: Sphinx, make_app: Any, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """It produces the same HTML as transforming the navigation of every page."""
+    app.build()
+    tree = parse_html(Path(app.outdir) / "index.html")
+    assert len(tree.select("#left-sidebar a.expandable")) == 1
+
+    monkeypatch.setattr(sphinxawesome_theme, "setup_nav", lambda *args: None)
+    other = make_app(
+        "html",
+        srcdir=app.srcdir,
+        builddir=tmp_path,
+        freshenv=True,
+        confoverrides={"html_theme": "sphinxawesome_theme"},
+    )
+    other.build()
+
+    for page in ["index.html", "first.html", "second.html", "third.html"]:
+        assert read_as_text(Path(app.outdir) / page) == read_as_text(Path(other.outdir) / page)
+
+
+@pytest.mark.sphinx(
+    "html",
+    testroot="postprocess",
+    freshenv=True,
+    confoverrides={"html_theme": "sphinxawesome_theme", "html_theme_options": {"awesome_nav_fragment": True}},
+)
+def test_nav_fragment(app: Sphinx) -> None:
+    """It writes the navigation once and loads it on every page."""
+    app.build()
+    fragment = BeautifulSoup(read_as_text(Path(app.outdir) / "_static" / nav.NAV_FRAGMENT), "html.parser")
+    assert [link["href"] for link in fragment.select("a")] == ["first.html", "third.html", "second.html", "third.html"]
+    assert len(fragment.select("li[x-data] > a.expandable + ul[x-show][x-cloak]")) == 1
+    assert not fragment.select(".current")
+
+    for page in ["index.html", "third.html"]:
+        tree = parse_html(Path(app.outdir) / page)
+        placeholder = tree.select_one("#left-sidebar nav#awesome-nav")
+        assert placeholder is not None
+        assert placeholder["data-src"] == "_static/awesome-nav.html"
+        assert not placeholder.contents
+        assert tree.select_one('script[src^="_static/awesome-nav.js"]')
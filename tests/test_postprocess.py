@@ -0,0 +1,235 @@
+"""Test the post-processing of the HTML files."""
+
+from io import StringIO
+from pathlib import Path
+from typing import Any
+
+import pytest
+from bs4 import BeautifulSoup
+from sphinx.application import Sphinx
+from sphinx.util.parallel import parallel_available
+
+from sphinxawesome_theme import postprocess, streaming
+
+from .util import html_tokens, parse_html, read_as_text
+
+PAGES = ["index.html", "first.html", "second.html", "third.html"]
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+@pytest.mark.skipif(not parallel_available, reason="parallel builds aren't available")
+@pytest.mark.sphinx(
+    "html",
+    testroot="postprocess",
+    freshenv=True,
+    parallel=2,
+    confoverrides={
+        "html_theme": "sphinxawesome_theme",
+        "html_theme_options": {"awesome_external_links": True},
+    },
+)
+def test_parallel_write(app: Sphinx, make_app: Any, tmp_path: Path) -> None:
+    """It post-processes the pages that Sphinx writes in parallel mode (``-j``) like in serial mode."""
+    app.build()
+
+    tree = parse_html(Path(app.outdir) / "index.html")
+    assert len(tree.select("#left-sidebar a.expandable")) == 1
+    assert len(tree.select('a.reference.external[rel="nofollow noopener"] svg')) == 1
+
+    serial = make_app(
+        "html",
+        srcdir=app.srcdir,
+        builddir=tmp_path,
+        freshenv=True,
+        confoverrides={
+            "html_theme": "sphinxawesome_theme",
+            "html_theme_options": {"awesome_external_links": True},
+        },
+    )
+    serial.build()
+
+    for page in PAGES:
+        assert read_as_text(Path(app.outdir) / page) == read_as_text(Path(serial.outdir) / page)
+
+
+def test_single_walk() -> None:
+    """It produces the same HTML as the transformations before the single walk.
+
+    The expected HTML was produced by running the original transformations,
+    each with its own ``select()`` or ``find_all()`` search, one after another.
+    """
+    html = read_as_text(FIXTURES / "postprocess.html")
+    tree = BeautifulSoup(html, "html.parser")
+    options = postprocess.PostprocessOptions(external_links=True, headerlinks=True)
+    postprocess.walk(tree, postprocess.get_visitors(options))
+
+    assert str(tree) == read_as_text(FIXTURES / "postprocess.expected.html")
+
+
+@pytest.mark.parametrize("parser", ["html.parser", "lxml", "html5lib"])
+def test_parser_equivalence(parser: str) -> None:
+    """It produces the same HTML as before with every parser backend that it accepts."""
+    backend = postprocess.get_html_parser(parser)
+    if parser == "html5lib":
+        # ``html5lib`` changes the structure of the HTML, so the option doesn't accept it
+        assert backend == "html.parser"
+
+    html = read_as_text(FIXTURES / "postprocess.html")
+    tree = BeautifulSoup(html, backend)
+    options = postprocess.PostprocessOptions(external_links=True, headerlinks=True, parser=backend)
+    postprocess.walk(tree, postprocess.get_visitors(options))
+
+    expected = read_as_text(FIXTURES / "postprocess.expected.html")
+    if backend == "lxml":
+        # The only difference: ``lxml`` drops the whitespace between the doctype and the ``<html>`` element
+        expected = expected.replace("<!DOCTYPE html>\n\n", "<!DOCTYPE html>\n", 1)
+    assert str(tree) == expected
+
+
+@pytest.mark.sphinx(
+    "html",
+    testroot="postprocess",
+    freshenv=True,
+    confoverrides={
+        "html_theme": "sphinxawesome_theme",
+        "html_theme_options": {"awesome_html_parser": "lxml"},
+    },
+)
+def test_parser_fallback(app: Sphinx, monkeypatch: pytest.MonkeyPatch, warning: StringIO) -> None:
+    """It falls back to the built-in parser if the selected parser isn't installed."""
+    monkeypatch.setattr(postprocess.importlib.util, "find_spec", lambda name: None)
+    options = postprocess.PostprocessOptions.from_app(app)
+
+    assert options.parser == "html.parser"
+    assert "Falling back to 'html.parser'" in warning.getvalue()
+
+
+def test_streaming_golden() -> None:
+    """It rewrites only the changed tags and keeps the rest of the HTML as it is."""
+    html = read_as_text(FIXTURES / "postprocess.html")
+    options = postprocess.PostprocessOptions(external_links=True, headerlinks=True)
+    rewritten = streaming.rewrite(html, options)
+
+    assert rewritten == read_as_text(FIXTURES / "postprocess.stream.html")
+    # The same tags and text as the original transformations
+    assert html_tokens(rewritten) == html_tokens(read_as_text(FIXTURES / "postprocess.expected.html"))
+
+
+@pytest.mark.parametrize("headerlinks", [False, True])
+@pytest.mark.sphinx(
+    "html",
+    testroot="postprocess",
+    freshenv=True,
+    confoverrides={"html_theme": "sphinxawesome_theme"},
+)
+def test_streaming_equivalence(app: Sphinx, monkeypatch: pytest.MonkeyPatch, headerlinks: bool) -> None:
+    """It produces the same tags and text with the streaming rewriter and the tree engine."""
+    monkeypatch.setattr(postprocess, "transform_html", lambda html, options: html)
+    app.build()
+
+    options = postprocess.PostprocessOptions(external_links=headerlinks, headerlinks=headerlinks)
+    pages = [read_as_text(Path(app.outdir) / page) for page in PAGES]
+    for html in [*pages, read_as_text(FIXTURES / "postprocess.html")]:
+        tree = BeautifulSoup(html, "html.parser")
+        postprocess.walk(tree, postprocess.get_visitors(options))
+        rewritten = streaming.rewrite(html, options)
+
+        # The tags are written differently, but the text must be the same to the character
+        assert html_tokens(rewritten) == html_tokens(str(tree))
+
+
+def test_streaming_chunks() -> None:
+    """It produces the same HTML no matter how the input is split into chunks."""
+    html = (
+        '<aside id="left-sidebar"><div class="toctree-wrapper">\n</div><ul>'
+        '<li><a class="reference internal" href="a.html">A</a><ul><li><a href="b.html">B</a></li></ul></li>'
+        "</ul></aside><!-- comment --><p>Text &amp; more</p>"
+    )
+    options = postprocess.PostprocessOptions()
+    expected = streaming.rewrite(html, options)
+
+    pieces: list[str] = []
+    rewriter = streaming.AwesomeHTMLRewriter(pieces.append, options)
+    for char in html:
+        rewriter.feed(char)
+    rewriter.close()
+
+    assert "".join(pieces) == expected
+    assert "x-data" in expected
+    assert "toctree-wrapper" not in expected
+    assert "comment" not in expected
+
+
+def test_streaming_sprite() -> None:
+    """It references the icon of the collapsible button from the sprite like the tree engine."""
+    html = (
+        '<aside id="left-sidebar"><ul><li><a class="reference internal" href="a.html">A</a>'
+        '<ul><li><a href="b.html">B</a></li></ul></li></ul></aside>'
+    )
+    options = postprocess.PostprocessOptions(sprite="_static/awesome-icons.svg")
+
+    tree = BeautifulSoup(html, "html.parser")
+    postprocess.walk(tree, postprocess.get_visitors(options))
+    rewritten = streaming.rewrite(html, options)
+
+    assert html_tokens(rewritten) == html_tokens(str(tree))
+    assert '<use href="_static/awesome-icons.svg#awesome-icon-chevron-right">' in rewritten
+
+
+@pytest.mark.sphinx(
+    "html",
+    testroot="postprocess",
+    freshenv=True,
+    confoverrides={
+        "html_theme": "sphinxawesome_theme",
+        "html_theme_options": {"awesome_postprocess_engine": "stream", "awesome_external_links": True},
+    },
+)
+def test_streaming_engine(app: Sphinx) -> None:
+    """It post-processes the HTML with the streaming engine."""
+    app.build()
+
+    tree = parse_html(Path(app.outdir) / "index.html")
+    assert len(tree.select("#left-sidebar a.expandable")) == 1
+    assert len(tree.select('a.reference.external[rel="nofollow noopener"] svg')) == 1
+
+
+@pytest.mark.sphinx(
+    "html",
+    testroot="postprocess",
+    freshenv=True,
+    confoverrides={"html_theme": "sphinxawesome_theme"},
+)
+def test_no_comments(app: Sphinx) -> None:
+    """It doesn't leave any comments in the pages."""
+    app.build()
+
+    for page in PAGES:
+        assert "<!--" not in read_as_text(Path(app.outdir) / page)
+
+
+@pytest.mark.sphinx(
+    "html",
+    testroot="postprocess",
+    srcdir="postprocess-written-docs",
+    freshenv=True,
+    confoverrides={"html_theme": "sphinxawesome_theme"},
+)
+def test_written_docs(app: Sphinx, make_app: Any) -> None:
+    """It post-processes every page that Sphinx writes, even without reading it again."""
+    app.build()
+    assert app.env.awesome_written_docs == {"index", "first", "second", "third"}  # type: ignore
+
+    # Changing a title rewrites all pages with this title in the navigation
+    third = Path(app.srcdir) / "third.rst"
+    third.write_text(third.read_text().replace("Third page", "Renamed page"))
+    rebuild = make_app("html", srcdir=app.srcdir, confoverrides={"html_theme": "sphinxawesome_theme"})
+    rebuild.build()
+
+    written = rebuild.env.awesome_written_docs
+    assert {"index", "first", "third"} <= written
+    for docname in written:
+        html = read_as_text(Path(rebuild.outdir) / f"{docname}.html")
+        assert "Renamed page" in html
+        # The links in the right sidebar are changed by the post-processing
+        assert ":data-current" in html
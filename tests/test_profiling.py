@@ -0,0 +1,154 @@
+"""Test the reports about the time and the memory of the theme's handlers and post-processing."""
+
+import json
+import tracemalloc
+from io import StringIO
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sphinx.application import Sphinx
+from sphinx.util.parallel import parallel_available
+
+from sphinxawesome_theme.profiling import (
+    MEMORY,
+    TIMINGS,
+    percentile,
+    read_records,
+    summarize,
+)
+
+CONFIG = {
+    "html_theme": "sphinxawesome_theme",
+    "html_theme_options": {"awesome_build_report": "_report/build.json"},
+}
+
+
+def test_summarize() -> None:
+    """It returns the number of calls, the total time, and the nearest-rank percentiles."""
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert summarize(list(reversed(values))) == {
+        "calls": 100,
+        "total": 5050,
+        "p50": 50,
+        "p90": 90,
+        "p99": 99,
+        "max": 100,
+    }
+    assert summarize([]) == {"calls": 0, "total": 0}
+
+
+def test_read_records(tmp_path: Path) -> None:
+    """It skips incomplete lines, for example, from a process that was stopped while writing."""
+    records = tmp_path / "records.jsonl"
+    records.write_text('["index", 0.5, {}]\n["first", 0.2, {"hand\n', encoding="utf-8")
+    assert read_records(records) == [["index", 0.5, {}]]
+
+
+@pytest.mark.sphinx("html", testroot="postprocess", srcdir="build-report", freshenv=True, confoverrides=CONFIG)
+def test_build_report(app: Sphinx) -> None:
+    """It writes a report with the time of every handler, transformation, and page."""
+    app.build()
+
+    report = json.loads((Path(app.confdir) / "_report" / "build.json").read_text(encoding="utf-8"))
+    assert report["builder"] == "html"
+    assert not TIMINGS.enabled
+
+    handlers = report["handlers"]
+    assert handlers["builder-inited:update_config"]["calls"] == 1
+    assert handlers["env-updated:select_pygments_classes"]["calls"] == 1
+    # The handlers for pages run once for each page
+    assert handlers["html-page-context:setup_nav"]["calls"] == report["pages"]["time"]["calls"]
+    assert {"calls", "total", "p50", "p90", "p99", "max"} <= handlers["html-page-context:setup_nav"].keys()
+
+    assert {"parse", "walk", "serialize"} <= report["transforms"].keys()
+    assert "scrollspy_toc_link" in report["visitors"]
+    # The sidebar's navigation is already collapsible
+    assert "collapsible_nav_link" not in report["visitors"]
+
+    docs = [page["page"] for page in report["slowest_pages"]]
+    assert "index" in docs
+    for page in report["slowest_pages"]:
+        assert 0 < page["theme"] < page["time"]
+
+
+@pytest.mark.skipif(not parallel_available, reason="parallel builds aren't available")
+@pytest.mark.sphinx(
+    "html", testroot="postprocess", srcdir="parallel-build-report", freshenv=True, parallel=2, confoverrides=CONFIG
+)
+def test_parallel_build_report(app: Sphinx) -> None:
+    """It includes the handlers that run in the processes that read the documents."""
+    app.build()
+
+    report = json.loads((Path(app.confdir) / "_report" / "build.json").read_text(encoding="utf-8"))
+    handlers = report["handlers"]
+    docs = len(app.env.all_docs)
+    assert handlers["doctree-read:cache_toc"]["calls"] == docs
+    assert handlers["builder-inited:update_config"]["calls"] == 1
+
+
+@pytest.mark.sphinx(
+    "html",
+    testroot="postprocess",
+    srcdir="no-build-report",
+    freshenv=True,
+    confoverrides={"html_theme": "sphinxawesome_theme"},
+)
+def test_no_build_report(app: Sphinx) -> None:
+    """It doesn't measure anything if the option isn't set."""
+    app.build()
+
+    assert not TIMINGS.enabled
+    assert not (Path(app.confdir) / "_report").exists()
+
+
+@pytest.mark.sphinx(
+    "html",
+    testroot="postprocess",
+    srcdir="reset-report",
+    freshenv=True,
+    confoverrides={"html_theme": "sphinxawesome_theme"},
+)
+def test_reset_reports(app: Sphinx, make_app: Any) -> None:
+    """It forgets the state that a previous build in the same process left behind."""
+    TIMINGS.enabled = True
+    TIMINGS.page = {"handlers": {"leaked": 1.0}}
+    MEMORY.enabled = True
+    make_app("html", srcdir=app.srcdir, confoverrides={"html_theme": "sphinxawesome_theme"})
+
+    assert not TIMINGS.enabled
+    assert TIMINGS.page is None
+    assert not MEMORY.enabled
+
+
+@pytest.mark.sphinx(
+    "html",
+    testroot="highlighting",
+    srcdir="memory-report",
+    freshenv=True,
+    confoverrides={
+        "html_theme": "sphinxawesome_theme",
+        "html_theme_options": {"awesome_memory_report": "_report/memory.json"},
+    },
+)
+def test_memory_report(app: Sphinx, status: StringIO) -> None:
+    """It records the memory of the post-processing of each page and the highlighting of each code block."""
+    app.build()
+
+    assert not MEMORY.enabled
+    assert not tracemalloc.is_tracing()
+
+    report = json.loads((Path(app.confdir) / "_report" / "memory.json").read_text(encoding="utf-8"))
+    assert report["postprocess"]["count"] == 1
+    assert report["postprocess"]["top"][0]["name"] == "index"
+    assert report["postprocess"]["peak"] > 0
+
+    blocks = report["highlighting"]["top"]
+    assert len(blocks) == 2
+    assert blocks[0]["peak"] >= blocks[1]["peak"]
+    assert {block["name"].rsplit("/", 1)[1] for block in blocks} == {"index.rst:4 (python)", "index.rst:14 (python)"}
+
+    assert "postprocess memory: peak" in status.getvalue()
+    assert "highlighting memory: peak" in status.getvalue()
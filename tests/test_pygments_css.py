@@ -0,0 +1,203 @@
+"""Test the CSS for Pygments."""
+
+import re
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, cast
+
+import pytest
+from sphinx.application import Sphinx
+from sphinx.builders.html import _assets
+
+from sphinxawesome_theme.builder import (
+    get_module_classes,
+    get_pygments_stylesheet,
+    merge_stylesheets,
+    prune_stylesheet,
+)
+from sphinxawesome_theme.highlighting import AwesomePygmentsBridge
+
+from .util import asset_version, parse_html
+
+
+def test_prune_stylesheet() -> None:
+    """It only removes the rules for tokens."""
+    stylesheet = (
+        ".highlight .hll { background-color: #ffffcc }\n"
+        ".highlight { background: #f8f8f8; }\n"
+        ".highlight .c { font-style: italic } /* Comment */\n"
+        ".highlight .k { font-weight: bold } /* Keyword */\n"
+        "@media (prefers-color-scheme: dark) {\n"
+        ".highlight .k { color: #ff0000 } /* Keyword */\n"
+        ".highlight .kc { color: #ff0000 } /* Keyword.Constant */\n"
+        "}"
+    )
+    assert prune_stylesheet(stylesheet, {"k"}) == (
+        ".highlight .hll { background-color: #ffffcc }\n"
+        ".highlight { background: #f8f8f8; }\n"
+        ".highlight .k { font-weight: bold } /* Keyword */\n"
+        "@media (prefers-color-scheme: dark) {\n"
+        ".highlight .k { color: #ff0000 } /* Keyword */\n"
+        "}"
+    )
+
+
+def test_merge_stylesheets() -> None:
+    """It references variables for the properties that differ between light and dark mode."""
+    light = (
+        "pre { line-height: 125%; }\n"
+        "td.linenos .normal { color: #666666; padding-left: 5px; }\n"
+        ".highlight { background: #ffffff; }\n"
+        ".highlight .c { color: #408090; font-style: italic } /* Comment */\n"
+        ".highlight .c1 { color: #408090; font-style: italic } /* Comment.Single */\n"
+        ".highlight .k { font-weight: bold } /* Keyword */\n"
+    )
+    dark = (
+        "pre { line-height: 125%; }\n"
+        "td.linenos .normal { color: inherit; padding-left: 5px; }\n"
+        ".highlight { background: #272822; color: #F8F8F2 }\n"
+        ".highlight .c { color: #959077 } /* Comment */\n"
+        ".highlight .c1 { color: #959077 } /* Comment.Single */\n"
+        ".highlight .s { color: #E6DB74 } /* Literal.String */\n"
+    )
+    assert merge_stylesheets(light, dark) == (
+        ":root {\n"
+        "  --pg-0: #ffffff;\n"
+        "  --pg-1: #408090;\n"
+        "}\n"
+        ":root.dark {\n"
+        "  --pg-0: #272822;\n"
+        "  --pg-1: #959077;\n"
+        "}\n"
+        "pre { line-height: 125% }\n"
+        "td.linenos .normal { color: #666666; padding-left: 5px }\n"
+        ".highlight { background: var(--pg-0) }\n"
+        ".highlight .c { color: var(--pg-1); font-style: italic }\n"
+        ".highlight .c1 { color: var(--pg-1); font-style: italic }\n"
+        ".highlight .k { font-weight: bold }\n"
+        ":where(.dark) td.linenos .normal { color: inherit }\n"
+        ":where(.dark) .highlight { color: #F8F8F2 }\n"
+        ":where(.dark) .highlight .s { color: #E6DB74 }\n"
+    )
+
+
+PRUNE = {"html_theme": "sphinxawesome_theme", "html_theme_options": {"awesome_prune_pygments_css": True}}
+
+
+@pytest.mark.sphinx(
+    "html",
+    testroot="highlighting",
+    srcdir="pygments-css",
+    freshenv=True,
+    confoverrides={**PRUNE, "pygments_style_dark": "monokai"},
+)
+def test_pygments_css(app: Sphinx, monkeypatch: pytest.MonkeyPatch) -> None:
+    """It only includes the rules for the tokens of the code blocks."""
+    other = Path(app.srcdir) / "other.rst"
+    other.write_text(":orphan:\n\nOther\n=====\n\n.. code-block:: python\n\n   x = True\n")
+    app.build()
+    pygments_css = Path(app.outdir) / "_static" / "pygments.css"
+    stylesheet = pygments_css.read_text()
+    assert ".highlight .s2 {" in stylesheet
+    assert ".highlight .kc {" in stylesheet
+    assert ".highlight .c1 {" not in stylesheet
+    assert ":where(.dark) .highlight .s2 {" in stylesheet
+    assert "prefers-color-scheme" not in stylesheet
+    # The pages reference the pruned file
+    link = parse_html(Path(app.outdir) / "index.html").find("link", href=re.compile("pygments"))
+    assert link["href"] == f"_static/pygments.css?v={asset_version(pygments_css)}"  # type: ignore
+
+    # Only the changed document is lexed again
+    lexed = []
+    get_token_classes = AwesomePygmentsBridge.get_token_classes
+
+    def spy(self: AwesomePygmentsBridge, source: str, *args: Any) -> set[str]:  # noqa: ANN401
+        lexed.append(source)
+        return get_token_classes(self, source, *args)
+
+    monkeypatch.setattr(AwesomePygmentsBridge, "get_token_classes", spy)
+    index = Path(app.srcdir) / "index.rst"
+    index.write_text(index.read_text() + "\n.. code-block:: python\n\n   # Comment\n")
+    # Every build runs in a new process, but Sphinx caches the checksums of the files in the process
+    checksum = getattr(_assets, "_file_checksum_inner", None)
+    if checksum is not None:
+        checksum.cache_clear()
+    app.build()
+    assert "# Comment" in lexed
+    assert "x = True" not in lexed
+    stylesheet = pygments_css.read_text()
+    assert ".highlight .kc {" in stylesheet
+    assert ".highlight .c1 {" in stylesheet
+    link = parse_html(Path(app.outdir) / "index.html").find("link", href=re.compile("pygments"))
+    assert link["href"] == f"_static/pygments.css?v={asset_version(pygments_css)}"  # type: ignore
+
+    # Removed documents don't count
+    other.unlink()
+    app.build()
+    assert ".highlight .kc {" not in pygments_css.read_text()
+
+
+@pytest.mark.sphinx(
+    "html",
+    testroot="highlighting",
+    freshenv=True,
+    confoverrides={"html_theme": "sphinxawesome_theme"},
+)
+def test_pygments_css_default(app: Sphinx) -> None:
+    """It includes all rules by default."""
+    app.build()
+    stylesheet = (Path(app.outdir) / "_static" / "pygments.css").read_text()
+    assert stylesheet == get_pygments_stylesheet(app.builder)  # type: ignore
+    assert ".highlight .c1 {" in stylesheet
+
+
+@pytest.mark.sphinx(
+    "html",
+    testroot="highlighting",
+    srcdir="pygments-css-cache",
+    freshenv=True,
+    confoverrides={
+        "html_theme": "sphinxawesome_theme",
+        "html_theme_options": {"awesome_prune_pygments_css": True, "awesome_cache_dir": "_cache"},
+    },
+)
+def test_pygments_css_cache(app: Sphinx, make_app: Any, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """It doesn't lex the code again for a clean build with the cache of an earlier build."""
+    app.build()
+    stylesheet = (Path(app.outdir) / "_static" / "pygments.css").read_text()
+
+    lexed = []
+    get_lexer = AwesomePygmentsBridge.get_lexer
+
+    def spy(self: AwesomePygmentsBridge, source: str, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        lexed.append(source)
+        return get_lexer(self, source, *args, **kwargs)
+
+    monkeypatch.setattr(AwesomePygmentsBridge, "get_lexer", spy)
+    clean = make_app("html", srcdir=app.srcdir, builddir=tmp_path, freshenv=True, confoverrides=app.config.overrides)
+    clean.build()
+    assert not lexed
+    assert (Path(clean.outdir) / "_static" / "pygments.css").read_text() == stylesheet
+
+
+def test_module_classes() -> None:
+    """It only lexes the modules for ``sphinx.ext.viewcode`` whose code changed."""
+    highlighter = AwesomePygmentsBridge("html", "sphinx")
+    lexed = []
+
+    def get_token_classes(source: str, lang: str) -> set[str]:
+        lexed.append(source)
+        return {"kc"} if "True" in source else {"mi"}
+
+    cast(Any, highlighter).get_token_classes = get_token_classes
+    env: Any = SimpleNamespace(_viewcode_modules={"one": ("x = True\n", {}, {}, "one"), "none": False})
+    assert get_module_classes(highlighter, env) == {"kc"}
+    assert get_module_classes(highlighter, env) == {"kc"}
+    assert lexed == ["x = True\n"]
+
+    env._viewcode_modules = {"one": ("x = 1\n", {}, {}, "one")}
+    assert get_module_classes(highlighter, env) == {"mi"}
+    assert lexed == ["x = True\n", "x = 1\n"]
+    env._viewcode_modules = {}
+    assert get_module_classes(highlighter, env) == set()
+    assert env.awesome_module_classes == {}
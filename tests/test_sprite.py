@@ -0,0 +1,57 @@
+"""Test the SVG sprite for the theme's icons."""
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sphinx.application import Sphinx
+
+import sphinxawesome_theme
+from sphinxawesome_theme.icons import Icons
+
+from .util import parse_html
+
+CONFIG = {
+    "html_theme": "sphinxawesome_theme",
+    "html_permalinks_icon": Icons.permalinks_icon,
+    "html_theme_options": {
+        "awesome_external_links": True,
+        "awesome_icon_sprite": True,
+        "extra_header_link_icons": {
+            "repository": {"link": "https://example.org", "icon": '<svg viewBox="0 0 1 1"><path d="M0 0h1v1z"/></svg>'},
+        },
+    },
+}
+
+
+@pytest.mark.sphinx("html", testroot="postprocess", freshenv=True, confoverrides=CONFIG)
+def test_icon_sprite(app: Sphinx, make_app: Any, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """It references the icons from the sprite instead of inlining them."""
+    app.build()
+
+    sprite = parse_html(Path(app.outdir) / "_static" / "awesome-icons.svg")
+    symbols = [symbol["id"] for symbol in sprite.select("symbol")]
+    assert symbols == [
+        "awesome-icon-external-link",
+        "awesome-icon-chevron-right",
+        "awesome-icon-permalink",
+        "awesome-icon-header-0",
+    ]
+
+    tree = parse_html(Path(app.outdir) / "index.html")
+    href = "_static/awesome-icons.svg#awesome-icon-"
+    assert tree.select_one("a.reference.external svg use")["href"] == href + "external-link"  # type: ignore
+    assert tree.select_one("a.expandable button svg use")["href"] == href + "chevron-right"  # type: ignore
+    assert tree.select_one("a.headerlink svg use")["href"] == href + "permalink"  # type: ignore
+    assert tree.select_one('a[title="Visit repository"] svg use')["href"] == href + "header-0"  # type: ignore
+    assert not tree.select("a.reference.external path, a.expandable path, a.headerlink path")
+
+    # Without the translator, the post-processing references the icon of external links
+    monkeypatch.setattr(sphinxawesome_theme, "setup_translator", lambda app: None)
+    other = make_app("html", srcdir=app.srcdir, builddir=tmp_path, freshenv=True, confoverrides=CONFIG)
+    other.build()
+    other_tree = parse_html(Path(other.outdir) / "index.html")
+    for selector in ["a.reference.external svg", "a.expandable button svg"]:
+        assert other_tree.select_one(selector) == tree.select_one(selector)
+    # Headerlinks only reference the sprite with the theme's translator
+    assert other_tree.select_one("a.headerlink svg path")
@@ -0,0 +1,68 @@
+"""Test the on-page TOC."""
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+from docutils.nodes import Node
+from sphinx.application import Sphinx
+from sphinx.util.build_phase import BuildPhase
+
+from sphinxawesome_theme import toc
+
+from .util import parse_html
+
+
+@pytest.mark.sphinx("html", testroot="toc", freshenv=True, confoverrides={"html_theme": "sphinxawesome_theme"})
+def test_toc(app: Sphinx) -> None:
+    """It renders the same on-page TOC as the HTML writer."""
+    tocs = {}
+
+    def check_toc(app: Sphinx, pagename: str, templatename: str, context: dict[str, Any], doctree: Node) -> None:
+        local_toc = toc.get_local_toc(app.builder, pagename)  # type: ignore
+        tocs[pagename] = context["toc"]
+        assert context["toc"] == app.builder.render_partial(local_toc)["fragment"]  # type: ignore
+
+    app.connect("html-page-context", check_toc, priority=900)
+    app.build()
+
+    assert set(tocs) == {"index", "numbered", "plain", "genindex", "search"}
+    assert "1.1. First section" in tocs["numbered"]
+    assert "Only in HTML" in tocs["plain"]
+    assert "Only in LaTeX" not in tocs["plain"]
+    assert "Section &amp; &lt;special&gt; characters" in tocs["index"]
+
+    # The TOC of ``index`` has code, which only the HTML writer renders
+    assert set(app.env.awesome_tocs) == {"numbered", "plain"}  # type: ignore
+    assert "1.1." not in app.env.awesome_tocs["numbered"]  # type: ignore
+    assert app.env.awesome_tocs["plain"] == tocs["plain"]  # type: ignore
+
+    tree = parse_html(Path(app.outdir) / "plain.html")
+    links = tree.select("#right-sidebar a")
+    assert [link["href"] for link in links] == ["#first-section", "#subsection", "#only-in-html", "#second-section"]
+
+
+@pytest.mark.sphinx(
+    "html",
+    testroot="toc",
+    srcdir="toc-cache",
+    freshenv=True,
+    confoverrides={"html_theme": "sphinxawesome_theme"},
+)
+def test_toc_cache(app: Sphinx, monkeypatch: pytest.MonkeyPatch) -> None:
+    """It renders the on-page TOC while reading only for documents that changed."""
+    app.build()
+    rendered = []
+    get_local_toc = toc.get_local_toc
+
+    def spy(builder: Any, docname: str) -> Node | None:  # noqa: ANN401
+        if app.phase == BuildPhase.READING:
+            rendered.append(docname)
+        return get_local_toc(builder, docname)
+
+    monkeypatch.setattr(toc, "get_local_toc", spy)
+    (Path(app.srcdir) / "plain.rst").write_text("Plain page\n==========\n\nNew section\n-----------\n")
+    app.build()
+
+    assert rendered == ["plain"]
+    assert "New section" in app.env.awesome_tocs["plain"]  # type: ignore
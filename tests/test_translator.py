@@ -0,0 +1,44 @@
+"""Test the HTML translator that adds the theme's attributes to links."""
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sphinx.application import Sphinx
+
+import sphinxawesome_theme
+from sphinxawesome_theme.translator import AwesomeHTMLTranslator
+
+from .util import parse_html, read_as_text
+
+CONFIG = {
+    "html_theme": "sphinxawesome_theme",
+    "html_theme_options": {"awesome_external_links": True, "awesome_headerlinks": True},
+}
+
+
+@pytest.mark.sphinx("html", testroot="postprocess", freshenv=True, confoverrides=CONFIG)
+def test_translator(app: Sphinx, make_app: Any, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """It produces the same HTML as the post-processing transformations."""
+    app.build()
+    assert app.builder.get_translator_class() is AwesomeHTMLTranslator
+
+    tree = parse_html(Path(app.outdir) / "index.html")
+    assert len(tree.select('a.reference.external[rel="nofollow noopener"] svg')) == 1
+    assert len(tree.select("dt.sig a.headerlink[x-intersect\\.margin\\.0\\%\\.0\\%\\.-70\\%\\.0\\%]")) == 1
+    assert len(tree.select("a.headerlink[title]")) == 0
+
+    # Titles that link back to the table of contents
+    tree = parse_html(Path(app.outdir) / "third.html")
+    assert tree.select("h2 a.toc-backref")
+    assert len(tree.select("h2 a.headerlink[data-tooltip][x-intersect\\.margin\\.0\\%\\.0\\%\\.-70\\%\\.0\\%]")) == 1
+    assert len(tree.select("a.headerlink[title]")) == 0
+
+    # Build without the translator, as if another extension had replaced it
+    monkeypatch.setattr(sphinxawesome_theme, "setup_translator", lambda app: None)
+    other = make_app("html", srcdir=app.srcdir, builddir=tmp_path, freshenv=True, confoverrides=CONFIG)
+    other.build()
+    assert other.builder.get_translator_class() is not AwesomeHTMLTranslator
+
+    for page in ["index.html", "first.html", "second.html", "third.html"]:
+        assert read_as_text(Path(app.outdir) / page) == read_as_text(Path(other.outdir) / page)
@@ -1,9 +1,13 @@
 """Test utility functions."""
 
+import zlib
+from html.parser import HTMLParser
 from pathlib import Path
 
 from bs4 import BeautifulSoup
 
+from sphinxawesome_theme.streaming import VOID_ELEMENTS
+
 
 def parse_html(filename: Path | str) -> BeautifulSoup:
     """Parse an HTML file into a BeautifulSoup tree."""
@@ -17,3 +21,52 @@ def read_as_text(filename: Path | str) -> str:
     with open(filename) as file_handle:
         txt = file_handle.read()
     return txt
+
+
+def asset_version(filename: Path | str) -> str:
+    """Return the checksum that Sphinx adds to the URLs of static files as ``?v=``."""
+    content = Path(filename).read_bytes().translate(None, b"\r")
+    return f"{zlib.crc32(content):08x}"
+
+
+class _Tokens(HTMLParser):
+    """Collect the tags and the text of an HTML document."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.tokens: list[tuple[str, ...]] = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        # An attribute without a value is the same as an attribute with an empty value
+        self.tokens.append(("start", tag, *sorted(f"{name}={value or ''}" for name, value in attrs)))
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        # BeautifulSoup writes ``<path/>`` as ``<path></path>``
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        self.tokens.append(("end", tag))
+
+    def handle_data(self, data: str) -> None:
+        self.tokens.append(("data", data))
+
+    def handle_comment(self, data: str) -> None:
+        self.tokens.append(("comment", data))
+
+    def handle_decl(self, decl: str) -> None:
+        self.tokens.append(("decl", decl))
+
+
+def html_tokens(html: str) -> list[tuple[str, ...]]:
+    """Return the tags and the text of an HTML document.
+
+    The tokens don't depend on how the tags are written,
+    such as the order of the attributes or the character references in their values,
+    but they include every character of the text, including whitespace.
+    """
+    parser = _Tokens()
+    parser.feed(html)
+    parser.close()
+    return parser.tokens